@@ -0,0 +1,111 @@
+"""Benchmark the per-post overhead of the clue container that parsers return,
+i.e. building it from the parsed columns, postprocessing it and converting it to
+rows for the `clues` table, against the previous implementation (a pandas
+DataFrame, built by transposing a NumPy array), and check that both produce
+exactly the same rows.
+
+Parsing itself (and extracting puzzle names, dates and URLs) is the same for
+both, and is not timed.
+
+Usage: python benchmarks/clues.py [--posts N] [--clues-per-post N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from cryptics.clues import ClueBatch
+from cryptics.database import CLUES_COLUMNS, batch_to_rows
+from cryptics.parse import strip_clues
+
+Columns = tuple[list, list, list, list, list]
+
+
+def reference(columns: Columns, source_url: str) -> list[list]:
+    clue_numbers, clues, answers, definitions, annotations = columns
+    data = pd.DataFrame(
+        data=np.transpose(
+            np.array([clue_numbers, clues, answers, definitions, annotations])
+        ),
+        columns=["clue_number", "clue", "answer", "definition", "annotation"],
+    )
+
+    data["clue"] = data["clue"].str.strip()
+    data["answer"] = data["answer"].str.strip()
+    data["definition"] = data["definition"].str.strip()
+    data["annotation"] = data["annotation"].str.strip()
+    data["clue_number"] = data["clue_number"].str.strip().replace(".", "")
+    data["puzzle_name"] = None
+    data["puzzle_date"] = None
+    data["puzzle_url"] = None
+    data["source_url"] = source_url
+    data["source"] = "benchmark"
+
+    data = data.reindex(columns=CLUES_COLUMNS).astype(object)
+    return data.where(data.notna(), None).values.tolist()
+
+
+def clue_batch(columns: Columns, source_url: str) -> list[list]:
+    clue_numbers, clues, answers, definitions, annotations = columns
+    data = ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
+    )
+
+    strip_clues(data)
+    data.source_url = source_url
+    data.source = "benchmark"
+
+    return batch_to_rows(data)
+
+
+def make_posts(num_posts: int, clues_per_post: int) -> list[Columns]:
+    return [
+        (
+            [
+                f" {i}{'a' if i < clues_per_post // 2 else 'd'} "
+                for i in range(1, clues_per_post + 1)
+            ],
+            [
+                f"Clue number {i} of post {post}, with some words ({i % 9 + 3}) "
+                for i in range(clues_per_post)
+            ],
+            [f" ANSWER{i}" for i in range(clues_per_post)],
+            [f"words {i}" for i in range(clues_per_post)],
+            [f"AN (annotation) + SWER{i} (wordplay)  " for i in range(clues_per_post)],
+        )
+        for post in range(num_posts)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--clues-per-post", type=int, default=30)
+    args = parser.parse_args()
+
+    posts = make_posts(args.posts, args.clues_per_post)
+    print(f"{args.posts} posts, {args.clues_per_post} clues per post")
+
+    timings = {}
+    results = {}
+    for name, func in [("reference", reference), ("ClueBatch", clue_batch)]:
+        start = time.perf_counter()
+        results[name] = [func(columns, f"url_{i}") for i, columns in enumerate(posts)]
+        timings[name] = time.perf_counter() - start
+        print(
+            f"{name}: {timings[name]:.2f}s ({1e6 * timings[name] / args.posts:.0f}µs per post)"
+        )
+
+    print(f"Speedup: {timings['reference'] / timings['ClueBatch']:.1f}x")
+    if results["ClueBatch"] != results["reference"]:
+        print("Outputs differ!")
+        sys.exit(1)
+    print("Outputs are identical.")
@@ -0,0 +1,379 @@
+"""Generate a frozen corpus of blog posts for benchmarking parsers.
+
+Every post is generated from a seeded random number generator, so the corpus is
+the same on every run (and on every machine), and nothing is downloaded. Each
+parser type has its own generator, which writes posts in the layout its
+detector looks for (see the docstrings of the detectors), for each of the blog
+sources whose posts it parses. Pages include the titles, dates and links that
+the puzzle name, date and URL extractors look for.
+
+Usage: python benchmarks/corpus.py [--posts-per-parser N] [--output-dir DIR]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import html
+import os
+import random
+from typing import Callable, NamedTuple
+
+WORDS = """
+about above acid actor adder agent aisle alarm alder alien alley altar amber
+angel anger angle ankle apple apron arena argue arrow aside aspen attic audio
+award bacon badge baker balsa banjo baron basil basin baton beach beard beast
+bench berry birch bison blade blaze bloom board boast bonus boxer brave bread
+briar brick bride brine brook broom brown brush cabin cable camel canal candy
+canoe caper cargo carol cedar chain chair chalk charm chess chest chief chime
+cider cigar civic claim clerk cliff cloak clock cloud clove coach coast cobra
+comet coral couch crane crate cream crest crown cubic curry cycle dairy daisy
+dance decoy delta depot diary digit diner ditch dodge dough draft drama dream
+drill drone eagle easel elbow elder ember enemy entry equal essay event fable
+fairy feast fence ferry fiber field flame flask fleet flint flock flora flute
+forge frost fruit gamut giant ghost glade glass globe glove grain grape grass
+gravy guard guest guide habit hazel heart hedge heron honey horse hotel house
+igloo image inlet ivory jelly jewel joker judge juice kayak kebab knife koala
+label lance larch laser latch layer lemon level lever light lilac linen llama
+lodge lotus lunar lyric manor maple march marsh mason medal melon metal miner
+model moose motor mound mouse mural nerve noble north novel nurse oasis ocean
+olive onion opera orbit otter owner oxide paint panel paper patio peach pearl
+pedal penny perch piano pilot plaza plume polar poppy porch pouch prism prune
+""".split()
+
+# Directions, as they appear in headings, and as they are appended to clue
+# numbers.
+DIRECTIONS = [("Across", "a"), ("Down", "d")]
+
+
+class Post(NamedTuple):
+    parser: str
+    source: str
+    url: str
+    html: str
+
+
+class Clue(NamedTuple):
+    number: int
+    direction: str
+    definition: str
+    wordplay: str
+    enumeration: str
+    answer: str
+    annotation: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.definition} {self.wordplay} {self.enumeration}"
+
+
+def make_clues(rng: random.Random, clues_per_direction: int = 16) -> list[Clue]:
+    """Return random clues, with a definition (which no other clue contains)
+    at the start of each clue.
+    """
+    clues: list[Clue] = []
+    for _, direction in DIRECTIONS:
+        for number in range(1, clues_per_direction + 1):
+            answer_words = [w.upper() for w in rng.sample(WORDS, rng.randint(1, 2))]
+            while True:
+                definition = " ".join(rng.sample(WORDS, 2)).capitalize()
+                if not any(definition in clue.text for clue in clues):
+                    break
+            wordplay = " ".join(rng.sample(WORDS, rng.randint(3, 6)))
+            fodder = " ".join(rng.sample(WORDS, 2)).upper()
+            clues.append(
+                Clue(
+                    number=number,
+                    direction=direction,
+                    definition=definition,
+                    wordplay=wordplay,
+                    enumeration=f"({','.join(str(len(w)) for w in answer_words)})",
+                    answer=" ".join(answer_words),
+                    annotation=f"{fodder} ({rng.choice(WORDS)}) in {rng.choice(WORDS)}",
+                )
+            )
+    return clues
+
+
+def split(clues: list[Clue]) -> list[tuple[str, list[Clue]]]:
+    return [
+        (heading, [clue for clue in clues if clue.direction == direction])
+        for heading, direction in DIRECTIONS
+    ]
+
+
+def source_page(source: str, rng: random.Random, body: str) -> tuple[str, str]:
+    """Return the URL and HTML of a post from a source, with `body` as the body
+    of the post.
+    """
+    year, month, day = 2021, rng.randint(1, 12), rng.randint(1, 28)
+    number = rng.randint(10000, 30000)
+    date_header = (
+        f'<h2 class="date-header"><span>Saturday, {month}/{day}/{year}</span></h2>'
+    )
+    if source == "fifteensquared":
+        url = f"https://www.fifteensquared.net/{year}/{month:02}/{day:02}/guardian-{number}-by-{rng.choice(WORDS)}/"
+        head = f"<title>Guardian {number}</title>"
+        meta = f'<a href="https://www.theguardian.com/crosswords/cryptic/{number}">Puzzle</a>'
+    elif source == "bigdave44":
+        url = f"http://bigdave44.com/{year}/{month:02}/{day:02}/dt-{number}/"
+        head = f"<title>DT {number} – {rng.choice(WORDS)}</title>"
+        meta = f'<a href="https://puzzles.telegraph.co.uk/crossword-puzzles/cryptic-crossword-{number}">Puzzle</a>'
+    elif source == "times_xwd_times":
+        url = f"https://times-xwd-times.livejournal.com/{number * 100}.html"
+        head = f"<title>Times {number} - {rng.choice(WORDS)}</title>"
+        meta = (
+            f'<div class="asset-meta asset-entry-date">{month}/{day}/{year}</div>'
+            f'<a href="https://www.thetimes.co.uk/puzzles/{number}">Puzzle</a>'
+        )
+    elif source == "thehinducrosswordcorner":
+        url = f"https://thehinducrosswordcorner.blogspot.com/{year}/{month:02}/no-{number}.html"
+        head = f"<title>THE HINDU CROSSWORD CORNER: No {number}</title>"
+        meta = date_header
+    elif source == "natpostcryptic":
+        url = f"https://natpostcryptic.blogspot.com/{year}/{month:02}/saturday-{day}-cox-rathvon.html"
+        head = "<title>National Post Cryptic Crossword Forum: Saturday</title>"
+        meta = date_header
+    elif source == "thenationcryptic":
+        url = f"https://thenationcryptic.blogspot.com/{year}/{month:02}/puzzle-no-{number}-solution.html"
+        head = "<title>Solution</title>"
+        meta = (
+            date_header
+            + f'<a href="https://www.thenation.com/article/puzzle-{number}/">Puzzle</a>'
+        )
+    elif source == "1across":
+        url = f"https://www.1across.org/{year}/{month:02}/solutions-{number}"
+        head = f"<title>Solutions {number}</title>"
+        meta = ""
+    else:
+        raise ValueError(f"Unknown source: {source}")
+    return url, (
+        f"<!DOCTYPE html><html><head>{head}</head><body>"
+        f'<div class="post">{meta}\n{body}\n</div></body></html>'
+    )
+
+
+def _underlined(clue: Clue) -> str:
+    return f'<span style="text-decoration: underline">{clue.definition}</span> {clue.wordplay} {clue.enumeration}'
+
+
+def table_type_1(clues: list[Clue]) -> str:
+    rows = []
+    for heading, direction_clues in split(clues):
+        rows.append(
+            f"<tr><td>{heading.upper()}</td>" * 1
+            + f"<td>{heading.upper()}</td>" * 2
+            + "</tr>"
+        )
+        for clue in direction_clues:
+            rows.append(
+                f"<tr><td>{clue.number}</td><td>{clue.answer}</td><td>{_underlined(clue)}</td></tr>"
+            )
+            rows.append(f"<tr><td></td><td></td><td>{clue.annotation}</td></tr>")
+    return f'<div class="entry-content"><table>{"".join(rows)}</table></div>'
+
+
+def table_type_2(clues: list[Clue]) -> str:
+    rows = []
+    for heading, direction_clues in split(clues):
+        rows.append(f"<tr>{f'<td>{heading}</td>' * 3}</tr>")
+        for clue in direction_clues:
+            rows.append(
+                f"<tr><td>{clue.number}</td><td>{clue.answer}</td>"
+                f"<td><u>{clue.definition}</u> {clue.wordplay} {clue.enumeration}{clue.annotation}</td></tr>"
+            )
+    return f'<div class="entry-content"><table>{"".join(rows)}</table></div>'
+
+
+def table_type_3(clues: list[Clue]) -> str:
+    column_names = "<tr><td>Clue No</td><td>Solution</td><td>Clue</td><td>Definition</td><td></td></tr>"
+    rows = []
+    for heading, direction_clues in split(clues):
+        if heading == "Down":
+            rows.append(f"<tr>{'<td>Down</td>' * 5}</tr>")
+        rows.append(column_names)
+        for clue in direction_clues:
+            rows.append(
+                f"<tr><td>{clue.number}{clue.direction.upper()}</td><td>{clue.answer}</td><td>{clue.text}</td>"
+                f"<td>{clue.definition} / {clue.annotation}</td><td></td></tr>"
+            )
+    return (
+        f'<div class="entry-content"><table><thead><tr>{"<th>Across</th>" * 5}</tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody></table></div>'
+    )
+
+
+def table_type_4(clues: list[Clue]) -> str:
+    rows = ["<tr><td>No</td><td>clue</td><td>Wordplay</td><td>Entry</td></tr>"]
+    for heading, direction_clues in split(clues):
+        rows.append(f"<tr><td>{heading}</td><td></td><td></td><td></td></tr>")
+        for clue in direction_clues:
+            rows.append(
+                f"<tr><td>{clue.number}</td><td><u>{clue.definition}</u> {clue.wordplay} {clue.enumeration}</td>"
+                f"<td>{clue.annotation}</td><td>{clue.answer} (from the wordplay)</td></tr>"
+            )
+    return f'<div class="entry-content"><table>{"".join(rows)}</table></div>'
+
+
+def table_type_5(clues: list[Clue]) -> str:
+    tables = []
+    for heading, direction_clues in split(clues):
+        rows = [f"<tr><td>{heading}</td><td>{heading}</td></tr>"]
+        for clue in direction_clues:
+            rows.append(
+                f"<tr><td>{clue.number}</td><td><u>{clue.definition}</u> {clue.wordplay} {clue.enumeration}</td></tr>"
+            )
+            rows.append(f"<tr><td></td><td>{clue.answer} - {clue.annotation}</td></tr>")
+        tables.append(f"<table>{''.join(rows)}</table>")
+    return f'<div class="asset-body">{"".join(tables)}</div>'
+
+
+def list_type_1(clues: list[Clue]) -> str:
+    paragraphs = []
+    for heading, direction_clues in split(clues):
+        paragraphs.append(f"<p>{heading}</p>")
+        for clue in direction_clues:
+            paragraphs.append(
+                f'<p>{clue.number} <span style="color: #3366ff">{_underlined(clue)}</span><br/>'
+                f"<strong>{clue.answer}</strong><br/>{clue.annotation}</p>"
+            )
+    return f'<div class="entry-content">{"".join(paragraphs)}</div>'
+
+
+def list_type_2(clues: list[Clue]) -> str:
+    divs = []
+    for heading, direction_clues in split(clues):
+        divs.append(f"<div>{heading}</div>")
+        for clue in direction_clues:
+            divs.append(
+                f'<div class="fts-subgroup"><span class="fts-clue">{clue.number}. </span><em>'
+                f'<span class="fts-definition">{clue.definition}</span>'
+                f'<span class="fts-clue"> {clue.wordplay} {clue.enumeration}</span></em></div>'
+                f'<div class="fts-subgroup fts-answer"><span>{clue.answer}</span></div>'
+                f'<div class="fts-subgroup"><p>{clue.annotation}</p></div>'
+            )
+    return f'<div class="entry-content">{"".join(divs)}</div>'
+
+
+def list_type_3(clues: list[Clue]) -> str:
+    paragraphs = []
+    for heading, direction_clues in split(clues):
+        paragraphs.append(f"<p>{heading}</p>")
+        for clue in direction_clues:
+            paragraphs.append(
+                f'<p><span style="color: blue">{clue.number}. {_underlined(clue)}<br/></span></p>'
+                f'<p><span style="color: #c00000"><strong>{clue.answer}</strong></span> : {clue.annotation}</p>'
+            )
+    return f'<div class="entry-content">{"".join(paragraphs)}</div>'
+
+
+def list_type_4(clues: list[Clue]) -> str:
+    divs = []
+    for heading, direction_clues in split(clues):
+        divs.append(f"<div>{heading}</div>")
+        for clue in direction_clues:
+            divs.append(
+                f"<div>{clue.number} <i>{clue.definition}</i> {clue.wordplay} {clue.enumeration} "
+                f'<b><span style="color: #2b00fe;">{clue.answer}</span></b> {{{clue.annotation}}}</div>'
+            )
+    return f'<div class="entry-content">{"".join(divs)}</div>'
+
+
+def text_type_1(clues: list[Clue]) -> str:
+    lines = ["Introduction to today's puzzle."]
+    for heading, direction_clues in split(clues):
+        lines.append(heading.upper())
+        for clue in direction_clues:
+            lines.append(
+                f"{clue.number} <u>{clue.definition}</u> {clue.wordplay} {clue.enumeration}"
+            )
+            lines.append(f"{clue.answer} - {clue.annotation}")
+    return f'<div class="entry-content">{"<br/>".join(lines)}</div>'
+
+
+def text_type_2(clues: list[Clue]) -> str:
+    lines = []
+    for heading, direction_clues in split(clues):
+        lines.append(heading.upper())
+        for clue in direction_clues:
+            lines.append(
+                f"{clue.number} <b>{clue.definition}</b> {clue.wordplay} {clue.enumeration} "
+                f"<b>{clue.answer}</b> {{{clue.annotation}}}"
+            )
+    return f'<div class="entry-content">{"<br/>".join(lines)}</div>'
+
+
+def special_type_1(clues: list[Clue]) -> str:
+    lines = [
+        f"Today's puzzle by Emily Cox and Henry Rathvon, reviewed by Falcon ({i})."
+        for i in range(50)
+    ] + ["Key to Reference Sources: the usual dictionaries."]
+    for heading, direction_clues in split(clues):
+        lines.append(heading)
+        for clue in direction_clues:
+            lines.append(
+                f'<div style="background-color: blue; line-height: 200%;"><span style="color: white;">'
+                f"<b>{clue.number}{clue.direction}   <u>{clue.definition}</u>, // {clue.wordplay} {clue.enumeration}</b></span></div>"
+            )
+            lines.append(f"<b>{clue.answer}</b> — {clue.annotation}<br/>")
+    lines.append("Signing off for today — Falcon")
+    return f'<div class="entry-content">{chr(10).join(lines)}</div>'
+
+
+# Generators of post bodies, and the sources whose posts they mimic, by parser.
+GENERATORS: dict[str, tuple[Callable[[list[Clue]], str], list[str]]] = {
+    "parse_table_type_1": (table_type_1, ["fifteensquared"]),
+    "parse_table_type_2": (table_type_2, ["fifteensquared"]),
+    "parse_table_type_3": (table_type_3, ["fifteensquared"]),
+    "parse_table_type_4": (table_type_4, ["fifteensquared"]),
+    "parse_table_type_5": (table_type_5, ["times_xwd_times"]),
+    "parse_list_type_1": (list_type_1, ["fifteensquared", "bigdave44"]),
+    "parse_list_type_2": (list_type_2, ["fifteensquared"]),
+    "parse_list_type_3": (list_type_3, ["fifteensquared"]),
+    "parse_list_type_4": (list_type_4, ["thehinducrosswordcorner"]),
+    "parse_text_type_1": (text_type_1, ["times_xwd_times", "1across"]),
+    "parse_text_type_2": (
+        text_type_2,
+        ["thehinducrosswordcorner", "thenationcryptic"],
+    ),
+    "parse_special_type_1": (special_type_1, ["natpostcryptic"]),
+}
+
+
+def generate_corpus(posts_per_parser: int = 10, seed: int = 0) -> list[Post]:
+    """Generate `posts_per_parser` posts for each parser in GENERATORS, cycling
+    through its sources.
+    """
+    posts = []
+    for parser, (generate, sources) in GENERATORS.items():
+        for i in range(posts_per_parser):
+            rng = random.Random(f"{seed}/{parser}/{i}")
+            source = sources[i % len(sources)]
+            clues = make_clues(rng, clues_per_direction=rng.randint(14, 16))
+            url, page = source_page(source, rng, generate(clues))
+            posts.append(Post(parser, source, url, page))
+    return posts
+
+
+def corpus_digest(posts: list[Post]) -> str:
+    """Return a digest of a corpus, to tell whether two corpora are the same."""
+    digest = hashlib.sha256()
+    for post in posts:
+        digest.update(post.url.encode("utf-8") + b"\0" + post.html.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts-per-parser", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output-dir", type=str, default=None)
+    args = parser.parse_args()
+
+    posts = generate_corpus(args.posts_per_parser, seed=args.seed)
+    print(f"{len(posts)} posts, digest {corpus_digest(posts)}")
+    if args.output_dir is not None:
+        for i, post in enumerate(posts):
+            directory = os.path.join(args.output_dir, post.parser)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{i:04}.html"), "w") as f:
+                f.write(f"<!-- {html.escape(post.url)} -->\n{post.html}")
@@ -0,0 +1,6 @@
+"""Heavy dependencies, which should only be imported by the code that needs them,
+and never at startup. benchmarks/startup.py and tests/test_imports.py check
+that they are not.
+"""
+
+HEAVY_MODULES = ["bs4", "dateutil", "lxml", "numpy", "pandas", "requests", "tqdm"]
@@ -0,0 +1,144 @@
+"""Benchmark finding indicators and charades in the `clues` table, against the
+previous implementation (which ran every regex on every annotation, and wrote
+each indicator with its own INSERT and UPDATE), and check that both write
+exactly the same `indicators` and `charades` tables.
+
+Usage: python benchmarks/indicators.py [--database cryptics.sqlite3] [--limit N]
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, List
+
+from cryptics.config import INITIALIZE_DB_SQL, SQLITE_DATABASE
+from cryptics.indicators import (
+    CHARADE_REGEXES,
+    INDICATOR_REGEXES,
+    find_and_write_all,
+    find_and_write_chunks,
+)
+
+
+def reference_find_and_write_indicators(
+    clue_row_id: int,
+    clue: str,
+    annotation: str,
+    indicator_regexes: Dict[str, List[str]],
+    write_cursor: sqlite3.Cursor,
+) -> None:
+    for wordplay, regexes in indicator_regexes.items():
+        for regex in regexes:
+            indicators = "/".join(
+                [
+                    s.strip().lower()
+                    for s in re.findall(regex, annotation)
+                    if s.strip().lower() in clue.lower()
+                ]
+            )
+            if indicators:
+                try:
+                    write_cursor.execute(
+                        f"INSERT INTO indicators (clue_rowid) VALUES ({clue_row_id});"
+                    )
+                except sqlite3.IntegrityError:
+                    pass
+                write_cursor.execute(
+                    f"UPDATE indicators SET {wordplay} = ? WHERE clue_rowid = ?;",
+                    (indicators, clue_row_id),
+                )
+
+
+def reference_find_and_write_charades(
+    clue_row_id: int,
+    clue: str,
+    annotation: str,
+    charade_regexes: List[str],
+    write_cursor: sqlite3.Cursor,
+) -> None:
+    for regex in charade_regexes:
+        charades = [
+            (clue_row_id, charade.strip().lower(), answer.strip())
+            for (answer, charade) in re.findall(regex, annotation)
+            if charade.strip()
+            and charade.strip().lower() in clue.lower()
+            and answer.isupper()
+        ]
+        if charades:
+            sql = "INSERT INTO charades (clue_rowid, charade, answer) VALUES (?, ?, ?);"
+            write_cursor.executemany(sql, charades)
+
+
+def reference(conn: sqlite3.Connection, rows: list[tuple[int, str, str]]) -> None:
+    write_cursor = conn.cursor()
+    for (clue_row_id, clue, annotation) in rows:
+        if not annotation:
+            continue
+        reference_find_and_write_indicators(
+            clue_row_id, clue, annotation, INDICATOR_REGEXES, write_cursor
+        )
+        reference_find_and_write_charades(
+            clue_row_id, clue, annotation, CHARADE_REGEXES, write_cursor
+        )
+
+
+def new_database() -> sqlite3.Connection:
+    conn = sqlite3.connect(":memory:")
+    with open(INITIALIZE_DB_SQL, "r") as f:
+        conn.executescript(f.read())
+    return conn
+
+
+def dump(conn: sqlite3.Connection) -> tuple[list, list]:
+    return (
+        conn.execute("SELECT rowid, * FROM indicators ORDER BY rowid;").fetchall(),
+        conn.execute("SELECT rowid, * FROM charades ORDER BY rowid;").fetchall(),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database", type=str, default=SQLITE_DATABASE)
+    parser.add_argument("--limit", type=int, default=-1)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.database) as conn:
+        rows = conn.execute(
+            "SELECT rowid, clue, annotation FROM clues LIMIT ?;", (args.limit,)
+        ).fetchall()
+    print(f"{len(rows)} clues, {sum(bool(row[2]) for row in rows)} annotated")
+
+    timings = {}
+    results = {}
+    for name, func in [
+        ("reference", reference),
+        ("matcher", find_and_write_all),
+        (
+            f"matcher, {args.workers} workers",
+            lambda conn, rows: find_and_write_chunks(
+                conn, max(rowid for rowid, *_ in rows), workers=args.workers
+            ),
+        ),
+    ]:
+        conn = new_database()
+        conn.executemany(
+            "INSERT INTO clues (rowid, clue, annotation, source_url) VALUES (?, ?, ?, '');",
+            rows,
+        )
+        start = time.perf_counter()
+        func(conn, rows)
+        conn.commit()
+        timings[name] = time.perf_counter() - start
+        results[name] = dump(conn)
+        print(f"{name}: {timings[name]:.2f}s")
+
+    for name in list(timings)[1:]:
+        print(f"Speedup ({name}): {timings['reference'] / timings[name]:.1f}x")
+        if results[name] != results["reference"]:
+            print(f"Outputs differ ({name})!")
+            sys.exit(1)
+    print("Outputs are identical.")
@@ -0,0 +1,334 @@
+"""Benchmark the throughput (in posts per second) and peak memory of every
+detector and parser, and of parsing posts end to end with `try_parse`, over the
+generated corpus in benchmarks/corpus.py, and compare them against the
+baselines in benchmarks/parsers.json.
+
+Stages are timed separately:
+
+- document: parsing the HTML of every post with BeautifulSoup and
+  `pd.read_html`, which detectors and parsers share (see ParsedDocument).
+- is_parsable_*: running a detector over every post in the corpus, with the
+  HTML already parsed.
+- parse_*: running a parser over the posts written for it, with the HTML
+  already parsed.
+- end-to-end: `try_parse` on the raw HTML of every post, i.e. parsing the HTML,
+  trying detectors in the default order, parsing and postprocessing.
+
+Each stage is timed `--repeat` times, and the best time is reported. Peak
+memory is measured on a separate run with tracemalloc, which slows Python
+down, and so is not timed.
+
+Absolute throughput depends on the machine, so baselines store the throughput
+of each stage relative to that of the document stage (a fast machine parses
+HTML about as much faster as it runs the parsers), and stages are compared by
+that ratio. Baselines also record the versions of Python and of the parsing
+libraries they were measured with: ratios measured with other versions are only
+roughly comparable, so `--check` only fails if a ratio falls by more than a
+factor of `--tolerance`.
+
+Nothing is downloaded, so the benchmark runs offline. Before timing anything, it
+checks that every post is accepted by the detector of the parser it was written
+for, and exits if not.
+
+Usage: python benchmarks/parsers.py [--posts-per-parser N] [--repeat N] [--update] [--check]
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import warnings
+from typing import Any, Callable
+
+from corpus import Post, corpus_digest, generate_corpus
+
+from cryptics.config import PROJECT_DIR
+from cryptics.document import ParsedDocument
+from cryptics.parse import PARSERS, try_parse
+
+BASELINES = os.path.join(PROJECT_DIR, "benchmarks", "parsers.json")
+# Stage that the throughput of every stage is measured relative to.
+REFERENCE_STAGE = "document"
+# A stage fails the check if its relative throughput is less than its baseline
+# divided by this. Libraries speed up and slow down unevenly, so this is
+# generous.
+DEFAULT_TOLERANCE = 2.0
+# Libraries whose versions the baselines record.
+ENVIRONMENT_PACKAGES = ["beautifulsoup4", "html5lib", "lxml", "numpy", "pandas"]
+# try_parse logs every post at INFO level: don't.
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+def run_detector(
+    is_parsable_func: Callable[[ParsedDocument], bool],
+    documents: list[ParsedDocument],
+) -> tuple[int, int]:
+    """Return the number of posts accepted by a detector, and the number for
+    which it raised an error.
+    """
+    accepted = errors = 0
+    for document in documents:
+        try:
+            accepted += bool(is_parsable_func(document))
+        except Exception:
+            errors += 1
+    return accepted, errors
+
+
+def run_parser(
+    parse_func: Callable[[ParsedDocument], Any], documents: list[ParsedDocument]
+) -> tuple[int, int]:
+    """Return the number of clues parsed by a parser, and the number of posts
+    for which it raised an error.
+    """
+    clues = errors = 0
+    for document in documents:
+        try:
+            data = parse_func(document)
+        except Exception:
+            errors += 1
+            continue
+        clues += len(data) if data is not None else 0
+    return clues, errors
+
+
+def run_documents(posts: list[Post]) -> tuple[int, int]:
+    """Return the number of tables found in all posts, and the number of posts
+    that failed to parse.
+    """
+    tables = errors = 0
+    for post in posts:
+        document = ParsedDocument(post.html)
+        try:
+            document.soup
+            tables += len(document.tables)
+        except Exception:
+            errors += 1
+    return tables, errors
+
+
+def run_end_to_end(
+    posts: list[Post], used: collections.Counter | None = None
+) -> tuple[int, int]:
+    """Return the number of clues parsed from all posts with try_parse, and the
+    number of posts that failed to parse.
+
+    used: if not None, counts the posts parsed by each parser.
+    """
+    clues = errors = 0
+    for post in posts:
+        try:
+            data = try_parse(post.html, post.url, logger=logger)
+        except Exception:
+            errors += 1
+            continue
+        if data is None:
+            errors += 1
+            continue
+        clues += len(data)
+        if used is not None:
+            used[data.parser] += 1
+    return clues, errors
+
+
+def measure(
+    func: Callable[[], tuple[int, int]], repeat: int
+) -> tuple[float, float, tuple[int, int]]:
+    """Return the best time (in seconds) of `repeat` calls to `func`, the peak
+    memory allocated by one call (in KiB), and what it returned.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, (peak - current) / 1024, result
+
+
+def environment() -> dict[str, str]:
+    """Return the versions of Python and of the libraries that the throughput
+    of each stage (relative to the document stage) depends on.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    versions = {"python": platform.python_version()}
+    for package in ENVIRONMENT_PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = "not installed"
+    return versions
+
+
+def check_corpus(posts: list[Post], documents: list[ParsedDocument]) -> list[str]:
+    """Return a description of every post that is not accepted by the detector
+    of the parser it was written for.
+    """
+    detectors = {
+        parse_func.__name__: is_parsable_func
+        for is_parsable_func, parse_func in PARSERS
+    }
+    failures = []
+    for post, document in zip(posts, documents):
+        accepted, _ = run_detector(detectors[post.parser], [document])
+        if not accepted:
+            failures.append(f"{post.url} is not accepted by {post.parser}")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts-per-parser", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--check", action="store_true", help="Fail if throughput has regressed."
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Save these results as baselines."
+    )
+    args = parser.parse_args()
+
+    # Parsers warn about, e.g., chained assignment on the posts they parse.
+    warnings.simplefilter("ignore")
+
+    posts = generate_corpus(args.posts_per_parser)
+    digest = corpus_digest(posts)
+    # Parse every post's HTML once, up front, for the detectors and parsers. In
+    # some environments, pd.read_html raises errors other than ValueError for
+    # posts without tables, which detectors treat as not parsable.
+    documents = [ParsedDocument(post.html) for post in posts]
+    for document in documents:
+        document.soup
+        try:
+            document.tables
+        except Exception:
+            pass
+
+    failures = check_corpus(posts, documents)
+    if failures:
+        print("\n".join(["The corpus is not representative:", *failures]))
+        sys.exit(1)
+    # Detectors cache views of the posts (e.g. asset_body_with_newlines) that
+    # later detectors and parsers reuse, so compute them all before timing.
+    for is_parsable_func, _ in PARSERS:
+        run_detector(is_parsable_func, documents)
+
+    baselines: dict[str, Any] = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, "r") as f:
+            baselines = json.load(f)
+    if baselines.get("corpus") not in [None, digest]:
+        print(
+            f"The corpus ({digest}) differs from the one the baselines were "
+            f"measured on ({baselines['corpus']}), so they are not comparable."
+        )
+        baselines = {}
+    if any(
+        "relative_throughput" not in baseline
+        for baseline in baselines.get("stages", {}).values()
+    ):
+        print("The baselines store absolute throughput, so they are not comparable.")
+        baselines = {}
+    env = environment()
+    if baselines.get("environment") not in [None, env]:
+        print(
+            f"The baselines were measured with {baselines['environment']}, not "
+            f"{env}, so they are only roughly comparable."
+        )
+    print(f"{len(posts)} posts, corpus {digest}")
+
+    stages: dict[str, Callable[[], tuple[int, int]]] = {
+        "document": lambda: run_documents(posts)
+    }
+    num_posts = {"document": len(posts)}
+    for is_parsable_func, parse_func in PARSERS:
+        stages[is_parsable_func.__name__] = lambda func=is_parsable_func: run_detector(
+            func, documents
+        )
+        num_posts[is_parsable_func.__name__] = len(posts)
+    for is_parsable_func, parse_func in PARSERS:
+        parser_documents = [
+            document
+            for post, document in zip(posts, documents)
+            if post.parser == parse_func.__name__
+        ]
+        stages[parse_func.__name__] = lambda func=parse_func, docs=parser_documents: (
+            run_parser(func, docs)
+        )
+        num_posts[parse_func.__name__] = len(parser_documents)
+    stages["end-to-end"] = lambda: run_end_to_end(posts)
+    num_posts["end-to-end"] = len(posts)
+
+    results = {}
+    regressions = []
+    # The reference stage is first, so every other stage is relative to it.
+    assert next(iter(stages)) == REFERENCE_STAGE
+    for name, func in stages.items():
+        best, peak, (count, errors) = measure(func, args.repeat)
+        posts_per_second = num_posts[name] / best
+        if name == REFERENCE_STAGE:
+            reference_posts_per_second = posts_per_second
+        relative_throughput = posts_per_second / reference_posts_per_second
+        results[name] = {
+            "relative_throughput": round(relative_throughput, 3),
+            "peak_kib": round(peak),
+        }
+        baseline = baselines.get("stages", {}).get(name)
+        print(
+            f"{name}: {posts_per_second:.1f} posts/s"
+            + f" ({relative_throughput:.3f}x {REFERENCE_STAGE}), {peak:.0f}KiB peak"
+            + (
+                f" ({100 * (relative_throughput / baseline['relative_throughput'] - 1):+.0f}%"
+                f" relative throughput, {peak - baseline['peak_kib']:+.0f}KiB peak)"
+                if baseline is not None
+                else ""
+            )
+            + (f", {count} clues" if name.startswith("parse_") else "")
+            + (f", {errors} errors" if errors else "")
+        )
+        if (
+            baseline is not None
+            and relative_throughput * args.tolerance < baseline["relative_throughput"]
+        ):
+            regressions.append(
+                f"{name}: {relative_throughput:.3f}x {REFERENCE_STAGE}, less than "
+                f"1/{args.tolerance} of its baseline"
+            )
+
+    used: collections.Counter = collections.Counter()
+    run_end_to_end(posts, used=used)
+    print(
+        "Posts parsed end to end by: "
+        + ", ".join(f"{name} ({count})" for name, count in sorted(used.items()))
+    )
+
+    if args.update:
+        with open(BASELINES, "w") as f:
+            json.dump(
+                {"corpus": digest, "environment": env, "stages": results},
+                f,
+                indent=2,
+            )
+            f.write("\n")
+
+    if regressions:
+        print("\n".join(["", "Throughput has regressed:", *regressions]))
+        if args.check:
+            sys.exit(1)
@@ -0,0 +1,143 @@
+"""Benchmark the startup time of our scripts, i.e. the time it takes to import
+everything they import, as measured by `python -X importtime`, and compare it
+with the baselines in benchmarks/startup.json.
+
+Each script is run with `--help`, so that it exits as soon as its arguments are
+parsed. Heavy dependencies (see benchmarks/heavy_modules.py) should only be
+imported by the code paths that need them, so `--check` fails if a script
+imports one at startup. This is deterministic, so it is what CI checks.
+
+Timings depend on the machine (and on how busy it is), so regressions against
+the baselines are only reported, unless `--check-timings` is given. Use it to
+check for regressions locally, on the machine the baselines were saved on.
+
+Usage: python benchmarks/startup.py [--check] [--check-timings] [--update] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from heavy_modules import HEAVY_MODULES
+
+from cryptics.config import PROJECT_DIR
+
+BASELINES = os.path.join(PROJECT_DIR, "benchmarks", "startup.json")
+
+# Commands to time, by name.
+TARGETS = {
+    "cryptics.parse": ["-c", "import cryptics.parse"],
+    "cryptics.config": ["-c", "import cryptics.config"],
+    **{
+        f"cryptics/{script}.py": [os.path.join("cryptics", f"{script}.py"), "--help"]
+        for script in [
+            "build",
+            "compression",
+            "indicators",
+            "main",
+            "reparse",
+            "review",
+        ]
+    },
+}
+# A target has regressed if its startup time is more than this many times its
+# baseline.
+DEFAULT_TOLERANCE = 3.0
+
+
+def import_times(args: list[str]) -> tuple[dict[str, int], set[str]]:
+    """Run Python with `-X importtime`.
+
+    Returns the cumulative import time (in microseconds) of each module that it
+    imported directly (i.e. not as a dependency of another module), and the
+    names of all modules that it imported.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        # E.g. "import time:       228 |      21598 |   requests", where the
+        # name is indented by two spaces for each level of nesting.
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$", line)
+        if match is not None:
+            cumulative, indent, module = match.groups()
+            modules.add(module)
+            if not indent:
+                times[module] = int(cumulative)
+    return times, modules
+
+
+def measure(args: list[str], repeat: int) -> tuple[float, list[str]]:
+    """Return the best startup time (in milliseconds) of `repeat` runs, and the
+    heavy modules imported.
+    """
+    best = float("inf")
+    heavy: list[str] = []
+    for _ in range(repeat):
+        times, modules = import_times(args)
+        best = min(best, sum(times.values()) / 1000)
+        heavy = sorted(
+            {module.split(".")[0] for module in modules} & set(HEAVY_MODULES)
+        )
+    return best, heavy
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Fail if any script imports a heavy module at startup.",
+    )
+    parser.add_argument(
+        "--check-timings",
+        action="store_true",
+        help="Also fail if startup is slower than the baselines allow.",
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Save these timings as baselines."
+    )
+    args = parser.parse_args()
+
+    with open(BASELINES, "r") as f:
+        baselines = json.load(f)
+
+    timings = {}
+    heavy_imports = []
+    slow_startups = []
+    for name, target_args in TARGETS.items():
+        timings[name], heavy = measure(target_args, args.repeat)
+        baseline = baselines.get(name)
+        print(
+            f"{name}: {timings[name]:.1f}ms"
+            + (f" (baseline {baseline:.1f}ms)" if baseline is not None else "")
+            + (f", imports {', '.join(heavy)}" if heavy else "")
+        )
+        if heavy:
+            heavy_imports.append(f"{name} imports {', '.join(heavy)} at startup")
+        if baseline is not None and timings[name] > args.tolerance * baseline:
+            slow_startups.append(
+                f"{name} took {timings[name]:.1f}ms, more than {args.tolerance}x its baseline"
+            )
+
+    if args.update:
+        with open(BASELINES, "w") as f:
+            json.dump({name: round(t, 1) for name, t in timings.items()}, f, indent=2)
+            f.write("\n")
+
+    if heavy_imports or slow_startups:
+        print("\n".join(["", "Startup has regressed:", *heavy_imports, *slow_startups]))
+    if (args.check and heavy_imports) or (args.check_timings and slow_startups):
+        sys.exit(1)
@@ -4,9 +4,10 @@ import logging
 import re
 import sqlite3
 
-import requests
-
+from cryptics import http_client
+from cryptics.compression import RawCodec
 from cryptics.config import AMUSELABS_SOURCES, SQLITE_DATABASE
+from cryptics.database import initialize_db, insert_raw
 from cryptics.utils import get_logger, search
 
 
@@ -69,6 +70,9 @@ def load_rawc(rawc: str, amuseKey=None):
 if __name__ == "__main__":
     logger = get_logger()
 
+    with sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
+
     for source, urls in AMUSELABS_SOURCES.items():
         for url in urls:
             # Skip URL if already scraped
@@ -83,7 +87,7 @@ if __name__ == "__main__":
             logger.info(f"Requesting: {url}")
 
             # Get rawc
-            solver_response = requests.get(url)
+            solver_response = http_client.get(url)
             try:
                 cdn_url = search(
                     f"https?://\w*\.amuselabs\.com/[^ ]+embed=1", solver_response.text
@@ -93,7 +97,7 @@ if __name__ == "__main__":
                     f"This URL appears to be AmuseLabs CDN URL, not a webpage with an AmuseLabs embed: {url}"
                 )
                 cdn_url = url
-            cdn_response = requests.get(cdn_url)
+            cdn_response = http_client.get(cdn_url)
             rawc = search(f"rawc\s*=\s*'([^']+)'", cdn_response.text).group(1)
 
             # Get the "key" from the JavaScript
@@ -102,7 +106,7 @@ if __name__ == "__main__":
             ).group()
             base_url = "/".join(cdn_url.split("/")[:-1])
             js_url = base_url + "/" + js_url
-            js_response = requests.get(js_url)
+            js_response = http_client.get(js_url)
             matches = re.search(
                 r'var e=function\(e\)\{var t="(.*?)"',
                 js_response.content.decode("utf-8"),
@@ -116,9 +120,7 @@ if __name__ == "__main__":
             puz_json = load_rawc(rawc, amuseKey=amuseKey)
 
             with sqlite3.connect(SQLITE_DATABASE) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO raw (source, location, content_type, content) VALUES (?, ?, 'json', ?)",
-                    (source, url, json.dumps(puz_json)),
+                insert_raw(
+                    conn, RawCodec(conn), source, url, "json", json.dumps(puz_json)
                 )
                 conn.commit()
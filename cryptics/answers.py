@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import json
+import re
+import sqlite3
+import string
+import unicodedata
+from typing import Any, Callable, Iterator, Sequence
+
+# Characters that match any letter in a pattern.
+WILDCARDS = "?._"
+ALPHABET = string.ascii_uppercase
+
+ANSWER_INDEX_SQL = [
+    # Distinct normalized answers (see normalize_answer).
+    """
+    CREATE TABLE answers (
+        rowid INTEGER PRIMARY KEY,
+        answer TEXT NOT NULL UNIQUE,
+        length INTEGER NOT NULL,
+        signature TEXT NOT NULL,
+        letter_counts TEXT NOT NULL,
+        letter_mask INTEGER NOT NULL
+    );
+    """,
+    "CREATE INDEX answers_length_index ON answers (length);",
+    # To find anagrams, and (with a scan of only this index) subanagrams.
+    "CREATE INDEX answers_signature_index ON answers (signature);",
+    "CREATE INDEX answers_length_letter_mask_index ON answers (length, letter_mask, letter_counts);",
+    # Clues that each answer is the answer to.
+    """
+    CREATE TABLE answers_clues (
+        answer_rowid INTEGER NOT NULL REFERENCES answers (rowid),
+        clue_rowid INTEGER NOT NULL REFERENCES clues (rowid),
+        PRIMARY KEY (answer_rowid, clue_rowid)
+    ) WITHOUT ROWID;
+    """,
+    "CREATE INDEX answers_clues_clue_rowid_index ON answers_clues (clue_rowid);",
+    # Postings of answers by length, and letter at each (1-indexed) position.
+    """
+    CREATE TABLE answers_letters (
+        length INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        letter TEXT NOT NULL,
+        answer_rowid INTEGER NOT NULL REFERENCES answers (rowid),
+        PRIMARY KEY (length, position, letter, answer_rowid)
+    ) WITHOUT ROWID;
+    """,
+]
+
+
+def normalize_answer(answer: str | None) -> str:
+    """Normalize an answer (or pattern) for lookups, by removing accents, and
+    all characters that are not letters, and uppercasing the rest. E.g.
+    "Half-time" becomes "HALFTIME".
+    """
+    if answer is None:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", answer)
+    return re.sub(r"[^A-Z]", "", decomposed.upper())
+
+
+def signature(letters: str) -> str:
+    """Return the letters of a normalized answer in alphabetical order, which
+    all of its anagrams share. E.g. "RELEASE" becomes "AEEELRS".
+    """
+    return "".join(sorted(letters))
+
+
+def letter_counts(letters: str) -> str:
+    """Return the number of times that each letter of ALPHABET appears in a
+    normalized answer, as a base-36 digit per letter.
+    """
+    return "".join(
+        string.digits[count] if count < 10 else ALPHABET[count - 10]
+        for count in (min(letters.count(letter), 35) for letter in ALPHABET)
+    )
+
+
+def letter_mask(letters: str) -> int:
+    """Return a bitmask of the letters of ALPHABET that appear in a normalized
+    answer.
+    """
+    return sum(1 << ALPHABET.index(letter) for letter in set(letters))
+
+
+def _iter_answers_letters(
+    conn: sqlite3.Connection,
+) -> Iterator[tuple[int, int, str, int]]:
+    for rowid, answer in conn.execute("SELECT rowid, answer FROM answers;"):
+        for position, letter in enumerate(answer, start=1):
+            yield len(answer), position, letter, rowid
+
+
+def build_answer_index(conn: sqlite3.Connection) -> None:
+    """Create and populate the tables of ANSWER_INDEX_SQL from the `clues`
+    table. Answers are numbered in alphabetical order. The tables are not
+    committed.
+    """
+    functions: Sequence[Callable[[str], Any]] = [
+        normalize_answer,
+        signature,
+        letter_counts,
+        letter_mask,
+    ]
+    for function in functions:
+        conn.create_function(function.__name__, 1, function, deterministic=True)
+    for table in ["answers_letters", "answers_clues", "answers"]:
+        conn.execute(f"DROP TABLE IF EXISTS {table};")
+    for sql in ANSWER_INDEX_SQL:
+        conn.execute(sql)
+
+    conn.execute(
+        """
+        INSERT INTO answers (answer, length, signature, letter_counts, letter_mask)
+        SELECT
+            normalized,
+            LENGTH(normalized),
+            signature(normalized),
+            letter_counts(normalized),
+            letter_mask(normalized)
+        FROM (SELECT DISTINCT normalize_answer(answer) AS normalized FROM clues)
+        WHERE normalized != ''
+        ORDER BY normalized;
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO answers_clues (answer_rowid, clue_rowid)
+        SELECT answers.rowid, clues.rowid
+        FROM clues JOIN answers ON answers.answer = normalize_answer(clues.answer);
+        """
+    )
+    conn.executemany(
+        "INSERT INTO answers_letters (length, position, letter, answer_rowid) VALUES (?, ?, ?, ?);",
+        _iter_answers_letters(conn),
+    )
+
+
+def parse_pattern(pattern: str) -> tuple[int, list[tuple[int, str]]]:
+    """Parse a pattern of letters and wildcards (any of WILDCARDS), such as
+    "?A?E??E". Spaces, hyphens and apostrophes are ignored.
+
+    Returns the length of the pattern, and the (1-indexed) position and letter
+    of each of its letters.
+    """
+    pattern = re.sub(r"[\s'-]", "", pattern.upper())
+    if not pattern or not all(c.isalpha() or c in WILDCARDS for c in pattern):
+        raise ValueError(f"Invalid pattern: {pattern}")
+    letters = [
+        (position, normalize_answer(c))
+        for position, c in enumerate(pattern, start=1)
+        if c not in WILDCARDS
+    ]
+    if not all(len(letter) == 1 for _, letter in letters):
+        raise ValueError(f"Invalid pattern: {pattern}")
+    return len(pattern), letters
+
+
+def match_pattern(
+    conn: sqlite3.Connection, pattern: str, limit: int = 100
+) -> list[tuple[str, list[int]]]:
+    """Find answers that match a pattern (see parse_pattern), using the tables
+    built by build_answer_index.
+
+    Returns up to `limit` matching answers, in alphabetical order, each with
+    the rowids of its clues.
+    """
+    length, letters = parse_pattern(pattern)
+    if letters:
+        # Intersect the postings of each letter, which are contiguous ranges
+        # of the primary key of `answers_letters`.
+        answer_rowids = " INTERSECT ".join(
+            "SELECT answer_rowid FROM answers_letters WHERE length = ? AND position = ? AND letter = ?"
+            for _ in letters
+        )
+        params: list = [
+            x for position, letter in letters for x in (length, position, letter)
+        ]
+    else:
+        answer_rowids = "SELECT rowid FROM answers WHERE length = ?"
+        params = [length]
+
+    return _answers_with_clues(conn, answer_rowids, params, limit)
+
+
+def find_anagrams(
+    conn: sqlite3.Connection, letters: str, limit: int = 100
+) -> list[tuple[str, list[int]]]:
+    """Find answers that are anagrams of `letters`, using the tables built by
+    build_answer_index.
+
+    Returns up to `limit` answers, in alphabetical order, each with the rowids
+    of its clues.
+    """
+    return _answers_with_clues(
+        conn,
+        "SELECT rowid FROM answers WHERE signature = ?",
+        [signature(normalize_answer(letters))],
+        limit,
+    )
+
+
+def find_subanagrams(
+    conn: sqlite3.Connection, fodder: str, min_length: int = 3, limit: int = 100
+) -> list[tuple[str, list[int]]]:
+    """Find answers of at least `min_length` letters, all of whose letters are
+    in `fodder` (i.e. that are anagrams of some of its letters), using the
+    tables built by build_answer_index.
+
+    Returns up to `limit` answers, longest first and then in alphabetical
+    order, each with the rowids of its clues.
+    """
+    fodder = normalize_answer(fodder)
+    fodder_counts = letter_counts(fodder)
+    # Answers with any letter that is not in the fodder are excluded by their
+    # letter masks, and the rest by comparing their letter counts (whose
+    # base-36 digits sort in the same order as the counts). Answers are read
+    # longest first, until `limit` answers have been found and all answers of
+    # the same length as the last of them have been read.
+    candidates = conn.execute(
+        """
+        SELECT rowid, length, letter_counts FROM answers
+        WHERE length BETWEEN ? AND ? AND letter_mask & ? = 0
+        ORDER BY length DESC;
+        """,
+        (min_length, len(fodder), ~letter_mask(fodder) & (1 << len(ALPHABET)) - 1),
+    )
+    answer_rowids: list[tuple[int, int]] = []
+    for rowid, length, counts in candidates:
+        if len(answer_rowids) >= limit and length < answer_rowids[-1][0]:
+            break
+        if all(a <= b for a, b in zip(counts, fodder_counts)):
+            answer_rowids.append((length, rowid))
+    answer_rowids = sorted(answer_rowids, key=lambda x: (-x[0], x[1]))[:limit]
+
+    return _answers_with_clues(
+        conn,
+        "SELECT value FROM json_each(?)",
+        [json.dumps([rowid for _, rowid in answer_rowids])],
+        limit,
+        order_by="answers.length DESC, answers.rowid",
+    )
+
+
+def _answers_with_clues(
+    conn: sqlite3.Connection,
+    answer_rowids: str,
+    params: list,
+    limit: int,
+    order_by: str = "answers.rowid",
+) -> list[tuple[str, list[int]]]:
+    """Return the answers, and the rowids of their clues, of the answer rowids
+    selected by the SQL query `answer_rowids`.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT answers.answer, GROUP_CONCAT(answers_clues.clue_rowid)
+        FROM answers JOIN answers_clues ON answers_clues.answer_rowid = answers.rowid
+        WHERE answers.rowid IN ({answer_rowids})
+        GROUP BY answers.rowid
+        ORDER BY {order_by}
+        LIMIT ?;
+        """,
+        [*params, limit],
+    ).fetchall()
+    return [
+        (answer, [int(clue_rowid) for clue_rowid in clue_rowids.split(",")])
+        for answer, clue_rowids in rows
+    ]
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime
+import logging
+import os
+import sqlite3
+import subprocess
+import time
+from typing import Iterator, Sequence
+
+from cryptics.answers import build_answer_index
+from cryptics.config import PREPARE_DB_SQL, PUBLISHED_DATABASE, SQLITE_DATABASE
+from cryptics.utils import get_logger
+
+# Tables to copy from cryptics.sqlite3 into the published database, before it
+# is prepared for publication by PREPARE_DB_SQL.
+TABLES = [
+    "clues",
+    "indicators",
+    "indicators_unpivoted",
+    "indicators_consolidated",
+    "charades",
+    "charades_unpivoted",
+    "indicators_unpivoted_clues",
+    "charades_unpivoted_clues",
+]
+# Tables that PREPARE_DB_SQL rebuilds or drops, along with their indexes. Their
+# indexes are not copied, since they would only be built to be thrown away.
+PREPARED_TABLES = [
+    "clues",
+    "indicators_unpivoted",
+    "charades_unpivoted",
+    "indicators_unpivoted_clues",
+    "charades_unpivoted_clues",
+]
+
+# Full-text search indexes of the published database: table -> columns.
+FTS_TABLES = {
+    "clues": ["clue", "answer"],
+    "indicators": ["indicator"],
+    "charades": ["charade", "answer"],
+}
+
+LICENSE = (
+    "This dataset is made available under the Open Database License: "
+    "http://opendatacommons.org/licenses/odbl/1.0/. Any rights in individual "
+    "contents of the database are licensed under the Database Contents License: "
+    "http://opendatacommons.org/licenses/dbcl/1.0/"
+)
+
+
+@contextlib.contextmanager
+def _stage(
+    name: str, timings: dict[str, float], logger: logging.Logger
+) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    timings[name] = time.perf_counter() - start
+    logger.info(f"{name}: {timings[name]:.2f}s")
+
+
+def _last_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "log", "--format=%H", "-n", "1"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def copy_tables(
+    conn: sqlite3.Connection, tables: list[str], skip_indexes: Sequence[str] = ()
+) -> None:
+    """Copy tables, with their rowids, from the database attached as `source`.
+    Their indexes (except those of the tables in `skip_indexes`) are only
+    created once all rows have been copied.
+    """
+    for table in tables:
+        (sql,) = conn.execute(
+            "SELECT sql FROM source.sqlite_master WHERE type = 'table' AND name = ?;",
+            (table,),
+        ).fetchone()
+        conn.execute(sql)
+        columns = ", ".join(
+            f'"{name}"'
+            for _, name, *_ in conn.execute(f"PRAGMA source.table_info({table});")
+        )
+        if sql.rstrip().upper().endswith("WITHOUT ROWID"):
+            conn.execute(
+                f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM source.{table};"
+            )
+        else:
+            conn.execute(
+                f"INSERT INTO main.{table} (rowid, {columns}) SELECT rowid, {columns} FROM source.{table};"
+            )
+
+    indexed_tables = [table for table in tables if table not in skip_indexes]
+    for (sql,) in conn.execute(
+        "SELECT sql FROM source.sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join('?' for _ in indexed_tables)});",
+        indexed_tables,
+    ).fetchall():
+        conn.execute(sql)
+
+
+def enable_fts(conn: sqlite3.Connection, fts_tables: dict[str, list[str]]) -> None:
+    """Create and populate external content FTS5 indexes, as `sqlite-utils
+    enable-fts` does, so that Datasette detects them.
+    """
+    for table, columns in fts_tables.items():
+        column_list = ", ".join(f"[{column}]" for column in columns)
+        conn.execute(
+            f"CREATE VIRTUAL TABLE [{table}_fts] USING FTS5 ({column_list}, content=[{table}]);"
+        )
+        conn.execute(
+            f"INSERT INTO [{table}_fts] (rowid, {column_list}) SELECT rowid, {column_list} FROM [{table}];"
+        )
+
+
+def build(
+    source: str = SQLITE_DATABASE,
+    target: str = PUBLISHED_DATABASE,
+    vacuum: bool = True,
+    logger: logging.Logger | None = None,
+) -> dict[str, float]:
+    """Build the published database from cryptics.sqlite3.
+
+    Tables are copied with ATTACH and INSERT ... SELECT in a single
+    transaction. The database is then prepared for publication with
+    PREPARE_DB_SQL, indexed for answer lookups (see cryptics.answers) and for
+    full-text search, and vacuumed. The target is built without a journal,
+    since it is built from scratch and deleted if any stage fails.
+
+    source: path to the database to build from.
+    target: path to the database to build. It is overwritten if it exists.
+    vacuum: if True, vacuum the database once it is built.
+    logger: logger to use.
+
+    Returns the number of seconds that each stage of the build took.
+    """
+    if logger is None:
+        logger = get_logger()
+
+    timings: dict[str, float] = {}
+    if os.path.exists(target):
+        os.remove(target)
+
+    conn = sqlite3.connect(target, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF;")
+        conn.execute("PRAGMA synchronous = OFF;")
+        conn.execute("ATTACH DATABASE ? AS source;", (source,))
+
+        with _stage("Copy tables", timings, logger):
+            conn.execute("BEGIN;")
+            copy_tables(conn, TABLES, skip_indexes=PREPARED_TABLES)
+            conn.execute("COMMIT;")
+        conn.execute("DETACH DATABASE source;")
+
+        with _stage("Prepare for publication", timings, logger):
+            with open(PREPARE_DB_SQL, "r") as f:
+                conn.executescript(f"BEGIN;\n{f.read()}\nCOMMIT;")
+            conn.executemany(
+                "INSERT INTO metadata (key, value) VALUES (?, ?);",
+                [
+                    ("license", LICENSE),
+                    (
+                        "last_built",
+                        datetime.datetime.now(datetime.timezone.utc).strftime(
+                            "%a %b %d %H:%M:%S %Z %Y"
+                        ),
+                    ),
+                    ("last_commit", _last_commit()),
+                ],
+            )
+
+        with _stage("Answer index", timings, logger):
+            conn.execute("BEGIN;")
+            build_answer_index(conn)
+            conn.execute("COMMIT;")
+
+        with _stage("Full-text search", timings, logger):
+            conn.execute("BEGIN;")
+            enable_fts(conn, FTS_TABLES)
+            conn.execute("COMMIT;")
+
+        if vacuum:
+            with _stage("Vacuum", timings, logger):
+                conn.execute("VACUUM;")
+    except BaseException:
+        conn.close()
+        os.remove(target)
+        raise
+    conn.close()
+
+    logger.info(f"Built {target} in {sum(timings.values()):.2f}s")
+    return timings
+
+
+if __name__ == "__main__":
+    logger = get_logger()
+
+    parser = argparse.ArgumentParser(
+        description="Build the published database from cryptics.sqlite3."
+    )
+    parser.add_argument("--source", type=str, default=SQLITE_DATABASE)
+    parser.add_argument("--target", type=str, default=PUBLISHED_DATABASE)
+    parser.add_argument("--no-vacuum", action="store_false", dest="vacuum")
+    args = parser.parse_args()
+
+    build(source=args.source, target=args.target, vacuum=args.vacuum, logger=logger)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, NamedTuple, Sequence
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Fields of a ClueBatch that all of its clues share.
+BATCH_FIELDS = [
+    "source",
+    "puzzle_date",
+    "puzzle_name",
+    "puzzle_url",
+    "source_url",
+]
+
+
+class Clue(NamedTuple):
+    """One parsed clue. Fields that a parser does not find are None."""
+
+    clue_number: str | None
+    clue: str | None
+    answer: str | None
+    definition: str | None = None
+    annotation: str | None = None
+
+
+class ClueBatch:
+    """The clues parsed from one blog post (or puzzle), and the fields that they
+    all share, such as the puzzle name, which are stored once per batch rather
+    than once per clue.
+
+    This is what every parser returns. Use `to_dataframe` for a DataFrame view.
+
+    clues: parsed clues.
+    source, puzzle_date, puzzle_name, puzzle_url, source_url: fields shared by
+        all clues. See BATCH_FIELDS.
+    parser, parser_version: name and version of the parser that parsed the
+        post, if recorded by try_parse.
+    """
+
+    __slots__ = ["clues", *BATCH_FIELDS, "parser", "parser_version"]
+
+    def __init__(
+        self,
+        clues: Iterable[Clue] = (),
+        source: str | None = None,
+        puzzle_date: str | None = None,
+        puzzle_name: str | None = None,
+        puzzle_url: str | None = None,
+        source_url: str | None = None,
+        parser: str | None = None,
+        parser_version: int | None = None,
+    ):
+        self.clues = list(clues)
+        self.source = source
+        self.puzzle_date = puzzle_date
+        self.puzzle_name = puzzle_name
+        self.puzzle_url = puzzle_url
+        self.source_url = source_url
+        self.parser = parser
+        self.parser_version = parser_version
+
+    @classmethod
+    def from_columns(
+        cls,
+        clue_number: Sequence[Any],
+        clue: Sequence[Any],
+        answer: Sequence[Any],
+        definition: Sequence[Any] | None = None,
+        annotation: Sequence[Any] | None = None,
+        **fields: Any,
+    ) -> ClueBatch:
+        """Build a batch from parallel lists of clue fields, as most parsers
+        collect them. Raises a ValueError if the lists differ in length.
+
+        definition, annotation: if None, the field is None for every clue.
+        fields: fields shared by all clues (see __init__).
+        """
+        num_clues = len(clue)
+        columns = [
+            column if column is not None else [None] * num_clues
+            for column in [clue_number, clue, answer, definition, annotation]
+        ]
+        if any(len(column) != num_clues for column in columns):
+            raise ValueError(
+                f"Columns of clues differ in length: {[len(c) for c in columns]}"
+            )
+        return cls(map(Clue._make, zip(*columns)), **fields)
+
+    def __len__(self) -> int:
+        return len(self.clues)
+
+    def __iter__(self) -> Iterator[Clue]:
+        return iter(self.clues)
+
+    def __repr__(self) -> str:
+        return f"ClueBatch({len(self.clues)} clues, source_url={self.source_url!r})"
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the clues as a DataFrame, with a column for every field of
+        Clue and BATCH_FIELDS. The parser and parser version are in its
+        `attrs`.
+        """
+        import pandas as pd
+
+        data = pd.DataFrame(self.clues, columns=list(Clue._fields))
+        for field in BATCH_FIELDS:
+            data[field] = getattr(self, field)
+        data.attrs["parser"] = self.parser
+        data.attrs["parser_version"] = self.parser_version
+        return data
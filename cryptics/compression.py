@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+import time
+from typing import Any, NamedTuple
+
+from cryptics.utils import get_logger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+# Value of `raw.content_encoding` for zstd-compressed content. Uncompressed
+# content has a NULL content encoding.
+ZSTD = "zstd"
+# Content types that are stored (and read back) as text, rather than bytes.
+TEXT_CONTENT_TYPES = {"html", "json"}
+# zstd compression level for raw content. Content is compressed once and read
+# back rarely, so this favours size over speed.
+DEFAULT_LEVEL = 12
+# Size (in bytes) of the dictionaries trained for each source, and the maximum
+# number of rows to train them on.
+DEFAULT_DICTIONARY_SIZE = 112 * 1024
+DEFAULT_MAX_SAMPLES = 500
+
+
+def to_bytes(content: str | bytes) -> bytes:
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+
+class RawCodec:
+    """Compress and decompress the content of the `raw` table.
+
+    Content is compressed with zstd, using the most recently trained dictionary
+    of its source (if there is one). Blog posts from the same source share most
+    of their page chrome, so a dictionary trained on that source compresses
+    them much better than zstd alone. Dictionaries are stored in the
+    `raw_dictionaries` table, and each row of `raw` records the encoding and
+    dictionary its content was compressed with, so compressed and uncompressed
+    rows can coexist.
+
+    If zstandard is not installed, new content is stored uncompressed, and only
+    uncompressed content can be read.
+
+    conn: connection to the database to read dictionaries from.
+    level: zstd compression level.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, level: int = DEFAULT_LEVEL):
+        self.conn = conn
+        self.level = level
+        self._dictionary_ids: dict[str, int | None] = {}
+        self._compressors: dict[int | None, Any] = {}
+        self._decompressors: dict[int | None, Any] = {}
+
+    def _dictionary(self, dictionary_id: int | None) -> Any:
+        if dictionary_id is None:
+            return None
+        row = self.conn.execute(
+            "SELECT dictionary FROM raw_dictionaries WHERE dictionary_id = ?;",
+            (dictionary_id,),
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"No such dictionary: {dictionary_id}")
+        return zstandard.ZstdCompressionDict(row[0])
+
+    def _compressor(self, dictionary_id: int | None) -> Any:
+        if dictionary_id not in self._compressors:
+            self._compressors[dictionary_id] = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self._dictionary(dictionary_id)
+            )
+        return self._compressors[dictionary_id]
+
+    def _decompressor(self, dictionary_id: int | None) -> Any:
+        if dictionary_id not in self._decompressors:
+            self._decompressors[dictionary_id] = zstandard.ZstdDecompressor(
+                dict_data=self._dictionary(dictionary_id)
+            )
+        return self._decompressors[dictionary_id]
+
+    def dictionary_id(self, source: str) -> int | None:
+        """Return the ID of the dictionary to compress new content from
+        `source` with, or None if no dictionary has been trained for it.
+        """
+        if source not in self._dictionary_ids:
+            (self._dictionary_ids[source],) = self.conn.execute(
+                "SELECT MAX(dictionary_id) FROM raw_dictionaries WHERE source = ?;",
+                (source,),
+            ).fetchone()
+        return self._dictionary_ids[source]
+
+    def encode(
+        self, source: str, content: str | bytes
+    ) -> tuple[str | bytes, str | None, int | None]:
+        """Compress content for the `raw` table.
+
+        Returns a tuple of (content, content encoding, dictionary ID), i.e. the
+        values of the `content`, `content_encoding` and `dictionary_id` columns.
+        """
+        if zstandard is None:
+            return content, None, None
+        dictionary_id = self.dictionary_id(source)
+        compressed = self._compressor(dictionary_id).compress(to_bytes(content))
+        return compressed, ZSTD, dictionary_id
+
+    def decode(
+        self,
+        content_type: str,
+        content: str | bytes,
+        content_encoding: str | None,
+        dictionary_id: int | None,
+    ) -> str | bytes:
+        """Decompress content from the `raw` table. Content of a type in
+        TEXT_CONTENT_TYPES is returned as a string, and all else as bytes.
+        """
+        if content_encoding is None:
+            return content
+        if content_encoding != ZSTD:
+            raise ValueError(f"Unknown content encoding: {content_encoding}")
+        if zstandard is None:
+            raise RuntimeError("zstandard must be installed to read compressed content")
+
+        data = self._decompressor(dictionary_id).decompress(content)
+        return data.decode("utf-8") if content_type in TEXT_CONTENT_TYPES else data
+
+    def train(
+        self,
+        source: str,
+        dictionary_size: int = DEFAULT_DICTIONARY_SIZE,
+        max_samples: int = DEFAULT_MAX_SAMPLES,
+    ) -> int | None:
+        """Train a dictionary on the most recent content from `source`, and use
+        it to compress all new content from `source`.
+
+        Returns the ID of the new dictionary, or None if there was too little
+        content to train one on.
+        """
+        rows = self.conn.execute(
+            "SELECT content_type, content, content_encoding, dictionary_id FROM raw WHERE source = ? ORDER BY rowid DESC LIMIT ?;",
+            (source, max_samples),
+        ).fetchall()
+        samples: list[bytes | bytearray | memoryview] = [
+            to_bytes(self.decode(*row)) for row in rows
+        ]
+
+        try:
+            dictionary = zstandard.train_dictionary(dictionary_size, samples)
+        except zstandard.ZstdError:
+            return None
+
+        cursor = self.conn.execute(
+            "INSERT INTO raw_dictionaries (source, dictionary) VALUES (?, ?);",
+            (source, dictionary.as_bytes()),
+        )
+        self._dictionary_ids[source] = cursor.lastrowid
+        return cursor.lastrowid
+
+
+class CompressionReport(NamedTuple):
+    source: str
+    num_rows: int
+    bytes_before: int
+    bytes_after: int
+    read_throughput_before: float
+    read_throughput_after: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.source}: {self.num_rows} rows compressed, "
+            f"{self.bytes_before / 2**20:.1f} MiB -> {self.bytes_after / 2**20:.1f} MiB "
+            f"({self.bytes_before / max(self.bytes_after, 1):.1f}x), "
+            f"reads {self.read_throughput_before:.1f} MiB/s -> "
+            f"{self.read_throughput_after:.1f} MiB/s"
+        )
+
+
+def _content_size(conn: sqlite3.Connection, source: str) -> int:
+    (size,) = conn.execute(
+        "SELECT COALESCE(SUM(LENGTH(CAST(content AS BLOB))), 0) FROM raw WHERE source = ?;",
+        (source,),
+    ).fetchone()
+    return size
+
+
+def read_throughput(
+    conn: sqlite3.Connection, codec: RawCodec, source: str, max_rows: int = 1000
+) -> float:
+    """Measure how fast (in MiB of decompressed content per second) the most
+    recent `max_rows` rows of `source` can be read and decompressed.
+    """
+    start = time.perf_counter()
+    size = 0
+    for row in conn.execute(
+        "SELECT content_type, content, content_encoding, dictionary_id FROM raw WHERE source = ? ORDER BY rowid DESC LIMIT ?;",
+        (source, max_rows),
+    ):
+        size += len(to_bytes(codec.decode(*row)))
+    return size / 2**20 / max(time.perf_counter() - start, 1e-9)
+
+
+def compress_raw(
+    conn: sqlite3.Connection,
+    sources: list[str] | None = None,
+    level: int = DEFAULT_LEVEL,
+    dictionary_size: int = DEFAULT_DICTIONARY_SIZE,
+    max_samples: int = DEFAULT_MAX_SAMPLES,
+    batch_size: int = 256,
+    retrain: bool = False,
+    logger: logging.Logger | None = None,
+) -> list[CompressionReport]:
+    """Compress all uncompressed content in the `raw` table, training a new
+    dictionary for each source with uncompressed content first.
+
+    Each row is checked to decompress to its original content before it is
+    overwritten, and rows are committed `batch_size` at a time, so it is safe
+    to interrupt and rerun.
+
+    conn: connection to the database to compress.
+    sources: sources to compress. If None, compress all sources.
+    level: zstd compression level.
+    dictionary_size: size (in bytes) of the dictionaries to train.
+    max_samples: maximum number of rows to train each dictionary on.
+    batch_size: number of rows to compress per transaction.
+    retrain: if True, train a new dictionary for each source even if it has no
+        uncompressed content.
+    logger: logger to use.
+    """
+    if zstandard is None:
+        raise RuntimeError("zstandard must be installed to compress content")
+    if logger is None:
+        logger = get_logger()
+    if sources is None:
+        sources = [
+            source for source, in conn.execute("SELECT DISTINCT source FROM raw;")
+        ]
+
+    codec = RawCodec(conn, level=level)
+    reports = []
+    for source in sources:
+        bytes_before = _content_size(conn, source)
+        read_throughput_before = read_throughput(conn, codec, source)
+
+        # Otherwise, every run would add an unused dictionary.
+        (num_uncompressed,) = conn.execute(
+            "SELECT COUNT(*) FROM raw WHERE source = ? AND content_encoding IS NULL;",
+            (source,),
+        ).fetchone()
+        if num_uncompressed or retrain:
+            dictionary_id = codec.train(source, dictionary_size, max_samples)
+            conn.commit()
+            logger.info(f"Trained dictionary {dictionary_id} for {source}")
+
+        num_rows = 0
+        last_rowid = 0
+        while True:
+            rows = conn.execute(
+                "SELECT rowid, content_type, content FROM raw WHERE source = ? AND content_encoding IS NULL AND rowid > ? ORDER BY rowid LIMIT ?;",
+                (source, last_rowid, batch_size),
+            ).fetchall()
+            if not rows:
+                break
+
+            for rowid, content_type, content in rows:
+                compressed, encoding, dictionary_id = codec.encode(source, content)
+                decoded = codec.decode(
+                    content_type, compressed, encoding, dictionary_id
+                )
+                if to_bytes(decoded) != to_bytes(content):
+                    raise RuntimeError(f"Content did not survive compression: {rowid}")
+                conn.execute(
+                    "UPDATE raw SET content = ?, content_encoding = ?, dictionary_id = ? WHERE rowid = ?;",
+                    (compressed, encoding, dictionary_id, rowid),
+                )
+            conn.commit()
+            num_rows += len(rows)
+            last_rowid = rows[-1][0]
+            logger.info(f"Compressed {num_rows} rows from {source}")
+
+        report = CompressionReport(
+            source=source,
+            num_rows=num_rows,
+            bytes_before=bytes_before,
+            bytes_after=_content_size(conn, source),
+            read_throughput_before=read_throughput_before,
+            read_throughput_after=read_throughput(conn, codec, source),
+        )
+        logger.info(str(report))
+        reports.append(report)
+
+    return reports
+
+
+if __name__ == "__main__":
+    from cryptics.config import SQLITE_DATABASE
+    from cryptics.database import initialize_db
+
+    logger = get_logger()
+
+    parser = argparse.ArgumentParser(
+        description="Compress the content of the `raw` table with zstd."
+    )
+    parser.add_argument("--source", type=str, action="append", dest="sources")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL)
+    parser.add_argument("--dictionary-size", type=int, default=DEFAULT_DICTIONARY_SIZE)
+    parser.add_argument("--max-samples", type=int, default=DEFAULT_MAX_SAMPLES)
+    parser.add_argument(
+        "--retrain",
+        action="store_true",
+        help="Train new dictionaries even for sources with nothing to compress.",
+    )
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    with sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
+        reports = compress_raw(
+            conn,
+            sources=args.sources,
+            level=args.level,
+            dictionary_size=args.dictionary_size,
+            max_samples=args.max_samples,
+            retrain=args.retrain,
+            logger=logger,
+        )
+        bytes_before = sum(report.bytes_before for report in reports)
+        bytes_after = sum(report.bytes_after for report in reports)
+        print("\n".join(str(report) for report in reports))
+        print(f"Total: {bytes_before / 2**20:.1f} MiB -> {bytes_after / 2**20:.1f} MiB")
+
+        # Space freed by compression is only returned to the filesystem by a VACUUM.
+        if args.vacuum:
+            conn.execute("VACUUM;")
@@ -1,56 +1,70 @@
 from __future__ import annotations
 
 import datetime
+import importlib.util
 import json
 import re
 from os.path import abspath, dirname, join
-from typing import Callable, Generator
-
-import bs4
-import requests
+from typing import TYPE_CHECKING, Callable, Generator
 
 from cryptics.utils import filter_strings_by_keyword
 
+if TYPE_CHECKING:
+    import bs4
+
+    from cryptics.database import SitemapState
+
 PROJECT_DIR = dirname(dirname(abspath(__file__)))
 
 TESTS_DIR = join(PROJECT_DIR, "tests")
 TESTS_DATA_DIR = join(PROJECT_DIR, "tests/data")
 INITIALIZE_DB_SQL = join(PROJECT_DIR, "queries", "initialize-db.sql")
+PREPARE_DB_SQL = join(PROJECT_DIR, "queries", "prepare-db-for-publication.sql")
 SQLITE_DATABASE = join(PROJECT_DIR, "cryptics.sqlite3")
+PUBLISHED_DATABASE = join(PROJECT_DIR, "data.sqlite3")
 
-# HTTP headers to use when scraping websites.
+# HTTP headers to use when scraping websites. These are set once, on the shared
+# session in cryptics.http_client. Responses are only brotli-compressed if we
+# can decode them.
 HEADERS = {
     "User-Agent": "cryptics.georgeho.org bot (https://cryptics.georgeho.org/)",
-    "Accept-Encoding": "gzip",
+    "Accept-Encoding": (
+        "gzip, deflate, br" if importlib.util.find_spec("brotli") else "gzip, deflate"
+    ),
 }
 
-# Names of blog sources and functions returning new URLs to scrape (given known URLs).
-BLOG_SOURCES: dict[str, Callable[[set[str]], set[str]]] = {
-    "bigdave44": lambda known_urls: get_new_urls_from_nested_sitemaps(
+# Names of blog sources and functions returning new URLs to scrape (given known
+# URLs and, optionally, a SitemapState to skip unchanged sitemaps with).
+BLOG_SOURCES: dict[str, Callable[..., set[str]]] = {
+    "bigdave44": lambda known_urls, sitemap_state=None: get_new_urls_from_nested_sitemaps(
         "http://bigdave44.com/sitemap-index-1.xml",
         r"http://bigdave44.com/sitemap-[0-9]*.xml",
         known_urls,
+        sitemap_state=sitemap_state,
     ),
-    "fifteensquared": lambda known_urls: get_new_urls_from_nested_sitemaps(
+    "fifteensquared": lambda known_urls, sitemap_state=None: get_new_urls_from_nested_sitemaps(
         "https://www.fifteensquared.net/wp-sitemap.xml",
         r"https://www.fifteensquared.net/wp-sitemap-posts-post-[0-9]*.xml",
         known_urls,
+        sitemap_state=sitemap_state,
     ),
     # Hex (a.k.a. Emily Cox & Henry Rathvon) only publish a cryptic in the
     # National Post on Saturdays. On all other days, the blog reviews other
     # cryptics (usually The Daily Telegraph, for which we have bigdave44).
-    "natpostcryptic": lambda known_urls: filter_strings_by_keyword(
+    "natpostcryptic": lambda known_urls, sitemap_state=None: filter_strings_by_keyword(
         get_new_urls_from_nested_sitemaps(
             "https://natpostcryptic.blogspot.com/sitemap.xml",
             r"https://natpostcryptic.blogspot.com/sitemap.xml\?page=[0-9]*",
             known_urls,
+            sitemap_state=sitemap_state,
         ),
         ["saturday", "cox", "rathvon"],
     ),
-    "thehinducrosswordcorner": lambda known_urls: get_new_urls_from_nested_sitemaps(
+    "thehinducrosswordcorner": lambda known_urls, sitemap_state=None: get_new_urls_from_nested_sitemaps(
         "https://thehinducrosswordcorner.blogspot.com/sitemap.xml",
         r"https://thehinducrosswordcorner.blogspot.com/sitemap.xml\?page=[0-9]*",
         known_urls,
+        sitemap_state=sitemap_state,
     ),
     # As of May 15, 2022, Times for the Times has migrated from
     # times-xwd-times.livejournal.com to timesforthetimes.co.uk See
@@ -59,21 +73,23 @@ BLOG_SOURCES: dict[str, Callable[[set[str]], set[str]]] = {
     #     "https://times-xwd-times.livejournal.com/sitemap.xml",
     #     known_urls,
     # ),
-    "1across": lambda known_urls: filter_strings_by_keyword(
+    "1across": lambda known_urls, sitemap_state=None: filter_strings_by_keyword(
         get_new_urls_from_nested_sitemaps(
             "https://www.1across.org/sitemap.xml",
             r"https://www.1across.org/sitemap-[0-9]*.xml",
             known_urls,
+            sitemap_state=sitemap_state,
         ),
         ["solutions", "annotations"],
     ),
     # thenationcryptic only publishes solutions on blog posts titled "Solution"
     # (mainly for The Nation puzzles).
-    "thenationcryptic": lambda known_urls: filter_strings_by_keyword(
+    "thenationcryptic": lambda known_urls, sitemap_state=None: filter_strings_by_keyword(
         get_new_urls_from_nested_sitemaps(
             "https://thenationcryptic.blogspot.com/sitemap.xml",
             r"https://thenationcryptic.blogspot.com/sitemap.xml\?page=[0-9]*",
             known_urls,
+            sitemap_state=sitemap_state,
         ),
         ["solution", "solutions"],
     ),
@@ -81,12 +97,50 @@ BLOG_SOURCES: dict[str, Callable[[set[str]], set[str]]] = {
 
 
 def get_new_urls_from_sitemap(
-    sitemap_url: str, known_urls: set[str], headers: dict[str, str] = HEADERS
+    sitemap_url: str,
+    known_urls: set[str],
+    headers: dict[str, str] | None = None,
+    sitemap_state: SitemapState | None = None,
+    lastmod: str | None = None,
 ) -> set[str]:
-    response = requests.get(sitemap_url, headers=headers)
+    """Return the URLs in a sitemap that are not already known.
+
+    If a sitemap_state is given, the sitemap is requested with a conditional
+    GET, and nothing is returned if it has not changed since it was last
+    scraped. Its new validators (and `lastmod`, from the sitemap index) are
+    then set on the sitemap_state, along with the new URLs. A
+    PendingSitemapState only saves them once those URLs have been scraped.
+    """
+    headers = dict(headers) if headers is not None else {}
+    if sitemap_state is not None:
+        validators = sitemap_state.get(sitemap_url)
+        if validators is not None and validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators is not None and validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+
+    import bs4
+
+    from cryptics import http_client
+
+    response = http_client.get(sitemap_url, headers=headers or None)
+    if sitemap_state is not None and response.status_code == 304:
+        if validators is not None:
+            sitemap_state.set(sitemap_url, lastmod, *validators[1:])
+        return set()
+
     soup = bs4.BeautifulSoup(response.text, "lxml")
     urls = {url.text for url in soup.find_all("loc")}
     new_urls = set(urls - known_urls)
+
+    if sitemap_state is not None and response.ok:
+        sitemap_state.set(
+            sitemap_url,
+            lastmod=lastmod,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            new_urls=new_urls,
+        )
     return new_urls
 
 
@@ -94,28 +148,58 @@ def get_new_urls_from_nested_sitemaps(
     sitemap_url: str,
     nested_sitemap_regex: str,
     known_urls: set[str],
-    headers: dict[str, str] = HEADERS,
+    headers: dict[str, str] | None = None,
+    sitemap_state: SitemapState | None = None,
 ) -> set[str]:
-    response = requests.get(sitemap_url, headers=headers)
+    """Return the URLs in all nested sitemaps of a sitemap index that are not
+    already known.
+
+    If a sitemap_state is given, nested sitemaps whose `<lastmod>` in the index
+    is unchanged since they were last scraped are skipped entirely, and the
+    rest are requested with conditional GETs. Use a PendingSitemapState, which
+    only saves validators once the URLs found in their sitemap have been
+    scraped, so that URLs that fail to be scraped are found again.
+    """
+    import bs4
+
+    from cryptics import http_client
+
+    response = http_client.get(sitemap_url, headers=headers)
     soup = bs4.BeautifulSoup(response.text, "lxml")
-    nested_sitemaps = set(
-        reversed(
-            [
-                sitemap.text
-                for sitemap in soup.find_all("loc")
-                if re.search(nested_sitemap_regex, sitemap.text)
-            ]
-        )
-    )
+    nested_sitemaps = {
+        sitemap.text: _get_lastmod(sitemap)
+        for sitemap in reversed(soup.find_all("loc"))
+        if re.search(nested_sitemap_regex, sitemap.text)
+    }
 
     new_urls = set()
-    for nested_sitemap_url in nested_sitemaps:
-        new_urls_ = get_new_urls_from_sitemap(nested_sitemap_url, known_urls, headers)
+    for nested_sitemap_url, lastmod in nested_sitemaps.items():
+        if sitemap_state is None:
+            new_urls_ = get_new_urls_from_sitemap(
+                nested_sitemap_url, known_urls, headers
+            )
+        else:
+            validators = sitemap_state.get(nested_sitemap_url)
+            if lastmod and validators is not None and validators.lastmod == lastmod:
+                continue
+            new_urls_ = get_new_urls_from_sitemap(
+                nested_sitemap_url,
+                known_urls,
+                headers,
+                sitemap_state=sitemap_state,
+                lastmod=lastmod,
+            )
         new_urls.update(new_urls_)
 
     return new_urls
 
 
+def _get_lastmod(loc: bs4.Tag) -> str | None:
+    """Return the text of the <lastmod> next to a <loc> in a sitemap, if any."""
+    lastmod = loc.find_next_sibling("lastmod")
+    return lastmod.text.strip() if lastmod is not None else None
+
+
 def generate_newyorker_urls() -> Generator[str, None, None]:
     # The date The New Yorker published their first cryptic crossword.
     start_date = datetime.date(2021, 6, 27)
@@ -0,0 +1,561 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from collections import defaultdict
+from types import TracebackType
+from typing import Any, Iterable, Iterator, NamedTuple
+from urllib.parse import urlparse
+
+from cryptics.clues import BATCH_FIELDS, Clue, ClueBatch
+from cryptics.compression import RawCodec, to_bytes
+from cryptics.config import INITIALIZE_DB_SQL
+
+# Columns of the `clues` table that parsers populate, in insertion order.
+CLUES_COLUMNS = [
+    "source",
+    "clue",
+    "answer",
+    "definition",
+    "annotation",
+    "clue_number",
+    "puzzle_date",
+    "puzzle_name",
+    "puzzle_url",
+    "source_url",
+]
+
+# Columns of the `clues` table that identify a clue. Clues with the same values
+# of all of these columns are duplicates.
+CLUE_IDENTITY_COLUMNS = [
+    "source_url",
+    "clue",
+    "answer",
+    "definition",
+    "clue_number",
+    "puzzle_date",
+    "puzzle_name",
+    "puzzle_url",
+]
+
+
+def clue_hash(*values: Any) -> str:
+    """Return the hash of a clue's CLUE_IDENTITY_COLUMNS, in that order.
+
+    Values are hashed as they are stored in the (TEXT) columns of `clues`, so
+    that the hash of a clue is the same before and after it is written.
+    """
+    identity = [None if value is None else str(value) for value in values]
+    return hashlib.sha256(
+        json.dumps(identity, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def _add_clue_hashes(conn: sqlite3.Connection) -> None:
+    """Add the `clue_hash` column to an existing `clues` table, deleting all but
+    the first of any duplicate clues, so that its unique index can be created.
+    """
+    clues_columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(clues);")}
+    if not clues_columns or "clue_hash" in clues_columns:
+        return
+
+    conn.create_function("clue_hash", len(CLUE_IDENTITY_COLUMNS), clue_hash)
+    conn.execute("ALTER TABLE clues ADD COLUMN clue_hash TEXT DEFAULT NULL;")
+    conn.execute(
+        f"UPDATE clues SET clue_hash = clue_hash({', '.join(CLUE_IDENTITY_COLUMNS)});"
+    )
+    conn.execute(
+        "DELETE FROM clues WHERE rowid NOT IN (SELECT MIN(rowid) FROM clues GROUP BY clue_hash);"
+    )
+
+
+def initialize_db(conn: sqlite3.Connection) -> None:
+    """Create any missing tables and indexes, and migrate existing tables. This
+    commits any pending transaction.
+    """
+    _add_clue_hashes(conn)
+    with open(INITIALIZE_DB_SQL, "r") as f:
+        conn.executescript(f.read())
+
+    # Add columns that were added to existing tables after they were created.
+    raw_columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(raw);")}
+    if "content_encoding" not in raw_columns:
+        conn.execute("ALTER TABLE raw ADD COLUMN content_encoding TEXT DEFAULT NULL;")
+    if "dictionary_id" not in raw_columns:
+        conn.execute(
+            "ALTER TABLE raw ADD COLUMN dictionary_id INTEGER DEFAULT NULL REFERENCES raw_dictionaries (dictionary_id);"
+        )
+    parse_results_columns = {
+        name for _, name, *_ in conn.execute("PRAGMA table_info(parse_results);")
+    }
+    if "failed_parser_version" not in parse_results_columns:
+        conn.execute(
+            "ALTER TABLE parse_results ADD COLUMN failed_parser_version INTEGER DEFAULT NULL;"
+        )
+    conn.commit()
+
+
+def insert_raw(
+    conn: sqlite3.Connection,
+    codec: RawCodec,
+    source: str,
+    location: str,
+    content_type: str,
+    content: str | bytes,
+) -> None:
+    """Compress content and insert it into the `raw` table. The insert is not
+    committed.
+    """
+    content, content_encoding, dictionary_id = codec.encode(source, content)
+    conn.execute(
+        "INSERT INTO raw (source, location, content_type, content, content_encoding, dictionary_id) VALUES (?, ?, ?, ?, ?, ?);",
+        (source, location, content_type, content, content_encoding, dictionary_id),
+    )
+
+
+def _raw_filter(
+    content_type: str,
+    source: str | None,
+    datetime_requested: str | None,
+    is_parsed: bool | None,
+) -> tuple[str, list[Any]]:
+    clauses = ["content_type = ?"]
+    params: list[Any] = [content_type]
+    if source is not None:
+        clauses.insert(0, "source = ?")
+        params.insert(0, source)
+    if is_parsed is not None:
+        clauses.append("is_parsed = ?")
+        params.append(is_parsed)
+    if datetime_requested is not None:
+        clauses.append("datetime_requested >= ?")
+        params.append(datetime_requested)
+    return " AND ".join(clauses), params
+
+
+def count_raw(
+    conn: sqlite3.Connection,
+    content_type: str,
+    source: str | None = None,
+    datetime_requested: str | None = None,
+    is_parsed: bool | None = False,
+) -> int:
+    """Count the rows of the `raw` table that `iter_raw` would yield."""
+    where, params = _raw_filter(content_type, source, datetime_requested, is_parsed)
+    (count,) = conn.execute(
+        f"SELECT COUNT(*) FROM raw WHERE {where};", params
+    ).fetchone()
+    return count
+
+
+def iter_raw(
+    conn: sqlite3.Connection,
+    content_type: str,
+    source: str | None = None,
+    datetime_requested: str | None = None,
+    is_parsed: bool | None = False,
+    chunk_size: int = 256,
+) -> Iterator[tuple[int, str, str, Any]]:
+    """Yield `(rowid, source, location, content)` rows of the `raw` table, in
+    rowid order.
+
+    Rows are read `chunk_size` at a time, using keyset pagination on the rowid,
+    so memory use is bounded no matter how many rows match. Each chunk is found
+    using only the `raw` table's indexes, and only then is its content read.
+    Since no query is left open between chunks, it is safe to write to the
+    database (e.g. to mark rows as parsed) while iterating. Compressed content
+    is decompressed.
+
+    conn: connection to the database to read from.
+    content_type: content type of rows to read, e.g. "html".
+    source: if not None, only read rows from this source.
+    datetime_requested: if not None, only read rows requested on or after
+        this date.
+    is_parsed: if not None, only read rows that have (or have not) been parsed.
+    chunk_size: number of rows to read at a time.
+    """
+    where, params = _raw_filter(content_type, source, datetime_requested, is_parsed)
+    codec = RawCodec(conn)
+    last_rowid = 0
+    while True:
+        rowids = [
+            rowid
+            for rowid, in conn.execute(
+                f"SELECT rowid FROM raw WHERE {where} AND rowid > ? ORDER BY rowid LIMIT ?;",
+                params + [last_rowid, chunk_size],
+            )
+        ]
+        if not rowids:
+            return
+
+        for rowid in rowids:
+            row = conn.execute(
+                "SELECT source, location, content_type, content, content_encoding, dictionary_id FROM raw WHERE rowid = ?;",
+                (rowid,),
+            ).fetchone()
+            if row is not None:
+                row_source, location, *encoded = row
+                yield rowid, row_source, location, codec.decode(*encoded)
+        last_rowid = rowids[-1]
+
+
+def read_raw(conn: sqlite3.Connection, location: str) -> tuple[str, Any] | None:
+    """Return the `(source, content)` of a row of the `raw` table, or None if
+    there is no such row. Compressed content is decompressed.
+    """
+    row = conn.execute(
+        "SELECT source, content_type, content, content_encoding, dictionary_id FROM raw WHERE location = ?;",
+        (location,),
+    ).fetchone()
+    if row is None:
+        return None
+    source, *encoded = row
+    return source, RawCodec(conn).decode(*encoded)
+
+
+def content_sha256(content: str | bytes) -> str:
+    """Return the SHA-256 of (decompressed) raw content, as a hex string."""
+    return hashlib.sha256(to_bytes(content)).hexdigest()
+
+
+class SitemapValidators(NamedTuple):
+    lastmod: str | None
+    etag: str | None
+    last_modified: str | None
+
+
+class SitemapState:
+    """Persisted validators (i.e. `<lastmod>`, ETag and Last-Modified) of the
+    sitemaps we have scraped, stored in the `sitemaps` table.
+
+    Sitemaps are discovered from worker threads, so each method uses its own
+    short-lived connection rather than sharing one.
+
+    database: path to the database.
+    """
+
+    def __init__(self, database: str):
+        self.database = database
+
+    def get(self, location: str) -> SitemapValidators | None:
+        with sqlite3.connect(self.database) as conn:
+            row = conn.execute(
+                "SELECT lastmod, etag, last_modified FROM sitemaps WHERE location = ?;",
+                (location,),
+            ).fetchone()
+        return SitemapValidators(*row) if row is not None else None
+
+    def set(
+        self,
+        location: str,
+        lastmod: str | None,
+        etag: str | None,
+        last_modified: str | None,
+        new_urls: Iterable[str] = (),
+    ) -> None:
+        """Save the validators of a sitemap.
+
+        new_urls: URLs found in the sitemap that were not already known. See
+            PendingSitemapState.
+        """
+        with sqlite3.connect(self.database) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sitemaps (location, lastmod, etag, last_modified, datetime_checked) VALUES (?, ?, ?, ?, datetime('now'));",
+                (location, lastmod, etag, last_modified),
+            )
+
+
+class PendingSitemapState(SitemapState):
+    """A SitemapState that holds back the validators of sitemaps until the new
+    URLs found in them have been scraped.
+
+    Once a sitemap's validators are saved, its unchanged URLs are not found
+    again. So if they were saved as soon as the sitemap was requested, posts
+    that then failed to download (or were never requested, because the scraper
+    stopped) would never be scraped. Instead, `set` only records validators, and
+    `save` saves those of sitemaps none of whose new URLs failed to be scraped.
+
+    database: path to the database.
+    """
+
+    def __init__(self, database: str):
+        super().__init__(database)
+        self._pending: dict[str, tuple[SitemapValidators, set[str]]] = {}
+
+    def set(
+        self,
+        location: str,
+        lastmod: str | None,
+        etag: str | None,
+        last_modified: str | None,
+        new_urls: Iterable[str] = (),
+    ) -> None:
+        self._pending[location] = (
+            SitemapValidators(lastmod, etag, last_modified),
+            set(new_urls),
+        )
+
+    def save(self, failed_urls: Iterable[str]) -> None:
+        """Save the validators of all sitemaps none of whose new URLs are in
+        `failed_urls`, and discard the rest.
+        """
+        failed_urls = set(failed_urls)
+        for location, (validators, new_urls) in self._pending.items():
+            if not new_urls & failed_urls:
+                super().set(location, *validators)
+        self._pending.clear()
+
+
+def url_pattern(url: str) -> str:
+    """Return the pattern of a blog post's URL, i.e. the part of the last path
+    segment before any digits. For example, both
+    https://timesforthetimes.co.uk/times-cryptic-28123 and
+    https://timesforthetimes.co.uk/times-cryptic-28124 have the pattern
+    "times-cryptic".
+    """
+    path = urlparse(url).path.rstrip("/")
+    slug = path.rsplit("/", 1)[-1]
+    return re.match(r"[^0-9]*", slug).group().strip("-_")  # type: ignore[union-attr]
+
+
+class ParserStats:
+    """How often each parser has parsed (hits) or failed to parse (misses) the
+    blog posts of each source and URL pattern, stored in the `parser_stats`
+    table.
+
+    This is used to try the parsers most likely to parse a blog post first:
+    first those that have parsed posts with the same URL pattern, then those
+    that have parsed posts from the same source, each in order of their hits.
+
+    Note that when more than one parser can parse a post, trying them out of
+    the default order can change which one does. This is why adaptive dispatch
+    is off by default, and why the order should be taken from a `snapshot` that
+    does not change during a run.
+    """
+
+    def __init__(self):
+        self._counts: dict[tuple[str, str, str], list[int]] = defaultdict(
+            lambda: [0, 0]
+        )
+        self._pending: dict[tuple[str, str, str], list[int]] = defaultdict(
+            lambda: [0, 0]
+        )
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> ParserStats:
+        stats = cls()
+        for source, pattern, parser, hits, misses in conn.execute(
+            "SELECT source, url_pattern, parser, hits, misses FROM parser_stats;"
+        ):
+            stats._counts[source, pattern, parser] = [hits, misses]
+        return stats
+
+    def save(self, conn: sqlite3.Connection) -> None:
+        """Add hits and misses recorded since the last save to the
+        `parser_stats` table. This is not committed.
+        """
+        conn.executemany(
+            "INSERT INTO parser_stats (source, url_pattern, parser, hits, misses) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (source, url_pattern, parser) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses;",
+            [(*key, hits, misses) for key, (hits, misses) in self._pending.items()],
+        )
+        self._pending.clear()
+
+    def snapshot(self) -> ParserStats:
+        """Return a copy of these stats (without any pending hits and misses),
+        which later calls to `record` do not change.
+        """
+        stats = ParserStats()
+        for key, counts in self._counts.items():
+            stats._counts[key] = list(counts)
+        return stats
+
+    def record(
+        self, source: str, url: str, attempts: Iterable[tuple[str, bool]]
+    ) -> None:
+        """Record the attempts (i.e. tuples of parser name and whether it parsed
+        the post) made to parse a blog post.
+        """
+        pattern = url_pattern(url)
+        for parser, is_hit in attempts:
+            for counts in (
+                self._counts[source, pattern, parser],
+                self._pending[source, pattern, parser],
+            ):
+                counts[0 if is_hit else 1] += 1
+
+    def order(self, source: str, url: str) -> list[str]:
+        """Return the names of the parsers that have parsed posts similar to
+        this one, most likely first.
+        """
+        pattern = url_pattern(url)
+        pattern_hits: dict[str, int] = defaultdict(int)
+        source_hits: dict[str, int] = defaultdict(int)
+        for (row_source, row_pattern, parser), (hits, _) in self._counts.items():
+            if row_source == source and hits:
+                source_hits[parser] += hits
+                if row_pattern == pattern:
+                    pattern_hits[parser] += hits
+
+        order = sorted(pattern_hits, key=pattern_hits.__getitem__, reverse=True)
+        return order + sorted(
+            (parser for parser in source_hits if parser not in pattern_hits),
+            key=source_hits.__getitem__,
+            reverse=True,
+        )
+
+    def hits_and_misses(self) -> dict[str, tuple[int, int]]:
+        """Return the total hits and misses of each parser."""
+        totals: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+        for (_, _, parser), (hits, misses) in self._counts.items():
+            totals[parser][0] += hits
+            totals[parser][1] += misses
+        return {parser: (hits, misses) for parser, (hits, misses) in totals.items()}
+
+
+class ClueWriter:
+    """Write parsed clues to the `clues` table in bulk.
+
+    Clues are inserted with a prepared `executemany` over a single connection,
+    and committed every `commit_every` posts or every `commit_interval` seconds,
+    whichever comes first. A post's clues, its `raw.is_parsed` flag and its
+    `parse_results` row are always written in the same transaction, so that a
+    crash can never leave clues behind without their flag set (or vice versa).
+
+    Clues that are already in the `clues` table (i.e. that have the same
+    clue_hash as a clue in it) are skipped, so writing the same clues twice is
+    harmless.
+
+    Use as a context manager: pending writes are committed on a clean exit, and
+    rolled back if an exception is raised.
+
+    conn: connection to the database to write to.
+    commit_every: maximum number of posts per transaction.
+    commit_interval: maximum number of seconds between commits.
+    """
+
+    INSERT_CLUES_SQL = (
+        f"INSERT INTO clues ({', '.join(CLUES_COLUMNS)}, clue_hash) "
+        f"VALUES ({', '.join('?' for _ in CLUES_COLUMNS)}, ?) "
+        "ON CONFLICT (clue_hash) DO NOTHING;"
+    )
+    MARK_PARSED_SQL = "UPDATE raw SET is_parsed = TRUE, datetime_parsed = datetime('now') WHERE location = ?;"
+    RECORD_PARSE_RESULT_SQL = "INSERT OR REPLACE INTO parse_results (location, content_sha256, parser, parser_version, datetime_parsed) VALUES (?, ?, ?, ?, datetime('now'));"
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        commit_every: int = 100,
+        commit_interval: float = 10.0,
+    ):
+        self.conn = conn
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.num_pending = 0
+        self._last_commit = time.monotonic()
+
+    def __enter__(self) -> ClueWriter:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.conn.rollback()
+
+    def write(
+        self,
+        data: ClueBatch,
+        location: str | None = None,
+        content_sha256: str | None = None,
+    ) -> None:
+        """Write one post's clues and, if given, mark its raw content as parsed.
+
+        data: parsed clues. Duplicate clues are skipped.
+        location: location (i.e. primary key) of the post in the `raw` table.
+        content_sha256: if not None, SHA-256 of the post's raw content. The
+            parser (and parser version) that parsed it, as recorded in `data`
+            by try_parse, are recorded in `parse_results`.
+        """
+        rows = batch_to_rows(data)
+        identity_indexes = [CLUES_COLUMNS.index(c) for c in CLUE_IDENTITY_COLUMNS]
+        self.conn.executemany(
+            self.INSERT_CLUES_SQL,
+            [row + [clue_hash(*[row[i] for i in identity_indexes])] for row in rows],
+        )
+        if location is not None:
+            self.conn.execute(self.MARK_PARSED_SQL, (location,))
+            if content_sha256 is not None:
+                self.conn.execute(
+                    self.RECORD_PARSE_RESULT_SQL,
+                    (
+                        location,
+                        content_sha256,
+                        data.parser,
+                        data.parser_version,
+                    ),
+                )
+        self._written()
+
+    def write_failure(self, location: str, content_sha256: str) -> None:
+        """Record that a post could not be parsed."""
+        self.conn.execute(
+            self.RECORD_PARSE_RESULT_SQL, (location, content_sha256, None, None)
+        )
+        self._written()
+
+    def write_reparse_failure(self, location: str, failed_parser_version: int) -> None:
+        """Record that a post that was parsed could not be reparsed by the given
+        version of its parser. Its clues and parse result are kept.
+        """
+        self.conn.execute(
+            "UPDATE parse_results SET failed_parser_version = ? WHERE location = ?;",
+            (failed_parser_version, location),
+        )
+        self._written()
+
+    def _written(self) -> None:
+        self.num_pending += 1
+        if (
+            self.num_pending >= self.commit_every
+            or time.monotonic() - self._last_commit >= self.commit_interval
+        ):
+            self.commit()
+
+    def commit(self) -> None:
+        self.conn.commit()
+        self.num_pending = 0
+        self._last_commit = time.monotonic()
+
+
+def batch_to_rows(data: ClueBatch) -> list[list]:
+    """Convert a batch of clues to rows of CLUES_COLUMNS, ready to be passed to
+    `executemany`. Missing values (e.g. NaNs) become NULLs.
+    """
+    # For each column, the index of its field in a Clue, or its value if it is
+    # shared by the whole batch.
+    clue_indexes = [
+        Clue._fields.index(column) if column in Clue._fields else None
+        for column in CLUES_COLUMNS
+    ]
+    batch_values = [
+        getattr(data, column) if column in BATCH_FIELDS else None
+        for column in CLUES_COLUMNS
+    ]
+    rows = []
+    for clue in data:
+        row = [
+            batch_value if i is None else clue[i]
+            for i, batch_value in zip(clue_indexes, batch_values)
+        ]
+        # NaN is the only value that is not equal to itself.
+        rows.append([value if value == value else None for value in row])
+    return rows
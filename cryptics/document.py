@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import copy
+import io
+from functools import cached_property
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import bs4
+    import pandas as pd
+
+
+class ParsedDocument:
+    """A blog post's HTML, parsed lazily and at most once.
+
+    Every detector, parser and extractor needs some view of the same HTML: the
+    BeautifulSoup tree, the tables found by `pd.read_html`, or the node holding
+    the body of the post. Each view is computed on first access and cached, so
+    that trying a dozen parsers on one post costs one HTML parse (and at most
+    one `pd.read_html`, and one lxml parse for the table parsers that need the
+    HTML of its tables) instead of one per parser. BeautifulSoup and pandas are
+    likewise only imported when a view that needs them is first computed.
+
+    The cached views are shared, and must not be modified. Steps that change
+    the tree should work on a copy of the node they need (see `copy_of`), or use
+    one of the cached, already-transformed copies below.
+
+    html: the HTML of the blog post.
+    """
+
+    def __init__(self, html: str):
+        self.html = html
+
+    @cached_property
+    def soup(self) -> bs4.BeautifulSoup:
+        import bs4
+
+        return bs4.BeautifulSoup(self.html, "html.parser")
+
+    @cached_property
+    def lxml_soup(self) -> bs4.BeautifulSoup:
+        """The BeautifulSoup tree built by lxml, which is what `pd.read_html`
+        parses with. Use this (not `soup`) to find the HTML of `tables`: on
+        malformed HTML, html.parser can find different tables, or nest them
+        differently.
+        """
+        import bs4
+
+        return bs4.BeautifulSoup(self.html, "lxml")
+
+    @cached_property
+    def tables(self) -> list[pd.DataFrame]:
+        """Tables found by `pd.read_html`, or an empty list if there are none."""
+        import pandas as pd
+
+        try:
+            # pandas 2.1 deprecated reading literal HTML (and pandas 3 reads it
+            # as a path), so wrap it in a file-like object.
+            return pd.read_html(io.StringIO(self.html))
+        except ValueError:
+            return []
+
+    @cached_property
+    def entry_content(self) -> bs4.Tag | None:
+        """The `div.entry-content` node (WordPress and Blogger posts)."""
+        return self.soup.find("div", attrs={"class": "entry-content"})
+
+    @cached_property
+    def asset_body(self) -> bs4.Tag | None:
+        """The first `div.asset-body` (LiveJournal) or `div.entry-content` node."""
+        return self.soup.find(
+            "div", attrs={"class": lambda s: s in ["asset-body", "entry-content"]}
+        )
+
+    @cached_property
+    def asset_body_with_newlines(self) -> bs4.Tag:
+        """A copy of `asset_body` with all <br> tags turned into newlines."""
+        asset_body = self.copy_of(self.asset_body)
+        for br in asset_body.find_all("br"):
+            br.replace_with("\n")
+        return asset_body
+
+    @cached_property
+    def entry_content_with_newlines(self) -> bs4.Tag:
+        """A copy of `entry_content` with a newline after each <h4> tag (i.e.
+        the ACROSS and DOWN headings), and all <br> tags turned into newlines.
+        """
+        entry_content = self.copy_of(self.entry_content)
+        for h4 in entry_content.find_all("h4"):
+            h4_index = h4.parent.contents.index(h4)
+            h4.insert(h4_index + 1, "\n")
+        for br in entry_content.find_all("br"):
+            br.replace_with("\n")
+        return entry_content
+
+    @staticmethod
+    def copy_of(tag: bs4.Tag | None) -> bs4.Tag:
+        """Return a detached copy of a node that is safe to modify.
+
+        Copying a node is much cheaper than re-parsing the whole post. Raises an
+        AttributeError if the node does not exist, just as using it would.
+        """
+        if tag is None:
+            raise AttributeError("Cannot copy a node that does not exist.")
+        return copy.copy(tag)
+
+
+def as_document(html: str | ParsedDocument) -> ParsedDocument:
+    """Wrap raw HTML in a ParsedDocument, unless it already is one."""
+    if isinstance(html, ParsedDocument):
+        return html
+    return ParsedDocument(html)
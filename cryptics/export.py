@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import urllib.parse
+from os.path import join
+from typing import Any, Iterator
+
+from cryptics.config import PROJECT_DIR, PUBLISHED_DATABASE
+from cryptics.utils import get_logger
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None  # type: ignore[assignment]
+
+EXPORT_DIR = join(PROJECT_DIR, "export")
+# Number of rows per Parquet row group, i.e. the number of rows that are held
+# in memory at a time.
+DEFAULT_CHUNK_SIZE = 100_000
+# Value of partition columns for rows without a value, as Hive (and hence
+# pyarrow.dataset) expects.
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Tables to export: table -> (partition columns, dictionary-encoded columns).
+# Partition columns are SQL expressions, named as in the partition
+# directories, and are not written to the files themselves.
+EXPORTS: dict[str, tuple[dict[str, str], list[str]]] = {
+    "clues": (
+        {"source": "source", "puzzle_year": "puzzle_year(puzzle_date)"},
+        ["puzzle_name", "puzzle_date", "source_url", "clue_number"],
+    ),
+    "indicators": ({}, ["wordplay"]),
+    "charades": ({}, []),
+}
+
+
+def puzzle_year(puzzle_date: str | None) -> str | None:
+    """Return the year of a puzzle date, in any of the formats that blogs use,
+    or None if it has none.
+    """
+    if puzzle_date is None:
+        return None
+    match = re.search(r"\b(1[89]|20)[0-9]{2}\b", puzzle_date)
+    return match.group(0) if match else None
+
+
+def _escape(value: str) -> str:
+    """Percent-encode a partition value, as Hive does, so that different values
+    never share a partition directory.
+    """
+    return urllib.parse.quote(value, safe="")
+
+
+def _partition_dir(
+    table_dir: str, partition_columns: list[str], values: tuple[Any, ...]
+) -> str:
+    parts = [
+        f"{column}={NULL_PARTITION if value is None else _escape(str(value))}"
+        for column, value in zip(partition_columns, values)
+    ]
+    return join(table_dir, *parts)
+
+
+def _iter_chunks(
+    cursor: sqlite3.Cursor, chunk_size: int, num_partition_columns: int
+) -> Iterator[tuple[tuple[Any, ...], list[tuple]]]:
+    """Yield (partition, rows) chunks of at most `chunk_size` rows from a
+    cursor whose rows are sorted by partition. Rows start with their partition
+    columns, which are removed.
+    """
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        for partition, partition_rows in itertools.groupby(
+            rows, key=lambda row: row[:num_partition_columns]
+        ):
+            yield partition, [row[num_partition_columns:] for row in partition_rows]
+
+
+def export_table(
+    conn: sqlite3.Connection,
+    table: str,
+    output_dir: str = EXPORT_DIR,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """Export a table of the published database to Parquet files, in
+    `output_dir/<table>/`, partitioned as in EXPORTS.
+
+    Rows are read `chunk_size` at a time, and each chunk is written as a row
+    group of the file of its partition, so only one chunk is ever in memory.
+    An empty table is exported as a single empty file with the table's schema,
+    so that it can be told apart from a table that was not exported.
+
+    Returns the number of rows exported.
+    """
+    if pyarrow is None:
+        raise RuntimeError("pyarrow must be installed to export Parquet files")
+
+    partitions, dictionary_columns = EXPORTS[table]
+    partition_columns = list(partitions)
+    types = {
+        name: type_.upper()
+        for _, name, type_, *_ in conn.execute(f"PRAGMA table_info({table});")
+    }
+    # Partition columns are only stored in the names of partition directories.
+    columns = [
+        column
+        for column in dict.fromkeys(["rowid", *types])
+        if column not in partitions
+    ]
+    schema = pyarrow.schema(
+        [
+            (
+                column,
+                pyarrow.int64()
+                if column == "rowid" or types.get(column, "").startswith("INT")
+                else pyarrow.string(),
+            )
+            for column in columns
+        ]
+    )
+
+    table_dir = join(output_dir, table)
+    shutil.rmtree(table_dir, ignore_errors=True)
+
+    select = ", ".join(list(partitions.values()) + columns)
+    order_by = ", ".join(list(partitions.values()) + ["rowid"])
+    cursor = conn.execute(f"SELECT {select} FROM {table} ORDER BY {order_by};")
+
+    num_rows = 0
+    writer = None
+    current_partition = None
+    try:
+        for partition, rows in _iter_chunks(cursor, chunk_size, len(partitions)):
+            if writer is None or partition != current_partition:
+                if writer is not None:
+                    writer.close()
+                partition_dir = _partition_dir(table_dir, partition_columns, partition)
+                os.makedirs(partition_dir, exist_ok=True)
+                writer = pyarrow.parquet.ParquetWriter(
+                    join(partition_dir, "part-0.parquet"),
+                    schema,
+                    use_dictionary=dictionary_columns,
+                    compression="zstd",
+                )
+                current_partition = partition
+            writer.write_table(
+                pyarrow.Table.from_arrays(
+                    [
+                        pyarrow.array([row[i] for row in rows], type=field.type)
+                        for i, field in enumerate(schema)
+                    ],
+                    schema=schema,
+                ),
+                row_group_size=chunk_size,
+            )
+            num_rows += len(rows)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        os.makedirs(table_dir, exist_ok=True)
+        pyarrow.parquet.write_table(
+            schema.empty_table(),
+            join(table_dir, "part-0.parquet"),
+            compression="zstd",
+        )
+    return num_rows
+
+
+def export(
+    database: str = PUBLISHED_DATABASE,
+    output_dir: str = EXPORT_DIR,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    logger: logging.Logger | None = None,
+) -> dict[str, int]:
+    """Export the tables in EXPORTS from the published database to Parquet
+    files. See export_table.
+
+    Returns the number of rows exported from each table.
+    """
+    if logger is None:
+        logger = get_logger()
+
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    conn.create_function("puzzle_year", 1, puzzle_year, deterministic=True)
+    try:
+        num_rows = {}
+        for table in EXPORTS:
+            num_rows[table] = export_table(
+                conn, table, output_dir=output_dir, chunk_size=chunk_size
+            )
+            logger.info(f"Exported {num_rows[table]} rows from {table}")
+    finally:
+        conn.close()
+    return num_rows
+
+
+if __name__ == "__main__":
+    logger = get_logger()
+
+    parser = argparse.ArgumentParser(
+        description="Export clues, indicators and charades to Parquet files."
+    )
+    parser.add_argument("--database", type=str, default=PUBLISHED_DATABASE)
+    parser.add_argument("--output-dir", type=str, default=EXPORT_DIR)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    export(
+        database=args.database,
+        output_dir=args.output_dir,
+        chunk_size=args.chunk_size,
+        logger=logger,
+    )
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+from typing import Any, Callable, ContextManager
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+# Default number of seconds to wait for a server to respond.
+DEFAULT_TIMEOUT = 60
+# Number of hosts to keep connection pools for, and connections per host.
+DEFAULT_POOL_CONNECTIONS = 16
+DEFAULT_POOL_MAXSIZE = 8
+
+
+class Session(requests.Session):
+    """A requests.Session with default headers, a default timeout and pooled,
+    keep-alive connections to each host.
+
+    headers: headers to send with every request.
+    timeout: default timeout (in seconds) for every request.
+    pool_connections: number of hosts to keep connection pools for.
+    pool_maxsize: maximum number of connections to keep open to each host.
+    transport: if not None, a transport adapter to send all requests through
+        instead of the network, e.g. a local stand-in for tests or benchmarks.
+    """
+
+    def __init__(
+        self,
+        headers: dict[str, str] | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+        transport: BaseAdapter | None = None,
+    ):
+        super().__init__()
+        if headers is not None:
+            self.headers.update(headers)
+        self.timeout = timeout
+
+        if transport is None:
+            transport = HTTPAdapter(
+                pool_connections=pool_connections, pool_maxsize=pool_maxsize
+            )
+        self.mount("http://", transport)
+        self.mount("https://", transport)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:  # type: ignore[override]
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_session: Session | None = None
+_session_lock = threading.Lock()
+
+# If set, `get` sends each request inside the context that this returns for its
+# URL, e.g. to rate limit it. Context variables are copied into the threads of
+# asyncio.to_thread, so cryptics.scrape_blogs sets this to rate limit the
+# requests of the sitemap discovery functions that it runs in threads.
+request_limiter: contextvars.ContextVar[
+    Callable[[str], ContextManager[None]] | None
+] = contextvars.ContextVar("request_limiter", default=None)
+
+
+def _new_session(**kwargs: Any) -> Session:
+    from cryptics.config import HEADERS
+
+    kwargs.setdefault("headers", HEADERS)
+    return Session(**kwargs)
+
+
+def configure(**kwargs: Any) -> Session:
+    """Replace the shared session with a new one. Takes the same arguments as
+    Session, except that `headers` defaults to cryptics.config.HEADERS.
+    """
+    global _session
+
+    session = _new_session(**kwargs)
+    with _session_lock:
+        old_session, _session = _session, session
+    if old_session is not None:
+        old_session.close()
+    return session
+
+
+def get_session() -> Session:
+    """Return the shared session, creating it with the defaults if need be."""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _new_session()
+        return _session
+
+
+def get(url: str, **kwargs: Any) -> requests.Response:
+    """Send a GET request using the shared session, limited by the current
+    `request_limiter` (if any).
+    """
+    limiter = request_limiter.get()
+    if limiter is None:
+        return get_session().get(url, **kwargs)
+    with limiter(url):
+        return get_session().get(url, **kwargs)
@@ -1,11 +1,18 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
 import re
 import sqlite3
-from typing import Dict, List
-
-import pandas as pd
-from tqdm import tqdm
+from typing import Dict, Iterable, Iterator, List
 
-from cryptics.config import INITIALIZE_DB_SQL, SQLITE_DATABASE
+from cryptics.config import SQLITE_DATABASE
+from cryptics.database import initialize_db
 
 # TODO: [] should be allowed as parentheses...
 INDICATOR_REGEXES = {
@@ -49,129 +56,673 @@ CHARADE_REGEXES = [
 ]
 
 
-def find_and_write_indicators(
-    clue_row_id: int,
-    clue: str,
-    annotation: str,
-    indicator_regexes: Dict[str, List[str]],
-    write_cursor: sqlite3.Cursor,
-) -> None:
-    for wordplay, regexes in indicator_regexes.items():
-        for regex in regexes:
-            indicators = "/".join(
+def literal_prefix(regex: str) -> str:
+    """Return the literal text that every match of `regex` starts with (which
+    may be empty).
+    """
+    # A top-level alternation has no common prefix.
+    depth, is_escaped, is_in_class = 0, False, False
+    for char in regex:
+        if is_escaped:
+            is_escaped = False
+        elif char == "\\":
+            is_escaped = True
+        elif is_in_class:
+            is_in_class = char != "]"
+        elif char == "[":
+            is_in_class = True
+        elif char in "()":
+            depth += 1 if char == "(" else -1
+        elif char == "|" and depth == 0:
+            return ""
+
+    prefix = ""
+    for char in regex:
+        if char in "\\.^$*+?{}[]|()":
+            # The last character is optional if it is followed by one of these.
+            if char in "*?{":
+                prefix = prefix[:-1]
+            break
+        prefix += char
+    return prefix
+
+
+class IndicatorMatcher:
+    """Find the indicators and charades of a clue from its annotation.
+
+    Each regex is compiled once, and only run on annotations that contain its
+    literal prefix (e.g. "anagram" for anagram indicators), which is checked
+    first. Since every match of a regex starts with its literal prefix, this
+    finds exactly the same indicators and charades as running every regex on
+    every annotation.
+
+    indicator_regexes: regexes of the indicators of each type of wordplay.
+        Each must have exactly one group, i.e. the indicator.
+    charade_regexes: regexes of charades. Each must have exactly two groups,
+        i.e. the answer and the charade.
+    """
+
+    def __init__(
+        self,
+        indicator_regexes: Dict[str, List[str]] = INDICATOR_REGEXES,
+        charade_regexes: List[str] = CHARADE_REGEXES,
+    ):
+        self.wordplays = list(indicator_regexes)
+        self.indicator_patterns = [
+            (wordplay, literal_prefix(regex), re.compile(regex))
+            for wordplay, regexes in indicator_regexes.items()
+            for regex in regexes
+        ]
+        self.charade_patterns = [
+            (literal_prefix(regex), re.compile(regex)) for regex in charade_regexes
+        ]
+
+    def find_indicators(self, clue: str, annotation: str) -> Dict[str, str]:
+        """Return the indicators of each type of wordplay found in a clue, as
+        "/"-separated strings. If more than one regex of a type of wordplay
+        finds indicators, the last one wins.
+        """
+        clue = clue.lower()
+        indicators = {}
+        for wordplay, prefix, pattern in self.indicator_patterns:
+            if prefix not in annotation:
+                continue
+            found = "/".join(
                 [
                     s.strip().lower()
-                    for s in re.findall(regex, annotation)
-                    if s.strip().lower() in clue.lower()
+                    for s in pattern.findall(annotation)
+                    if s.strip().lower() in clue
                 ]
             )
-            if indicators:
-                try:
-                    write_cursor.execute(
-                        f"INSERT INTO indicators (clue_rowid) VALUES ({clue_row_id});"
-                    )
-                except sqlite3.IntegrityError:
-                    pass
-                write_cursor.execute(
-                    f"UPDATE indicators SET {wordplay} = ? WHERE clue_rowid = ?;",
-                    (indicators, clue_row_id),
-                )
+            if found:
+                indicators[wordplay] = found
+        return indicators
+
+    def find_charades(self, clue: str, annotation: str) -> List[tuple[str, str]]:
+        """Return the (charade, answer) pairs found in a clue."""
+        clue = clue.lower()
+        charades: List[tuple[str, str]] = []
+        for prefix, pattern in self.charade_patterns:
+            if prefix not in annotation:
+                continue
+            charades.extend(
+                (charade.strip().lower(), answer.strip())
+                for (answer, charade) in pattern.findall(annotation)
+                if charade.strip()
+                and charade.strip().lower() in clue
+                and answer.isupper()
+            )
+        return charades
 
 
-def find_and_write_charades(
-    clue_row_id: int,
-    clue: str,
-    annotation: str,
-    charade_regexes: List[str],
-    write_cursor: sqlite3.Cursor,
+def _consolidated_column_sql(wordplay: str) -> str:
+    return (
+        f"(SELECT COALESCE(GROUP_CONCAT({wordplay}, char(10)), '') FROM "
+        f"(SELECT DISTINCT {wordplay} FROM indicators WHERE {wordplay} != '' ORDER BY {wordplay}))"
+    )
+
+
+# The unpivoted tables are built by SQLite from the indexes of
+# `indicators_exploded` and `charades`, so that memory use does not grow with
+# the number of clues. Their schemas are those that pandas.DataFrame.to_sql used
+# to create. Each has a junction table, named `<table>_clues`, from its rows to
+# the clues they appear in, from which their `clue_rowids` are rendered.
+UNPIVOTED_TABLES = {
+    # Unpivoted table: (key columns, table it is unpivoted from, junction column)
+    "indicators_unpivoted": (
+        ("wordplay", "indicator"),
+        "indicators_exploded",
+        "indicator_rowid",
+    ),
+    "charades_unpivoted": (("charade", "answer"), "charades", "charade_rowid"),
+}
+CONSOLIDATE_INDICATORS_SQL = [
+    "DROP TABLE IF EXISTS indicators_consolidated;",
+    'CREATE TABLE "indicators_consolidated" (\n'
+    + ",\n  ".join(f'"{wordplay}" TEXT' for wordplay in sorted(INDICATOR_REGEXES))
+    + "\n);",
+    f"INSERT INTO indicators_consolidated ({', '.join(sorted(INDICATOR_REGEXES))}) SELECT "
+    + ", ".join(
+        _consolidated_column_sql(wordplay) for wordplay in sorted(INDICATOR_REGEXES)
+    )
+    + ";",
+]
+
+
+def link_unpivoted_table(
+    conn: sqlite3.Connection, table: str, where: str = "1"
 ) -> None:
-    for regex in charade_regexes:
-        charades = [
-            (clue_row_id, charade.strip().lower(), answer.strip())
-            for (answer, charade) in re.findall(regex, annotation)
-            if charade.strip()
-            and charade.strip().lower() in clue.lower()
-            and answer.isupper()
-        ]
-        if charades:
-            sql = "INSERT INTO charades (clue_rowid, charade, answer) VALUES (?, ?, ?);"
-            write_cursor.executemany(sql, charades)
+    """Rebuild the junction table rows, and render the `clue_rowids`, of the
+    rows of an unpivoted table that match the SQL condition `where`.
+    """
+    (column_1, column_2), source_table, junction_column = UNPIVOTED_TABLES[table]
+    junction_table = f"{table}_clues"
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {junction_table} (
+            {junction_column} INTEGER NOT NULL,
+            clue_rowid INTEGER NOT NULL,
+            PRIMARY KEY ({junction_column}, clue_rowid)
+        ) WITHOUT ROWID;
+        """
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {junction_table}_clue_rowid_index ON {junction_table} (clue_rowid);"
+    )
+    conn.execute(
+        f"""
+        DELETE FROM {junction_table}
+        WHERE {junction_column} IN (SELECT rowid FROM {table} WHERE {where});
+        """
+    )
+    conn.execute(
+        f"""
+        INSERT OR IGNORE INTO {junction_table} ({junction_column}, clue_rowid)
+        SELECT {table}.rowid, {source_table}.clue_rowid
+        FROM {table} JOIN {source_table} USING ({column_1}, {column_2})
+        WHERE {where};
+        """
+    )
+    conn.execute(
+        f"""
+        UPDATE {table} SET clue_rowids = (
+            SELECT GROUP_CONCAT('[' || clue_rowid || '](/data/clues/' || clue_rowid || ')', ', ')
+            FROM {junction_table}
+            WHERE {junction_column} = {table}.rowid
+        )
+        WHERE {where};
+        """
+    )
 
 
-def unpivot_indicators_table() -> None:
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        df = pd.read_sql("SELECT * FROM indicators;", conn)
-    df = df.melt(id_vars=["clue_rowid"], var_name="wordplay", value_name="indicator")
-    df = df[df["indicator"].str.strip() != ""]
-    df["indicator"] = df["indicator"].apply(lambda s: s.split("/"))
-    df = df.explode("indicator")
-    df = (
-        df.groupby(["wordplay", "indicator"])["clue_rowid"]
-        .agg(lambda group: ", ".join([f"[{s}](/data/clues/{s})" for s in group]))
-        .to_frame()
-        .rename(columns={"clue_rowid": "clue_rowids"})
-        .reset_index()
+def unpivot_table(conn: sqlite3.Connection, table: str) -> None:
+    (column_1, column_2), source_table, _ = UNPIVOTED_TABLES[table]
+    conn.execute(f"DROP TABLE IF EXISTS {table}_clues;")
+    conn.execute(f"DROP TABLE IF EXISTS {table};")
+    conn.execute(
+        f'CREATE TABLE "{table}" (\n"{column_1}" TEXT,\n  "{column_2}" TEXT,\n  "clue_rowids" TEXT\n);'
     )
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        df.to_sql("indicators_unpivoted", conn, if_exists="replace", index=False)
+    conn.execute(
+        f"""
+        INSERT INTO {table} ({column_1}, {column_2})
+        SELECT {column_1}, {column_2}
+        FROM {source_table}
+        GROUP BY {column_1}, {column_2}
+        ORDER BY {column_1}, {column_2};
+        """
+    )
+    link_unpivoted_table(conn, table)
 
 
-def unpivot_charades_table() -> None:
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        df = pd.read_sql("SELECT * FROM charades;", conn)
-    df = (
-        df.groupby(["charade", "answer"])["clue_rowid"]
-        .agg(lambda group: ", ".join([f"[{s}](/data/clues/{s})" for s in group]))
-        .to_frame()
-        .rename(columns={"clue_rowid": "clue_rowids"})
-        .reset_index()
+def unpivot_indicators_table(conn: sqlite3.Connection) -> None:
+    unpivot_table(conn, "indicators_unpivoted")
+
+
+def unpivot_charades_table(conn: sqlite3.Connection) -> None:
+    unpivot_table(conn, "charades_unpivoted")
+
+
+def consolidate_indicators(conn: sqlite3.Connection) -> None:
+    for sql in CONSOLIDATE_INDICATORS_SQL:
+        conn.execute(sql)
+
+
+def explode_indicators(conn: sqlite3.Connection, where: str = "1") -> None:
+    """Write the rows of `indicators_exploded` for the clues of `indicators`
+    that match the SQL condition `where`, by splitting their indicators on
+    "/" with a recursive CTE.
+    """
+    melted = "\n        UNION ALL\n        ".join(
+        f"SELECT clue_rowid, '{wordplay}', {wordplay} || '/' FROM indicators "
+        f"WHERE TRIM({wordplay}) != '' AND ({where})"
+        for wordplay in INDICATOR_REGEXES
+    )
+    conn.execute(
+        f"""
+        INSERT INTO indicators_exploded (clue_rowid, wordplay, indicator)
+        WITH RECURSIVE
+        melted (clue_rowid, wordplay, rest) AS (
+            {melted}
+        ),
+        split (clue_rowid, wordplay, indicator, rest) AS (
+            SELECT clue_rowid, wordplay, NULL, rest FROM melted
+            UNION ALL
+            SELECT
+                clue_rowid,
+                wordplay,
+                SUBSTR(rest, 1, INSTR(rest, '/') - 1),
+                SUBSTR(rest, INSTR(rest, '/') + 1)
+            FROM split
+            WHERE rest != ''
+        )
+        SELECT clue_rowid, wordplay, indicator FROM split WHERE indicator IS NOT NULL;
+        """
     )
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        df.to_sql("charades_unpivoted", conn, if_exists="replace", index=False)
 
 
-def consolidate_indicators() -> None:
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        indicators = pd.read_sql("SELECT * FROM indicators;", conn)
+def index_unpivoted_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS indicators_unpivoted_wordplay_indicator_index ON indicators_unpivoted (wordplay, indicator);"
+    )
+    conn.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS charades_unpivoted_charade_answer_index ON charades_unpivoted (charade, answer);"
+    )
+
+
+def get_build_state(conn: sqlite3.Connection, key: str) -> str | None:
+    row = conn.execute(
+        "SELECT value FROM build_state WHERE key = ?;", (key,)
+    ).fetchone()
+    return row[0] if row is not None else None
 
-    indicators = indicators.drop(columns="clue_rowid")
-    d = {}
-    for col in indicators.columns:
-        d[col] = "\n".join(
-            indicators[col][indicators[col].apply(bool)].sort_values().unique()
+
+def set_build_state(conn: sqlite3.Connection, key: str, value: str | None) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO build_state (key, value) VALUES (?, ?);", (key, value)
+    )
+
+
+def clue_fingerprint(clue: str | None, annotation: str | None) -> int:
+    """Return a 64-bit hash of what the indicators and charades of a clue are
+    found from, i.e. its clue and annotation.
+    """
+    digest = hashlib.blake2b(
+        json.dumps([clue, annotation], ensure_ascii=False).encode("utf-8"),
+        digest_size=8,
+    ).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def write_fingerprints(conn: sqlite3.Connection, where: str = "1") -> None:
+    """Record the fingerprints of the clues that match the SQL condition
+    `where` in `indicators_fingerprints`, replacing any previous ones.
+    """
+    conn.create_function("clue_fingerprint", 2, clue_fingerprint, deterministic=True)
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO indicators_fingerprints (clue_rowid, fingerprint)
+        SELECT rowid, clue_fingerprint(clue, annotation) FROM clues WHERE {where};
+        """
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_matcher() -> IndicatorMatcher:
+    return IndicatorMatcher()
+
+
+def find_indicators_and_charades(
+    rows: Iterable[tuple[int, str | None, str | None]]
+) -> tuple[list[tuple], list[tuple]]:
+    """Find the indicators and charades of clues. This runs either in the main
+    process or in a worker process, so it must not touch the database.
+
+    rows: tuples of (clue rowid, clue, annotation). Clues without a clue or an
+        annotation have no indicators or charades.
+
+    Returns the rows to insert into `indicators` (one per clue with any
+    indicators, in the order of INDICATOR_REGEXES) and `charades`.
+    """
+    matcher = _get_matcher()
+    indicator_rows: list[tuple] = []
+    charade_rows: list[tuple[int, str, str]] = []
+    for (clue_row_id, clue, annotation) in rows:
+        if clue is None or not annotation:
+            continue
+        indicators = matcher.find_indicators(clue, annotation)
+        if indicators:
+            indicator_rows.append(
+                (
+                    clue_row_id,
+                    *[indicators.get(wordplay, "") for wordplay in matcher.wordplays],
+                )
+            )
+        charade_rows.extend(
+            (clue_row_id, charade, answer)
+            for charade, answer in matcher.find_charades(clue, annotation)
         )
+    return indicator_rows, charade_rows
 
-    df = pd.DataFrame.from_dict(data=d, orient="index").T
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        df.to_sql("indicators_consolidated", conn, if_exists="replace", index=False)
 
+def write_indicators_and_charades(
+    conn: sqlite3.Connection, indicator_rows: list[tuple], charade_rows: list[tuple]
+) -> None:
+    columns = ["clue_rowid"] + list(INDICATOR_REGEXES)
+    conn.executemany(
+        f"INSERT INTO indicators ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)});",
+        indicator_rows,
+    )
+    conn.executemany(
+        "INSERT INTO charades (clue_rowid, charade, answer) VALUES (?, ?, ?);",
+        charade_rows,
+    )
 
-if __name__ == "__main__":
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        read_cursor = conn.cursor()
-        write_cursor = conn.cursor()
-
-        write_cursor.execute("DROP TABLE IF EXISTS charades;")
-        write_cursor.execute("DROP TABLE IF EXISTS indicators;")
-        with open(INITIALIZE_DB_SQL, "r") as f:
-            sql = f.read()
-        write_cursor.executescript(sql)
-        conn.commit()
-
-        read_cursor.execute("SELECT rowid, clue, annotation FROM clues;")
-        for (clue_row_id, clue, annotation) in tqdm(
-            read_cursor, desc="Finding indicators and charades"
+
+def find_and_write_all(
+    conn: sqlite3.Connection, rows: list[tuple[int, str, str]]
+) -> None:
+    """Find the indicators and charades of clues, and write them to the
+    `indicators` and `charades` tables.
+
+    rows: tuples of (clue rowid, clue, annotation).
+    """
+    write_indicators_and_charades(conn, *find_indicators_and_charades(rows))
+
+
+def find_and_write_chunks(
+    conn: sqlite3.Connection,
+    max_rowid: int,
+    workers: int = 1,
+    chunk_size: int = 10000,
+) -> None:
+    """Find the indicators and charades of all clues up to `max_rowid`, and
+    write them to the `indicators` and `charades` tables.
+
+    Clues are read by this process in chunks of `chunk_size` rowids, and the
+    chunks are searched by `workers` worker processes. Results are written by
+    this (i.e. a single) process, in rowid order, so the tables are the same
+    no matter the number of workers.
+    """
+    num_chunks = -(-max_rowid // chunk_size)
+    chunks = (
+        conn.execute(
+            "SELECT rowid, clue, annotation FROM clues WHERE rowid > ? AND rowid <= ?;",
+            (start, min(start + chunk_size, max_rowid)),
+        ).fetchall()
+        for start in range(0, max_rowid, chunk_size)
+    )
+
+    from tqdm import tqdm
+
+    with (
+        multiprocessing.Pool(workers) if workers > 1 else contextlib.nullcontext()
+    ) as pool:
+        if pool is not None:
+            # Chunks are read in this thread, a bounded number at a time, since
+            # the connection cannot be shared with the pool's task thread.
+            windows = iter(lambda: list(itertools.islice(chunks, 4 * workers)), [])
+            results: Iterator[tuple[list[tuple], list[tuple]]] = (
+                result
+                for window in windows
+                for result in pool.imap(find_indicators_and_charades, window)
+            )
+        else:
+            results = map(find_indicators_and_charades, chunks)
+
+        for indicator_rows, charade_rows in tqdm(
+            results,
+            desc="Finding indicators and charades",
+            total=num_chunks,
+            unit="chunk",
         ):
-            if not annotation:
-                continue
-            find_and_write_indicators(
-                clue_row_id, clue, annotation, INDICATOR_REGEXES, write_cursor
+            write_indicators_and_charades(conn, indicator_rows, charade_rows)
+
+
+def build_indicators(
+    conn: sqlite3.Connection, workers: int = 1, chunk_size: int = 10000
+) -> None:
+    """Find the indicators and charades of all clues, and rebuild all tables
+    derived from them. See find_and_write_chunks.
+    """
+    conn.execute("DROP TABLE IF EXISTS charades;")
+    conn.execute("DROP TABLE IF EXISTS indicators;")
+    conn.execute("DROP TABLE IF EXISTS indicators_exploded;")
+    conn.execute("DROP TABLE IF EXISTS indicators_fingerprints;")
+    # Also migrates databases created before any of the tables or columns
+    # that the tables are built from were added.
+    initialize_db(conn)
+
+    (max_rowid, started) = conn.execute(
+        "SELECT COALESCE(MAX(rowid), 0), datetime('now') FROM clues;"
+    ).fetchone()
+    conn.execute("DELETE FROM clues_deleted;")
+    find_and_write_chunks(conn, max_rowid, workers=workers, chunk_size=chunk_size)
+    explode_indicators(conn)
+    write_fingerprints(conn, f"rowid <= {max_rowid}")
+
+    unpivot_indicators_table(conn)
+    unpivot_charades_table(conn)
+    consolidate_indicators(conn)
+    index_unpivoted_tables(conn)
+
+    _set_watermarks(conn, max_rowid, started)
+    set_build_state(conn, "indicators_built", "true")
+    conn.commit()
+
+
+def _set_watermarks(conn: sqlite3.Connection, max_rowid: int, started: str) -> None:
+    """Record the largest rowid of the clues, and the time, as of the start of
+    a build. Clues with a larger rowid, or reviewed (and hence possibly edited)
+    since, are the only clues that the next incremental update considers,
+    besides those whose rowids were deleted (and maybe reused) since.
+    """
+    set_build_state(conn, "indicators_max_rowid", str(max_rowid))
+    set_build_state(conn, "indicators_last_built", started)
+
+
+def _update_unpivoted_rows(
+    conn: sqlite3.Connection, table: str, keys: set[tuple[str, str]]
+) -> None:
+    """Add and delete the rows of an unpivoted table for the given keys, so
+    that it has a row for each key that the table it was unpivoted from has,
+    and relink the rows of the given keys.
+
+    Rows are never renumbered: new keys are appended, so the rowids of other
+    rows (which become the rowids of the published tables) stay the same, and
+    only the rows of the given keys are relinked.
+    """
+    (column_1, column_2), source_table, junction_column = UNPIVOTED_TABLES[table]
+    deleted_rowids = []
+    new_keys = []
+    rowids = []
+    for key in keys:
+        row = conn.execute(
+            f"SELECT rowid FROM {table} WHERE {column_1} = ? AND {column_2} = ?;", key
+        ).fetchone()
+        exists = conn.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {source_table} WHERE {column_1} = ? AND {column_2} = ?);",
+            key,
+        ).fetchone()[0]
+        if row is not None and not exists:
+            deleted_rowids.append(row)
+        elif row is None and exists:
+            new_keys.append(key)
+        elif row is not None:
+            rowids.append(row)
+
+    # Rows are deleted before any are added, since SQLite may give a new row the
+    # rowid of a deleted one.
+    conn.executemany(f"DELETE FROM {table} WHERE rowid = ?;", deleted_rowids)
+    conn.executemany(
+        f"DELETE FROM {table}_clues WHERE {junction_column} = ?;", deleted_rowids
+    )
+    for key in sorted(new_keys):
+        cursor = conn.execute(
+            f"INSERT INTO {table} ({column_1}, {column_2}) VALUES (?, ?);", key
+        )
+        rowids.append((cursor.lastrowid,))
+
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS relink (rowid INTEGER PRIMARY KEY);")
+    conn.execute("DELETE FROM temp.relink;")
+    conn.executemany("INSERT INTO temp.relink VALUES (?);", rowids)
+    link_unpivoted_table(conn, table, f"{table}.rowid IN temp.relink")
+
+
+def _indicator_values(conn: sqlite3.Connection) -> dict[str, set[str]]:
+    """Return the indicators of each wordplay (as they are in `indicators`,
+    i.e. joined by "/") of the clues in `temp.affected`.
+    """
+    wordplays = list(INDICATOR_REGEXES)
+    values: dict[str, set[str]] = {wordplay: set() for wordplay in wordplays}
+    for row in conn.execute(
+        f"SELECT {', '.join(wordplays)} FROM indicators WHERE clue_rowid IN temp.affected;"
+    ):
+        for wordplay, value in zip(wordplays, row):
+            if value:
+                values[wordplay].add(value)
+    return values
+
+
+def _update_consolidated_indicators(
+    conn: sqlite3.Connection,
+    old_values: dict[str, set[str]],
+    new_values: dict[str, set[str]],
+) -> None:
+    """Update `indicators_consolidated` in place, given the indicators that
+    the affected clues had and have (see _indicator_values). Only the columns
+    of wordplays whose indicators changed are rewritten, and only indicators
+    that the affected clues no longer have are looked up in `indicators`.
+    """
+    wordplays = sorted(INDICATOR_REGEXES)
+    row = conn.execute(
+        f"SELECT {', '.join(wordplays)} FROM indicators_consolidated;"
+    ).fetchone()
+    for wordplay, consolidated in zip(wordplays, row):
+        values = set(consolidated.split("\n")) - {""}
+        updated = values | new_values[wordplay]
+        for value in old_values[wordplay] - new_values[wordplay]:
+            if not conn.execute(
+                f"SELECT EXISTS (SELECT 1 FROM indicators WHERE {wordplay} = ?);",
+                (value,),
+            ).fetchone()[0]:
+                updated.discard(value)
+        if updated != values:
+            conn.execute(
+                f"UPDATE indicators_consolidated SET {wordplay} = ?;",
+                ("\n".join(sorted(updated)),),
             )
-            find_and_write_charades(
-                clue_row_id, clue, annotation, CHARADE_REGEXES, write_cursor
+
+
+def update_indicators(conn: sqlite3.Connection) -> bool:
+    """Find the indicators and charades of new and edited clues, and update
+    all tables derived from them in place.
+
+    Only clues that may have changed since the last build are considered: those
+    with a larger rowid than any clue then, those reviewed (i.e. maybe edited,
+    see cryptics/review.py) since it started, and those whose rowid was deleted
+    (and may have been reused, see `clues_deleted`) since. Every build records
+    a fingerprint of each clue it processed (see clue_fingerprint), and only
+    these clues are fingerprinted, so that the work done is proportional to the
+    number of changed clues. New and edited clues are those whose fingerprint
+    is missing or different, and deleted clues are those with a fingerprint but
+    no row. Indicators and charades of deleted clues are deleted.
+
+    Only the rows of the unpivoted tables whose indicators (or charades) these
+    clues had or have, and the consolidated indicators of their wordplays, are
+    recomputed. The result is the same as that of a full build, except that
+    new rows of the unpivoted tables are appended rather than sorted in, so
+    that existing rows keep their rowids.
+
+    Returns False (without doing anything) if there is no previous build to
+    update, in which case a full build is needed.
+    """
+    initialize_db(conn)
+    if get_build_state(conn, "indicators_built") is None:
+        return False
+
+    (max_rowid, started) = conn.execute(
+        "SELECT COALESCE(MAX(rowid), 0), datetime('now') FROM clues;"
+    ).fetchone()
+    deleted_since = [
+        clue_rowid
+        for clue_rowid, in conn.execute("SELECT clue_rowid FROM clues_deleted;")
+    ]
+    previous_max_rowid = get_build_state(conn, "indicators_max_rowid")
+    last_built = get_build_state(conn, "indicators_last_built")
+    if previous_max_rowid is None or last_built is None:
+        # Builds before watermarks were recorded: consider every clue.
+        candidates = conn.execute(
+            """
+            SELECT clues.rowid, clue, annotation, fingerprint
+            FROM clues LEFT JOIN indicators_fingerprints ON clue_rowid = clues.rowid;
+            """
+        )
+    else:
+        candidates = conn.execute(
+            """
+            SELECT clues.rowid, clue, annotation, fingerprint
+            FROM clues LEFT JOIN indicators_fingerprints ON clue_rowid = clues.rowid
+            WHERE clues.rowid > ?
+                OR datetime_reviewed >= ?
+                OR clues.rowid IN (SELECT clue_rowid FROM clues_deleted);
+            """,
+            (int(previous_max_rowid), last_built),
+        )
+    clue_rows = [
+        (clue_rowid, clue, annotation)
+        for clue_rowid, clue, annotation, fingerprint in candidates.fetchall()
+        if fingerprint != clue_fingerprint(clue, annotation)
+    ]
+    deleted_clue_rowids = [
+        clue_rowid
+        for clue_rowid, in conn.execute(
+            "SELECT clue_rowid FROM indicators_fingerprints WHERE clue_rowid NOT IN (SELECT rowid FROM clues);"
+        )
+    ]
+    clue_rowids = [clue_rowid for clue_rowid, *_ in clue_rows] + deleted_clue_rowids
+
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS affected (clue_rowid INT PRIMARY KEY);"
+    )
+    conn.execute("DELETE FROM temp.affected;")
+    conn.executemany(
+        "INSERT INTO temp.affected VALUES (?);", [(rowid,) for rowid in clue_rowids]
+    )
+
+    def affected_keys() -> tuple[set, set]:
+        indicator_keys = set(
+            conn.execute(
+                "SELECT wordplay, indicator FROM indicators_exploded WHERE clue_rowid IN temp.affected;"
+            )
+        )
+        charade_keys = set(
+            conn.execute(
+                "SELECT charade, answer FROM charades WHERE clue_rowid IN temp.affected;"
             )
-        conn.commit()
+        )
+        return indicator_keys, charade_keys
+
+    old_indicator_keys, old_charade_keys = affected_keys()
+    old_indicator_values = _indicator_values(conn)
+    for table in [
+        "indicators",
+        "indicators_exploded",
+        "charades",
+        "indicators_fingerprints",
+    ]:
+        conn.execute(f"DELETE FROM {table} WHERE clue_rowid IN temp.affected;")
+
+    find_and_write_all(conn, clue_rows)
+    explode_indicators(conn, "clue_rowid IN temp.affected")
+    write_fingerprints(conn, "rowid IN temp.affected")
+    new_indicator_keys, new_charade_keys = affected_keys()
+
+    _update_unpivoted_rows(
+        conn, "indicators_unpivoted", old_indicator_keys | new_indicator_keys
+    )
+    _update_unpivoted_rows(
+        conn, "charades_unpivoted", old_charade_keys | new_charade_keys
+    )
+    _update_consolidated_indicators(conn, old_indicator_values, _indicator_values(conn))
+    conn.executemany(
+        "DELETE FROM clues_deleted WHERE clue_rowid = ?;",
+        [(clue_rowid,) for clue_rowid in deleted_since],
+    )
+    _set_watermarks(conn, max_rowid, started)
+    conn.commit()
+    return True
+
 
-    unpivot_indicators_table()
-    unpivot_charades_table()
-    consolidate_indicators()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process clues added, edited or deleted since the last build.",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    with sqlite3.connect(SQLITE_DATABASE) as conn:
+        if not (args.incremental and update_indicators(conn)):
+            build_indicators(conn, workers=args.workers)
@@ -3,14 +3,15 @@ import logging
 import sqlite3
 from datetime import datetime
 
-import pandas as pd
 from bs4 import BeautifulSoup
 
+from cryptics.clues import ClueBatch
 from cryptics.config import SQLITE_DATABASE
+from cryptics.database import ClueWriter, initialize_db, iter_raw
 from cryptics.utils import get_logger
 
 
-def parse_json(puzzle: dict, source: str) -> pd.DataFrame:
+def parse_json(puzzle: dict, source: str) -> ClueBatch:
     clues = [placed_word["clue"]["clue"] for placed_word in puzzle["placedWords"]]
     clues = [BeautifulSoup(clue, "lxml").text for clue in clues]
     try:
@@ -30,49 +31,37 @@ def parse_json(puzzle: dict, source: str) -> pd.DataFrame:
         for placed_word in puzzle["placedWords"]
     ]
 
-    data = pd.DataFrame(
-        data=[clue_numbers, answers, clues, annotations, definitions],
-        index=["clue_number", "answer", "clue", "annotation", "definition"],
-    ).T
-
-    data["source"] = source
-    data["puzzle_url"] = url
-    data["source_url"] = url
-    data["puzzle_name"] = puzzle["title"]
-    data["puzzle_date"] = datetime.utcfromtimestamp(
-        puzzle["publishTime"] / 1000
-    ).strftime("%Y-%m-%d")
-    return data
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
+        source=source,
+        puzzle_url=url,
+        source_url=url,
+        puzzle_name=puzzle["title"],
+        puzzle_date=datetime.utcfromtimestamp(puzzle["publishTime"] / 1000).strftime(
+            "%Y-%m-%d"
+        ),
+    )
 
 
 if __name__ == "__main__":
     logger = get_logger()
 
     with sqlite3.connect(SQLITE_DATABASE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            f"SELECT DISTINCT location FROM raw WHERE content_type = 'json' AND NOT is_parsed;"
-        )
-        urls_to_parse = {url for url, in cursor.fetchall()}
-
-    for url in urls_to_parse:
-        logger.info(f"Parsing: {url}")
-        with sqlite3.connect(SQLITE_DATABASE) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"SELECT content, source FROM raw WHERE location = '{url}';")
-            puzzle_json, source = cursor.fetchone()
-
-        puzzle = json.loads(puzzle_json)
+        initialize_db(conn)
+        with ClueWriter(conn) as writer:
+            for _, source, url, puzzle_json in iter_raw(conn, "json"):
+                logger.info(f"Parsing: {url}")
+                puzzle = json.loads(puzzle_json)
 
-        try:
-            data = parse_json(puzzle, source)
-            logger.info(f"Successfully parsed: {url}")
-        except:
-            logger.error(f"Failed to parse: {url}", exc_info=True)
-            continue
+                try:
+                    data = parse_json(puzzle, source)
+                    logger.info(f"Successfully parsed: {url}")
+                except:
+                    logger.error(f"Failed to parse: {url}", exc_info=True)
+                    continue
 
-        with sqlite3.connect(SQLITE_DATABASE) as conn:
-            data.to_sql(f"clues", conn, if_exists="append", index=False)
-            cursor = conn.cursor()
-            sql = f"UPDATE raw SET is_parsed = TRUE, datetime_parsed = datetime('now') WHERE location = '{url}';"
-            cursor.execute(sql)
+                writer.write(data, location=url)
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
 import re
-from collections import defaultdict
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-import bs4
-import numpy as np
-import pandas as pd
+from cryptics.clues import Clue, ClueBatch
+from cryptics.document import ParsedDocument, as_document
+from cryptics.utils import (
+    align_suspected_definitions_with_clues,
+    match,
+    parser_version,
+    search,
+)
 
-from cryptics.utils import align_suspected_definitions_with_clues, match, search
+if TYPE_CHECKING:
+    import bs4
 
 
 def get_smallest_divs(soup: bs4.BeautifulSoup):
@@ -19,6 +24,8 @@ def get_smallest_divs(soup: bs4.BeautifulSoup):
 
 
 def get_across_down_indexes(divs: Iterable[bs4.Tag]):
+    import numpy as np
+
     (across_index,) = np.where([div.text.strip().lower() == "across" for div in divs])[
         0
     ]
@@ -26,7 +33,7 @@ def get_across_down_indexes(divs: Iterable[bs4.Tag]):
     return across_index, down_index
 
 
-def is_parsable_list_type_1(html: str):
+def is_parsable_list_type_1(html: str | ParsedDocument):
     """
     Checks that the HTML primarily consists of paragraphs like this:
 
@@ -52,8 +59,9 @@ def is_parsable_list_type_1(html: str):
     - https://www.fifteensquared.net/2021/05/23/independent-on-sunday-1630-by-raich/
     - https://www.fifteensquared.net/2021/05/19/guardian-28449-pasquale/
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+    import numpy as np
+
+    entry_content = as_document(html).entry_content
     paragraphs = entry_content.find_all("p")
     return (
         np.mean(
@@ -68,13 +76,16 @@ def is_parsable_list_type_1(html: str):
     )
 
 
-def parse_list_type_1(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+@parser_version(1)
+def parse_list_type_1(html: str | ParsedDocument):
+    import numpy as np
+
+    # We remove <br/> tags below, so work on a copy of the tree.
+    entry_content = ParsedDocument.copy_of(as_document(html).entry_content)
     paragraphs = entry_content.find_all("p")
 
     clue_direction = None
-    data = defaultdict(list)
+    data: dict[str, list] = {field: [] for field in Clue._fields}
 
     for paragraph in paragraphs:
         if paragraph.text.strip().lower() == "across":
@@ -117,10 +128,10 @@ def parse_list_type_1(html: str):
             data["definition"].append(definition)
             data["answer"].append(answer)
             data["annotation"].append(annotation)
-    return pd.DataFrame(data)
+    return ClueBatch.from_columns(**data)
 
 
-def is_parsable_list_type_2(html: str):
+def is_parsable_list_type_2(html: str | ParsedDocument):
     """
     Checks that the HTML primarily consists of divs like this:
 
@@ -146,8 +157,7 @@ def is_parsable_list_type_2(html: str):
     - https://www.fifteensquared.net/2021/05/17/financial-times-16787-by-peto/
     - https://www.fifteensquared.net/2021/06/02/guardian-28461-imogen/
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+    entry_content = as_document(html).entry_content
     smallest_divs = [
         div
         for div in entry_content.find_all("div")
@@ -157,24 +167,19 @@ def is_parsable_list_type_2(html: str):
     return 32 * 3 - 20 <= len(smallest_divs) <= 32 * 3 + 20
 
 
-def parse_list_type_2(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+@parser_version(1)
+def parse_list_type_2(html: str | ParsedDocument):
+    entry_content = as_document(html).entry_content
     smallest_divs = [
         div
         for div in entry_content.find_all("div")
         if not div.find("div") and div.text.strip()
     ]
 
-    (across_index,) = np.where(
-        [div.text.strip().lower() == "across" for div in smallest_divs]
-    )[0]
-    (down_index,) = np.where(
-        [div.text.strip().lower() == "down" for div in smallest_divs]
-    )[0]
+    across_index, down_index = get_across_down_indexes(smallest_divs)
 
     i = 1
-    data = defaultdict(list)
+    data: dict[str, list] = {field: [] for field in Clue._fields}
 
     while i < len(smallest_divs) - 3:
         if any([x in [across_index, down_index] for x in [i, i + 1, i + 2]]):
@@ -223,10 +228,10 @@ def parse_list_type_2(html: str):
         except:
             i += 1
 
-    return pd.DataFrame(data)
+    return ClueBatch.from_columns(**data)
 
 
-def is_parsable_list_type_3(html: str):
+def is_parsable_list_type_3(html: str | ParsedDocument):
     """
     Checks that the HTML primarily consists of paragraphs like this (note that
     this test is fairly crude: it merely counts the number of `p` tags that
@@ -249,8 +254,7 @@ def is_parsable_list_type_3(html: str):
     - https://www.fifteensquared.net/2021/05/21/guardian-cryptic-28451-puck/
     - https://www.fifteensquared.net/2021/05/24/guardian-quiptic-1123-matilda/
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+    entry_content = as_document(html).entry_content
     return (
         32 * 2 - 10
         <= len(
@@ -264,20 +268,15 @@ def is_parsable_list_type_3(html: str):
     )
 
 
-def parse_list_type_3(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", "entry-content")
+@parser_version(1)
+def parse_list_type_3(html: str | ParsedDocument):
+    entry_content = as_document(html).entry_content
     paragraphs = entry_content.find_all("p")
 
-    (across_index,) = np.where(
-        [paragraph.text.strip().lower() == "across" for paragraph in paragraphs]
-    )[0]
-    (down_index,) = np.where(
-        [paragraph.text.strip().lower() == "down" for paragraph in paragraphs]
-    )[0]
+    across_index, down_index = get_across_down_indexes(paragraphs)
 
     i = 1
-    data = defaultdict(list)
+    data: dict[str, list] = {field: [] for field in Clue._fields}
 
     while i < len(paragraphs) - 3:
         if any([x in [across_index, down_index] for x in [i, i + 1, i + 2]]):
@@ -326,10 +325,10 @@ def parse_list_type_3(html: str):
         except:
             i += 1
 
-    return pd.DataFrame(data)
+    return ClueBatch.from_columns(**data)
 
 
-def is_parsable_list_type_4(html: str):
+def is_parsable_list_type_4(html: str | ParsedDocument):
     """
     Checks that the HTML primarily consists of divs like this:
 
@@ -345,8 +344,7 @@ def is_parsable_list_type_4(html: str):
     - https://thehinducrosswordcorner.blogspot.com/2021/09/the-sunday-crossword-no-3167-sunday-12.html
     - https://thehinducrosswordcorner.blogspot.com/2021/09/no-13349-friday-10-sep-2021-afterdark.html
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
+    entry_content = as_document(html).entry_content
     smallest_divs = get_smallest_divs(entry_content)
     out = 32 - 10 <= len(smallest_divs) and 32 - 15 <= sum(
         [bool(div.find_all("i")) for div in smallest_divs]
@@ -354,9 +352,9 @@ def is_parsable_list_type_4(html: str):
     return out
 
 
-def parse_list_type_4(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
+@parser_version(1)
+def parse_list_type_4(html: str | ParsedDocument):
+    entry_content = as_document(html).entry_content
     smallest_divs = get_smallest_divs(entry_content)
     across_index, down_index = get_across_down_indexes(smallest_divs)
 
@@ -399,11 +397,10 @@ def parse_list_type_4(html: str):
         clues, [tag.text for tag in entry_content.find_all("i")]
     )
 
-    out = pd.DataFrame(
-        data=np.transpose(np.array([clue_numbers, answers, clues, annotations])),
-        columns=["clue_number", "answer", "clue", "annotation"],
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
     )
-    if definitions is not None:
-        out["definition"] = definitions
-
-    return out
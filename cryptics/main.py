@@ -5,54 +5,117 @@ import json
 import logging
 import sqlite3
 from datetime import datetime
-from typing import Any, Callable, List
+from typing import Any, Callable, Iterator
 
 from cryptics.config import BLOG_SOURCES, SQLITE_DATABASE
-from cryptics.parse import try_parse
-from cryptics.scrape_blogs import scrape_blogs
+from cryptics.database import (
+    ClueWriter,
+    ParserStats,
+    count_raw,
+    initialize_db,
+    iter_raw,
+)
+from cryptics.parse import PARSER_NAMES
 from cryptics.utils import get_logger
+from cryptics.workers import Result, parse_html, parse_html_in_pool, worker_pool
 
 
 def parse_unparsed_html(
     sources: dict[str, Callable[[Any], Any]],
     datetime_requested: str,
+    workers: int = 1,
+    adaptive_dispatch: bool = False,
     logger: logging.Logger | None = None,
 ):
+    """Parse all unparsed HTML in the `raw` table, and write the parsed clues
+    to the `clues` table.
+
+    sources: blog sources to parse.
+    datetime_requested: only parse HTML requested on or after this date.
+    workers: number of worker processes to parse with. Parsed clues are
+        collected and written to the database by this (i.e. a single) process,
+        in the same order as when parsing serially, and committed in batches
+        by a ClueWriter.
+    adaptive_dispatch: if True, try the parsers that have most often parsed
+        posts from the same source (and with similar URLs) first, according to
+        the `parser_stats` table as of the start of the run. This can change
+        which parser parses a post that more than one parser accepts, so it is
+        off by default. Whether or not this is True, every attempt is recorded
+        in the `parser_stats` table.
+    logger: logger to use.
+    """
     if logger is None:
         logger = get_logger()
 
-    for source in sources:
-        with sqlite3.connect(SQLITE_DATABASE) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"SELECT location FROM raw WHERE content_type = 'html' AND source = '{source}' AND NOT is_parsed AND datetime_requested >= '{datetime_requested}';"
-            )
-            urls = [url for url, in cursor.fetchall()]
+    # Number of detectors called, and the number that would have been called in
+    # the default order.
+    num_calls = 0
+    num_default_calls = 0
+
+    with worker_pool(workers) as pool, sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
+        stats = ParserStats.load(conn)
+        # Take the order from a snapshot, so that it does not depend on how far
+        # ahead of the recorded attempts a process pool has read.
+        dispatch = stats.snapshot() if adaptive_dispatch else None
+        with ClueWriter(conn) as writer:
+            for source in sources:
+                num_urls = count_raw(
+                    conn,
+                    content_type="html",
+                    source=source,
+                    datetime_requested=datetime_requested,
+                    is_parsed=False,
+                )
+                tasks = (
+                    (
+                        i,
+                        num_urls,
+                        url,
+                        html,
+                        dispatch.order(source, url) if dispatch is not None else [],
+                    )
+                    for i, (_, _, url, html) in enumerate(
+                        iter_raw(
+                            conn,
+                            content_type="html",
+                            source=source,
+                            datetime_requested=datetime_requested,
+                            is_parsed=False,
+                        )
+                    )
+                )
 
-        for i, url in enumerate(urls):
-            with sqlite3.connect(SQLITE_DATABASE) as conn:
-                cursor = conn.cursor()
-                cursor.execute(f"SELECT content FROM raw WHERE location = '{url}';")
-                (html,) = cursor.fetchone()
+                if pool is None:
+                    results: Iterator[Result] = (
+                        parse_html(task, logger=logger) for task in tasks
+                    )
+                else:
+                    results = parse_html_in_pool(pool, tasks, window=16 * workers)
 
-            data = None
-            try:
-                logger.info(f"Parsing {i}/{len(urls)}: {url}")
-                data = try_parse(html, url)
-            except:
-                logger.error(f"Failed to parse: {url}", exc_info=True)
+                for url, data, attempts, sha256 in results:
+                    stats.record(source, url, attempts)
+                    num_calls += len(attempts)
 
-            if data is None:
-                logger.error(f"Parse returned None: {url}")
-                continue
+                    if data is None:
+                        num_default_calls += len(PARSER_NAMES)
+                        logger.error(f"Parse returned None: {url}")
+                        writer.write_failure(url, sha256)
+                        continue
 
-            data["source"] = source
-            with sqlite3.connect(SQLITE_DATABASE) as conn:
-                data.to_sql(f"clues", conn, if_exists="append", index=False)
+                    # try_parse records the parser of every batch it returns.
+                    assert data.parser is not None
+                    num_default_calls += PARSER_NAMES.index(data.parser) + 1
+                    data.source = source
+                    writer.write(data, location=url, content_sha256=sha256)
 
-                cursor = conn.cursor()
-                sql = f"UPDATE raw SET is_parsed = TRUE, datetime_parsed = datetime('now') WHERE location = '{url}';"
-                cursor.execute(sql)
+                stats.save(conn)
+
+    logger.info(
+        f"Called {num_calls} detectors ({num_default_calls} in the default order)"
+    )
+    for parser, (hits, misses) in stats.hits_and_misses().items():
+        logger.info(f"{parser}: {hits} hits, {misses} misses")
 
 
 if __name__ == "__main__":
@@ -63,14 +126,34 @@ if __name__ == "__main__":
     parser.add_argument("--no-scrape", dest="scrape", action="store_false")
     parser.set_defaults(scrape=True)
     parser.add_argument("--sleep-interval", type=int, default=20)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--adaptive-dispatch", dest="adaptive_dispatch", action="store_true"
+    )
+    parser.add_argument(
+        "--no-adaptive-dispatch", dest="adaptive_dispatch", action="store_false"
+    )
+    parser.set_defaults(adaptive_dispatch=False)
     parser.add_argument(
         "--datetime-requested", type=str, default=datetime.now().strftime("%Y-%m-%d")
     )
     args = parser.parse_args()
 
     if args.scrape:
-        scrape_blogs(sources=BLOG_SOURCES, sleep_interval=args.sleep_interval)
+        # Only import requests (and friends) if we scrape.
+        from cryptics.scrape_blogs import scrape_blogs
+
+        scrape_blogs(
+            sources=BLOG_SOURCES,
+            sleep_interval=args.sleep_interval,
+            max_concurrency=args.max_concurrency,
+        )
 
     parse_unparsed_html(
-        sources=BLOG_SOURCES, datetime_requested=args.datetime_requested, logger=logger
+        sources=BLOG_SOURCES,
+        datetime_requested=args.datetime_requested,
+        workers=args.workers,
+        adaptive_dispatch=args.adaptive_dispatch,
+        logger=logger,
     )
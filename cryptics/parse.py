@@ -1,11 +1,10 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable
-
-import bs4
-import pandas as pd
+from typing import Any, Callable
 
+from cryptics.clues import Clue, ClueBatch
+from cryptics.document import ParsedDocument, as_document
 from cryptics.lists import (
     is_parsable_list_type_1,
     is_parsable_list_type_2,
@@ -43,78 +42,155 @@ from cryptics.utils import (
     get_logger,
 )
 
+# Pairs of detectors and parsers, in the order in which they are tried by
+# default. Parsers are referred to by the name of their parse function.
+PARSERS: list[
+    tuple[Callable[[ParsedDocument], bool], Callable[[ParsedDocument], ClueBatch]]
+] = [
+    (is_parsable_table_type_1, parse_table_type_1),
+    (is_parsable_table_type_2, parse_table_type_2),
+    (is_parsable_table_type_3, parse_table_type_3),
+    (is_parsable_table_type_4, parse_table_type_4),
+    (is_parsable_table_type_5, parse_table_type_5),
+    (is_parsable_list_type_1, parse_list_type_1),
+    (is_parsable_list_type_2, parse_list_type_2),
+    (is_parsable_list_type_3, parse_list_type_3),
+    (is_parsable_list_type_4, parse_list_type_4),
+    (is_parsable_text_type_1, parse_text_type_1),
+    (is_parsable_text_type_2, parse_text_type_2),
+    (is_parsable_special_type_1, parse_special_type_1),
+]
+PARSER_NAMES = [parse_func.__name__ for _, parse_func in PARSERS]
+# Current version of each parser. See cryptics.utils.parser_version.
+PARSER_VERSIONS = {
+    parse_func.__name__: getattr(parse_func, "version") for _, parse_func in PARSERS
+}
+
+
+def order_parsers(parser_order: list[str] | None = None):
+    """Return PARSERS, with the parsers named in `parser_order` first (in that
+    order) and all others after them (in the default order).
+    """
+    if not parser_order:
+        return PARSERS
+    parsers_by_name = dict(zip(PARSER_NAMES, PARSERS))
+    preferred = [name for name in parser_order if name in parsers_by_name]
+    return [parsers_by_name[name] for name in preferred] + [
+        parser for name, parser in parsers_by_name.items() if name not in preferred
+    ]
+
 
 def try_to_parse_as(
     source_url: str,
-    html: str,
-    is_parsable_func: Callable[[str], bool],
-    parse_func: Callable[[str], pd.DataFrame],
+    html: str | ParsedDocument,
+    is_parsable_func: Callable[[ParsedDocument], bool],
+    parse_func: Callable[[ParsedDocument], ClueBatch],
     logger: logging.Logger | None = None,
 ):
     if logger is None:
         logger = get_logger()
 
+    document = as_document(html)
+
     try:
-        is_parseable = is_parsable_func(html)
+        is_parseable = is_parsable_func(document)
     except:
         return None
 
     if is_parseable:
         logger.info(f"Parsing using {parse_func.__name__}: {source_url}")
-        return parse_func(html)
-
+        data = parse_func(document)
+        # A parser that finds no clues has failed to parse the post, so that
+        # the next parser is tried (and the post is not marked as parsed).
+        if data is not None and len(data) == 0:
+            return None
+        return data
+
+
+def _strip(value: Any) -> str | None:
+    # Like pandas' `.str.strip()`, which made anything but a string missing.
+    return value.strip() if isinstance(value, str) else None
+
+
+def strip_clues(data: ClueBatch) -> None:
+    """Strip whitespace from every field of every clue in a batch, in place."""
+    clues = []
+    for clue in data:
+        clue_number = _strip(clue.clue_number)
+        clues.append(
+            Clue(
+                # A clue number that is just a period is dropped, rather than
+                # removing periods in each parsing function.
+                clue_number="" if clue_number == "." else clue_number,
+                clue=_strip(clue.clue),
+                answer=_strip(clue.answer),
+                definition=_strip(clue.definition),
+                annotation=_strip(clue.annotation),
+            )
+        )
+    data.clues = clues
 
-def postprocess_data(data: pd.DataFrame, html: str, source_url: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
 
-    data["clue"] = data["clue"].str.strip()
-    data["answer"] = data["answer"].str.strip()
-    data["definition"] = data["definition"].str.strip()
-    data["annotation"] = data["annotation"].str.strip()
-    # Instead of removing periods in each parsing function, we can just remove
-    # them here - it's simpler.
-    data["clue_number"] = data["clue_number"].str.strip().replace(".", "")
+def postprocess_data(
+    data: ClueBatch, html: str | ParsedDocument, source_url: str
+) -> ClueBatch:
+    soup = as_document(html).soup
 
-    data["puzzle_name"] = extract_string_from_url_and_soup(
+    strip_clues(data)
+    data.puzzle_name = extract_string_from_url_and_soup(
         source_url, soup, PUZZLE_NAME_EXTRACTORS
     )
-    data["puzzle_date"] = extract_string_from_url_and_soup(
+    data.puzzle_date = extract_string_from_url_and_soup(
         source_url, soup, PUZZLE_DATE_EXTRACTORS
     )
-    data["puzzle_url"] = extract_string_from_url_and_soup(
+    data.puzzle_url = extract_string_from_url_and_soup(
         source_url, soup, PUZZLE_URL_EXTRACTORS
     )
-    data["source_url"] = source_url
+    data.source_url = source_url
     return data
 
 
-def try_parse(html: str, source_url: str, logger: logging.Logger | None = None):
+def try_parse(
+    html: str | ParsedDocument,
+    source_url: str,
+    logger: logging.Logger | None = None,
+    parser_order: list[str] | None = None,
+    attempts: list[tuple[str, bool]] | None = None,
+):
+    """Parse a blog post with the first parser whose detector accepts it, and
+    that finds at least one clue in it.
+
+    The parser used, and its version, are recorded in the returned ClueBatch's
+    `parser` and `parser_version`.
+
+    html: HTML of the blog post.
+    source_url: URL of the blog post.
+    logger: logger to use.
+    parser_order: names of parsers to try first, e.g. from
+        ParserStats.order. All other parsers are tried after them, in the
+        default order, so every parser is still tried before giving up.
+    attempts: if not None, a tuple of (parser name, whether it parsed the
+        post) is appended for every parser tried. A parser that finds no clues
+        did not parse the post.
+    """
     if logger is None:
         logger = get_logger()
 
+    # Parse the HTML (lazily) once, and share it across all parsers.
+    document = as_document(html)
     data = None
 
-    parsers = [
-        (is_parsable_table_type_1, parse_table_type_1),
-        (is_parsable_table_type_2, parse_table_type_2),
-        (is_parsable_table_type_3, parse_table_type_3),
-        (is_parsable_table_type_4, parse_table_type_4),
-        (is_parsable_table_type_5, parse_table_type_5),
-        (is_parsable_list_type_1, parse_list_type_1),
-        (is_parsable_list_type_2, parse_list_type_2),
-        (is_parsable_list_type_3, parse_list_type_3),
-        (is_parsable_list_type_4, parse_list_type_4),
-        (is_parsable_text_type_1, parse_text_type_1),
-        (is_parsable_text_type_2, parse_text_type_2),
-        (is_parsable_special_type_1, parse_special_type_1),
-    ]
-
-    for is_parsable_func, parse_func in parsers:
+    for is_parsable_func, parse_func in order_parsers(parser_order):
         data = try_to_parse_as(
-            source_url, html, is_parsable_func, parse_func, logger=logger
+            source_url, document, is_parsable_func, parse_func, logger=logger
         )
+        if attempts is not None:
+            attempts.append((parse_func.__name__, data is not None))
         if data is not None:
             logger.info(f"Successfully parsed: {source_url}")
-            return postprocess_data(data, html, source_url)
+            data = postprocess_data(data, document, source_url)
+            data.parser = parse_func.__name__
+            data.parser_version = PARSER_VERSIONS[parse_func.__name__]
+            return data
 
     return None
@@ -4,11 +4,12 @@ import os
 import sqlite3
 from glob import glob
 
-import numpy as np
-import pandas as pd
 import puz
 
+from cryptics.clues import ClueBatch
+from cryptics.compression import RawCodec
 from cryptics.config import SQLITE_DATABASE
+from cryptics.database import ClueWriter, initialize_db, insert_raw
 from cryptics.utils import get_logger
 
 
@@ -19,20 +20,23 @@ def last_dirname_basename(path: str):
     )
 
 
-def insert_puz(source: str, path: str, puz_filename: str):
+def insert_puz(
+    conn: sqlite3.Connection,
+    codec: RawCodec,
+    source: str,
+    path: str,
+    puz_filename: str,
+):
+    """Insert a .puz file into the `raw` table. The insert is not committed, so
+    that it can share a transaction with the file's parsed clues.
+    """
     with open(puz_filename, "rb") as f:
         puz_blob = f.read()
 
-    with sqlite3.connect(SQLITE_DATABASE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO raw (source, location, content_type, content) VALUES (?, ?, 'puz', ?)",
-            (source, path, puz_blob),
-        )
-        conn.commit()
+    insert_raw(conn, codec, source, path, "puz", puz_blob)
 
 
-def parse_puz(puz_filename: str):
+def parse_puz(puz_filename: str) -> ClueBatch:
     puzzle = puz.read(puz_filename)
     numbering = puzzle.clue_numbering()
 
@@ -47,41 +51,16 @@ def parse_puz(puz_filename: str):
         )
         for clue in numbering.down
     ]
-    definitions = len(clues) * [None]
-    annotations = len(clues) * [None]
     clue_numbers = [str(clue["num"]) + "a" for clue in numbering.across] + [
         str(clue["num"]) + "d" for clue in numbering.down
     ]
-    puzzle_dates = len(clues) * [None]
-    puzzle_names = [puzzle.title for _ in range(len(clues))]
-    puzzle_urls = len(clues) * [None]
-    source_urls = [last_dirname_basename(puz_filename) for _ in range(len(clues))]
-
-    return pd.DataFrame(
-        data=np.array(
-            [
-                clues,
-                answers,
-                definitions,
-                annotations,
-                clue_numbers,
-                puzzle_dates,
-                puzzle_names,
-                puzzle_urls,
-                source_urls,
-            ]
-        ).T,
-        columns=[
-            "clue",
-            "answer",
-            "definition",
-            "annotation",
-            "clue_number",
-            "puzzle_date",
-            "puzzle_name",
-            "puzzle_url",
-            "source_url",
-        ],
+
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        puzzle_name=puzzle.title,
+        source_url=last_dirname_basename(puz_filename),
     )
 
 
@@ -94,6 +73,7 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     with sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
         cursor = conn.cursor()
         cursor.execute(f"SELECT DISTINCT source_url FROM clues;")
         known_urls = {url for url, in cursor.fetchall()}
@@ -104,11 +84,17 @@ if __name__ == "__main__":
         if last_dirname_basename(puz_filename) not in known_urls
     }
 
-    for puz_filename in new_puz_filenames:
-        logger.info(f"Parsing: {puz_filename}")
-        data = parse_puz(puz_filename)
-        data["source"] = args.source
-        with sqlite3.connect(SQLITE_DATABASE) as conn:
-            data.to_sql(f"clues", conn, if_exists="append", index=False)
-
-        insert_puz(args.source, last_dirname_basename(puz_filename), puz_filename)
+    with sqlite3.connect(SQLITE_DATABASE) as conn, ClueWriter(conn) as writer:
+        codec = RawCodec(conn)
+        for puz_filename in new_puz_filenames:
+            logger.info(f"Parsing: {puz_filename}")
+            data = parse_puz(puz_filename)
+            data.source = args.source
+            insert_puz(
+                conn,
+                codec,
+                args.source,
+                last_dirname_basename(puz_filename),
+                puz_filename,
+            )
+            writer.write(data)
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sqlite3
+from typing import Iterator
+
+from cryptics.config import SQLITE_DATABASE
+from cryptics.database import ClueWriter, initialize_db, read_raw
+from cryptics.parse import PARSER_VERSIONS
+from cryptics.utils import get_logger
+from cryptics.workers import Result, parse_html, parse_html_in_pool, worker_pool
+
+POSTS_TO_REPARSE_SQL = """
+SELECT raw.source, raw.location
+FROM raw
+LEFT JOIN parse_results USING (location)
+LEFT JOIN temp.parser_versions USING (parser)
+WHERE
+    raw.content_type = 'html'
+    AND (
+        -- Posts that failed to parse
+        (parse_results.location IS NOT NULL AND parse_results.parser IS NULL)
+        -- Posts whose parser has changed (or no longer exists), unless that
+        -- version of it has already failed to reparse them
+        OR (
+            parse_results.parser IS NOT NULL
+            AND parse_results.parser_version IS NOT temp.parser_versions.parser_version
+            AND parse_results.failed_parser_version
+                IS NOT COALESCE(temp.parser_versions.parser_version, -1)
+        )
+        -- Posts parsed before parse results were recorded
+        OR (parse_results.location IS NULL AND (NOT raw.is_parsed OR ?))
+    )
+ORDER BY raw.rowid;
+"""
+
+
+def posts_to_reparse(
+    conn: sqlite3.Connection, include_unrecorded: bool = False
+) -> list[tuple[str, str]]:
+    """Return the `(source, location)` of blog posts whose parser has a new
+    version, or that failed to parse. Posts with reviewed clues are never
+    returned, since reparsing them would discard the reviews.
+
+    conn: connection to the database.
+    include_unrecorded: if True, also return posts that were parsed before
+        parse results were recorded, and whose parser is therefore unknown.
+    """
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS parser_versions (parser TEXT PRIMARY KEY, parser_version INTEGER);"
+    )
+    conn.execute("DELETE FROM temp.parser_versions;")
+    conn.executemany(
+        "INSERT INTO temp.parser_versions VALUES (?, ?);", PARSER_VERSIONS.items()
+    )
+
+    reviewed_urls = {
+        url
+        for url, in conn.execute(
+            "SELECT DISTINCT source_url FROM clues WHERE is_reviewed;"
+        )
+    }
+    return [
+        (source, location)
+        for source, location in conn.execute(
+            POSTS_TO_REPARSE_SQL, (include_unrecorded,)
+        )
+        if location not in reviewed_urls
+    ]
+
+
+def reparse(
+    include_unrecorded: bool = False,
+    workers: int = 1,
+    logger: logging.Logger | None = None,
+):
+    """Reparse blog posts whose parser has a new version, or that failed to
+    parse, and replace their clues.
+
+    A post is only rewritten if it is now parsed by a different parser (or
+    parser version), or its content has changed, since it was last parsed. If
+    a post that used to parse now fails to, its clues are kept, and the failure
+    is logged and recorded, so that it is not reparsed again until its parser
+    changes again.
+
+    include_unrecorded: if True, also reparse posts that were parsed before
+        parse results were recorded.
+    workers: number of worker processes to parse with.
+    logger: logger to use.
+    """
+    if logger is None:
+        logger = get_logger()
+
+    with worker_pool(workers) as pool, sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
+        posts = posts_to_reparse(conn, include_unrecorded=include_unrecorded)
+        sources = {location: source for source, location in posts}
+        logger.info(f"Found {len(posts)} posts to reparse")
+
+        def tasks():
+            for i, (_, location) in enumerate(posts):
+                row = read_raw(conn, location)
+                if row is not None:
+                    yield i, len(posts), location, row[1], []
+
+        if pool is None:
+            results: Iterator[Result] = (
+                parse_html(task, logger=logger) for task in tasks()
+            )
+        else:
+            results = parse_html_in_pool(pool, tasks(), window=16 * workers)
+
+        num_rewritten = 0
+        with ClueWriter(conn) as writer:
+            for url, data, _, sha256 in results:
+                previous = conn.execute(
+                    "SELECT content_sha256, parser, parser_version FROM parse_results WHERE location = ?;",
+                    (url,),
+                ).fetchone()
+                current = (
+                    sha256,
+                    data.parser if data is not None else None,
+                    data.parser_version if data is not None else None,
+                )
+                if current == previous:
+                    continue
+
+                if data is None:
+                    if previous is not None and previous[1] is not None:
+                        logger.error(f"Failed to reparse, keeping old clues: {url}")
+                        writer.write_reparse_failure(
+                            url, PARSER_VERSIONS.get(previous[1], -1)
+                        )
+                    else:
+                        writer.write_failure(url, sha256)
+                    continue
+
+                data.source = sources[url]
+                conn.execute("DELETE FROM clues WHERE source_url = ?;", (url,))
+                writer.write(data, location=url, content_sha256=sha256)
+                num_rewritten += 1
+
+    logger.info(f"Reparsed {num_rewritten} posts")
+
+
+if __name__ == "__main__":
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(
+        description="Reparse blog posts whose parser has changed, or that failed to parse."
+    )
+    parser.add_argument("--include-unrecorded", action="store_true")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    reparse(
+        include_unrecorded=args.include_unrecorded,
+        workers=args.workers,
+        logger=logger,
+    )
@@ -8,6 +8,7 @@ import readline
 import sqlite3
 
 from cryptics.config import SQLITE_DATABASE
+from cryptics.database import clue_hash
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--rowid", type=str, nargs="?", default=None)
@@ -74,6 +75,7 @@ while True:
             source_url,
             _,
             _,
+            _,
         ) = cursor.fetchone()
 
     print(f"{Colors.YELLOW}             {args.source}/{row_id}{Colors.ENDC}")
@@ -117,24 +119,40 @@ while True:
                 puzzle_date = ?,
                 puzzle_name = ?,
                 puzzle_url = ?,
-                source_url = ?
+                source_url = ?,
+                clue_hash = ?
             WHERE rowid = ?;
             """
-            cursor.execute(
-                sql,
-                (
-                    clue,
-                    answer,
-                    definition,
-                    annotation,
-                    clue_number,
-                    puzzle_date,
-                    puzzle_name,
-                    puzzle_url,
-                    source_url,
-                    row_id,
-                ),
-            )
+            try:
+                cursor.execute(
+                    sql,
+                    (
+                        clue,
+                        answer,
+                        definition,
+                        annotation,
+                        clue_number,
+                        puzzle_date,
+                        puzzle_name,
+                        puzzle_url,
+                        source_url,
+                        clue_hash(
+                            source_url,
+                            clue,
+                            answer,
+                            definition,
+                            clue_number,
+                            puzzle_date,
+                            puzzle_name,
+                            puzzle_url,
+                        ),
+                        row_id,
+                    ),
+                )
+            except sqlite3.IntegrityError:
+                print(f"{Colors.RED}Not saved: this clue already exists.{Colors.ENDC}")
+                input()
+                continue
     elif user_input.strip() == "d":
         with sqlite3.connect(SQLITE_DATABASE) as conn:
             cursor = conn.cursor()
@@ -1,55 +1,257 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import json
 import logging
 import sqlite3
 import time
-from typing import Callable
+from typing import Callable, Iterator
+from urllib.parse import urlparse
 
 import requests
 
-from cryptics.config import BLOG_SOURCES, HEADERS, SQLITE_DATABASE
+from cryptics import http_client
+from cryptics.compression import RawCodec
+from cryptics.config import BLOG_SOURCES, SQLITE_DATABASE
+from cryptics.database import (
+    PendingSitemapState,
+    SitemapState,
+    initialize_db,
+    insert_raw,
+)
 from cryptics.utils import get_logger
 
+# HTTP status codes that are worth retrying.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Rate limit requests to one host.
+
+    Tokens are added at `rate` per second, up to `capacity`, and each request
+    takes one token. With the default capacity of one token, requests are
+    started at least `1 / rate` seconds apart.
+
+    rate: tokens per second. If zero or less, requests are not rate limited.
+    capacity: maximum number of tokens, i.e. the largest burst of requests.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last_refill) * self.rate
+                )
+                self._last_refill = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class BlogScraper:
+    """Scrape blog sources concurrently, with a politeness limit per host.
+
+    All sources are scraped at the same time. Requests to each host (including
+    those for its sitemaps) are rate limited by their own TokenBucket, and at
+    most `max_concurrency` requests are in flight across all hosts, sharing the pooled, keep-alive connections of
+    cryptics.http_client. Failed requests are retried with exponential
+    backoff, and each response is compressed and inserted into the `raw` table
+    as soon as it arrives. The validators of a source's sitemaps are only saved
+    once all of the new posts found in them have been inserted (see
+    PendingSitemapState), so posts that fail are found again next time.
+
+    conn: connection to the database to insert into.
+    sitemap_state: if not None, used to skip sitemaps that have not changed
+        since they were last scraped.
+    sleep_interval: minimum number of seconds between requests to each host.
+    max_concurrency: maximum number of requests in flight across all hosts.
+    max_retries: maximum number of times to retry a failed request.
+    backoff: number of seconds to wait before the first retry. This doubles
+        with every subsequent retry.
+    logger: logger to use.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        sitemap_state: SitemapState | None = None,
+        sleep_interval: float = 20,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        logger: logging.Logger | None = None,
+    ):
+        self.conn = conn
+        self.codec = RawCodec(conn)
+        self.sitemap_state = sitemap_state
+        self.rate = 1 / sleep_interval if sleep_interval > 0 else 0
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.logger = logger if logger is not None else get_logger()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def _bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate)
+        return self._buckets[host]
+
+    async def _acquire(self, url: str) -> None:
+        await self._bucket(url).acquire()
+        await self._semaphore.acquire()
+
+    @contextlib.contextmanager
+    def _limit_from_thread(
+        self, loop: asyncio.AbstractEventLoop, url: str
+    ) -> Iterator[None]:
+        """Limit a request sent from a thread other than the event loop's (i.e.
+        by a sitemap discovery function) as requests sent by `request` are.
+        """
+        asyncio.run_coroutine_threadsafe(self._acquire(url), loop).result()
+        try:
+            yield
+        finally:
+            loop.call_soon_threadsafe(self._semaphore.release)
+
+    async def scrape(self, sources: dict[str, Callable[..., set[str]]]) -> None:
+        await asyncio.gather(
+            *[
+                self.scrape_source(source, get_new_urls_func)
+                for source, get_new_urls_func in sources.items()
+            ]
+        )
+
+    async def scrape_source(
+        self, source: str, get_new_urls_func: Callable[..., set[str]]
+    ) -> None:
+        # Get new URLs from the blog
+        self.logger.info(f"Scraping {source}")
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT location FROM raw WHERE source = ? AND content_type = 'html';",
+            (source,),
+        )
+        known_urls = {url[0] for url in cursor.fetchall()}
+        sitemap_state = (
+            PendingSitemapState(self.sitemap_state.database)
+            if self.sitemap_state is not None
+            else None
+        )
+        # Sitemaps are requested by http_client.get in another thread, so they
+        # are limited from there. The limiter is unset again before any posts
+        # are requested, since `request` limits those itself.
+        loop = asyncio.get_running_loop()
+        token = http_client.request_limiter.set(
+            lambda url: self._limit_from_thread(loop, url)
+        )
+        try:
+            new_urls = await asyncio.to_thread(
+                get_new_urls_func, known_urls, sitemap_state=sitemap_state
+            )
+        except:
+            self.logger.error(f"Failed to get new urls from {source}", exc_info=True)
+            return
+        finally:
+            http_client.request_limiter.reset(token)
+        self.logger.info(f"Found {len(new_urls)} new urls from {source}")
+
+        # Request new URLs. Requests are started no faster than the host's rate
+        # limit allows, but may overlap if the host is slow to respond.
+        urls = list(new_urls)
+        requests_ = []
+        for i, url in enumerate(urls):
+            await self._bucket(url).acquire()
+            self.logger.info(f"Requesting {i}/{len(urls)}: {url}")
+            requests_.append(asyncio.create_task(self.request_and_insert(source, url)))
+        inserted = await asyncio.gather(*requests_)
+
+        if sitemap_state is not None:
+            sitemap_state.save(
+                failed_urls=[url for url, ok in zip(urls, inserted) if not ok]
+            )
+
+    async def request_and_insert(self, source: str, url: str) -> bool:
+        """Request a URL and insert the response into the `raw` table. Returns
+        whether it was inserted.
+        """
+        response = await self.request(url)
+        if response is None or not response.ok:
+            self.logger.error(f"Response not OK: {url}")
+            return False
+
+        try:
+            insert_raw(self.conn, self.codec, source, url, "html", response.text)
+            self.conn.commit()
+        except:
+            self.logger.error(f"Error inserting into database: {url}")
+            return False
+        return True
+
+    async def request(self, url: str) -> requests.Response | None:
+        response = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                await self._bucket(url).acquire()
+                self.logger.info(f"Retrying ({attempt}/{self.max_retries}): {url}")
+
+            async with self._semaphore:
+                try:
+                    response = await asyncio.to_thread(http_client.get, url)
+                except requests.RequestException:
+                    self.logger.warning(f"Request failed: {url}", exc_info=True)
+                    # Never return the response of an earlier attempt.
+                    response = None
+                    continue
+
+            if response.status_code not in RETRY_STATUS_CODES:
+                break
+
+        return response
+
 
 def scrape_blogs(
-    sources: dict[str, Callable[[set[str]], set[str]]],
+    sources: dict[str, Callable[..., set[str]]],
     sleep_interval: int = 20,
+    max_concurrency: int = 8,
+    max_retries: int = 3,
     logger: logging.Logger | None = None,
 ):
+    """Scrape new blog posts from all sources concurrently, and insert them into
+    the `raw` table. See BlogScraper for details.
+    """
     if logger is None:
         logger = get_logger()
 
-    for source, get_new_urls_func in sources.items():
-        # Get new URLs from the blog
-        logger.info(f"Scraping {source}")
-        with sqlite3.connect(SQLITE_DATABASE) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                f"SELECT location FROM raw WHERE content_type = 'html' AND source = '{source}';"
-            )
-            known_urls = {url[0] for url in cursor.fetchall()}
-        new_urls = get_new_urls_func(known_urls)
-        logger.info(f"Found {len(new_urls)} new urls from {source}")
-
-        # Request new URLs
-        for i, url in enumerate(new_urls):
-            logger.info(f"Requesting {i}/{len(new_urls)}: {url}")
-            response = requests.get(url, headers=HEADERS)
-            try:
-                if not response.ok:
-                    logger.error(f"Response not OK: {url}")
-                    continue
-
-                with sqlite3.connect(SQLITE_DATABASE) as conn:
-                    cursor = conn.cursor()
-                    sql = f"INSERT INTO raw (source, location, content_type, content) VALUES (?, ?, 'html', ?)"
-                    cursor.execute(sql, (source, url, response.text))
-                    conn.commit()
-            except:
-                logger.error(f"Error inserting into database: {url}")
+    async def scrape(conn: sqlite3.Connection) -> None:
+        # The scraper must be created inside the event loop that runs it.
+        scraper = BlogScraper(
+            conn,
+            sitemap_state=SitemapState(SQLITE_DATABASE),
+            sleep_interval=sleep_interval,
+            max_concurrency=max_concurrency,
+            max_retries=max_retries,
+            logger=logger,
+        )
+        await scraper.scrape(sources)
 
-            time.sleep(sleep_interval)
+    with sqlite3.connect(SQLITE_DATABASE) as conn:
+        initialize_db(conn)
+        asyncio.run(scrape(conn))
 
 
 if __name__ == "__main__":
@@ -3,10 +3,9 @@ from __future__ import annotations
 import re
 import string
 
-import bs4
-import pandas as pd
-
-from cryptics.utils import align_suspected_definitions_with_clues
+from cryptics.clues import ClueBatch
+from cryptics.document import ParsedDocument, as_document
+from cryptics.utils import align_suspected_definitions_with_clues, parser_version
 
 DASHES = ["-", "—", "–", "–", "—"]
 PUNCTUATION_IN_CLUE = list("/\\")
@@ -20,7 +19,7 @@ def delete_chars(string: str, chars: list[str]):
     return string
 
 
-def is_parsable_special_type_1(html: str):
+def is_parsable_special_type_1(html: str | ParsedDocument):
     """
     Identifies if the web page looks like this:
 
@@ -43,8 +42,7 @@ def is_parsable_special_type_1(html: str):
     - https://natpostcryptic.blogspot.com/2021/09/saturday-september-4-2020-cox-rathvon.html
     """
 
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
+    entry_content = as_document(html).entry_content
     answers_and_annotations = [
         line for line in entry_content.text.split("\n") if line.strip()
     ]
@@ -69,9 +67,10 @@ def is_parsable_special_type_1(html: str):
     )
 
 
-def parse_special_type_1(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
+@parser_version(1)
+def parse_special_type_1(html: str | ParsedDocument):
+    # We extract all tables below, so work on a copy of the tree.
+    entry_content = ParsedDocument.copy_of(as_document(html).entry_content)
 
     clue_number_and_clues = [
         a.text.strip()
@@ -159,12 +158,14 @@ def parse_special_type_1(html: str):
 
     definitions = align_suspected_definitions_with_clues(clues, raw_definitions)
 
-    out = pd.DataFrame(
-        data=[clue_numbers, answers, clues, annotations, definitions],
-        index=["clue_number", "answer", "clue", "annotation", "definition"],
-    ).T
-
-    if out.isna().any(0).any(0):
+    # Every clue must have exactly one answer (and vice versa), and a definition.
+    if len(answers) != len(clues) or None in definitions:
         return None
 
-    return out
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
+    )
@@ -1,17 +1,19 @@
 from __future__ import annotations
 
 import re
-from typing import Iterable
+from typing import TYPE_CHECKING
 
-import bs4
-import numpy as np
-import pandas as pd
+from cryptics.clues import ClueBatch
+from cryptics.document import ParsedDocument, as_document
+from cryptics.utils import align_suspected_definitions_with_clues, parser_version
 
-from cryptics.utils import align_suspected_definitions_with_clues
+if TYPE_CHECKING:
+    import bs4
+    import pandas as pd
 
 
-def is_parsable_table_type_1(html: str):
-    tables = pd.read_html(html)
+def is_parsable_table_type_1(html: str | ParsedDocument):
+    tables = as_document(html).tables
     for table in tables:
         try:
             if _is_parsable_table_type_1(table):
@@ -46,9 +48,13 @@ def _is_parsable_table_type_1(table: pd.DataFrame):
     return all(
         [
             # There is a row that says ACROSS in all cells
-            (table.astype(str).applymap(str.lower) == "across").all(axis=1).any(),
+            (table.astype(str).apply(lambda column: column.str.lower()) == "across")
+            .all(axis=1)
+            .any(),
             # There is a row that says DOWN in all cells
-            (table.astype(str).applymap(str.lower) == "down").all(axis=1).any(),
+            (table.astype(str).apply(lambda column: column.str.lower()) == "down")
+            .all(axis=1)
+            .any(),
             # Asides from the ACROSS and DOWN rows, the first two columns are exactly half NaN
             2 * table[[0, 1]].isna().all(axis=1).sum() == table.shape[0] - 2,
             # The first column (except for the ACROSS and DOWN rows) is all numeric
@@ -70,7 +76,7 @@ def _is_parsable_table_type_1(table: pd.DataFrame):
             ),
             # The third column (except for the ACROSS and DOWN rows) has around half of its
             # rows ending in enumerations, give or take 4
-            np.abs(
+            abs(
                 (
                     sum(
                         [
@@ -88,26 +94,28 @@ def _is_parsable_table_type_1(table: pd.DataFrame):
     )
 
 
-def parse_table_type_1(html: str):
-    tables = pd.read_html(html)
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    for table in tables:
+@parser_version(2)
+def parse_table_type_1(html: str | ParsedDocument):
+    document = as_document(html)
+    for table in document.tables:
         if _is_parsable_table_type_1(table):
-            return _parse_table_type_1(table, soup)
+            return _parse_table_type_1(table.copy(), document.soup)
 
 
 def _parse_table_type_1(table: pd.DataFrame, soup: bs4.BeautifulSoup):
+    import numpy as np
+
     (across_index,) = np.where(table[0].str.lower() == "across")[0]
     (down_index,) = np.where(table[0].str.lower() == "down")[0]
 
-    # Clue numbers
-    raw_clue_numbers: Iterable[str | None] = table[0].astype(str)
+    # Clue numbers (the rows of annotations have none)
+    raw_clue_numbers = table[0].dropna().astype(str)
 
     clue_numbers: list[str] = []
-    for i, row in enumerate(raw_clue_numbers):
-        if row is not None and across_index < i < down_index:
+    for i, row in raw_clue_numbers.items():
+        if across_index < i < down_index:
             clue_numbers.append(row + "a")
-        elif row is not None and down_index < i:
+        elif down_index < i:
             clue_numbers.append(row + "d")
 
     # Answers
@@ -134,18 +142,17 @@ def _parse_table_type_1(table: pd.DataFrame, soup: bs4.BeautifulSoup):
     ]
     definitions = align_suspected_definitions_with_clues(clues, raw_definitions)
 
-    out = pd.DataFrame(
-        data=np.transpose(np.array([clue_numbers, answers, clues, annotations])),
-        columns=["clue_number", "answer", "clue", "annotation"],
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
     )
-    if definitions is not None:
-        out["definition"] = definitions
-
-    return out
 
 
-def is_parsable_table_type_2(html: str):
-    tables = pd.read_html(html)
+def is_parsable_table_type_2(html: str | ParsedDocument):
+    tables = as_document(html).tables
     for table in tables:
         try:
             if _is_parsable_table_type_2(table):
@@ -174,9 +181,13 @@ def _is_parsable_table_type_2(table: pd.DataFrame):
     return all(
         [
             # There is a row that says ACROSS in all cells
-            (table.astype(str).applymap(str.lower) == "across").all(axis=1).any(),
+            (table.astype(str).apply(lambda column: column.str.lower()) == "across")
+            .all(axis=1)
+            .any(),
             # There is a row that says DOWN in all cells
-            (table.astype(str).applymap(str.lower) == "down").all(axis=1).any(),
+            (table.astype(str).apply(lambda column: column.str.lower()) == "down")
+            .all(axis=1)
+            .any(),
             # The first column (except for the ACROSS and DOWN rows) is all numeric
             # This is what we expect to be the clue numbers
             # FIXME: double entry?
@@ -202,15 +213,18 @@ def _is_parsable_table_type_2(table: pd.DataFrame):
     )
 
 
-def parse_table_type_2(html: str):
-    tables = pd.read_html(html)
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    for table in tables:
+@parser_version(1)
+def parse_table_type_2(html: str | ParsedDocument):
+    document = as_document(html)
+    for table in document.tables:
         if _is_parsable_table_type_2(table):
-            return _parse_table_type_2(table, soup)
+            return _parse_table_type_2(table.copy(), document.soup)
 
 
 def _parse_table_type_2(table: pd.DataFrame, soup: bs4.BeautifulSoup):
+    import numpy as np
+    import pandas as pd
+
     # Cut out any extraneous columns
     table = table.iloc[:, :3]
 
@@ -245,14 +259,18 @@ def _parse_table_type_2(table: pd.DataFrame, soup: bs4.BeautifulSoup):
     definitions = align_suspected_definitions_with_clues(
         table["clue"], [tag.text for tag in soup.find_all("u")]
     )
-    if definitions is not None:
-        table["definition"] = definitions
 
-    return table
+    return ClueBatch.from_columns(
+        clue_number=table["clue_number"].tolist(),
+        clue=table["clue"].tolist(),
+        answer=table["answer"].tolist(),
+        definition=definitions,
+        annotation=table["annotation"].tolist(),
+    )
 
 
-def is_parsable_table_type_3(html: str):
-    tables = pd.read_html(html)
+def is_parsable_table_type_3(html: str | ParsedDocument):
+    tables = as_document(html).tables
     for table in tables:
         try:
             if _is_parsable_table_type_3(table):
@@ -284,7 +302,9 @@ def _is_parsable_table_type_3(table: pd.DataFrame):
             # The index looks like ['Across', 'Across.1', 'Across.2', ...]
             all(["across" in column.lower() for column in table.columns]),
             # There is a row that says 'Down' in all cells
-            (table.astype(str).applymap(str.lower) == "down").all(axis=1).any(),
+            (table.astype(str).apply(lambda column: column.str.lower()) == "down")
+            .all(axis=1)
+            .any(),
             # The first column (except for the 'Across', 'Down' and 'Clue No' rows)
             # is all numeric. This is what we expect to be the clue numbers
             all(
@@ -304,7 +324,7 @@ def _is_parsable_table_type_3(table: pd.DataFrame):
             ),
             # The third column (except for the 'Across', 'Down' and 'Clue' rows) all end
             # in enumerations, give or take 5. This is what we expect to be the clues
-            np.abs(
+            abs(
                 sum(
                     [
                         s.lower() in ["across", "down", "clue"]
@@ -319,14 +339,16 @@ def _is_parsable_table_type_3(table: pd.DataFrame):
     )
 
 
-def parse_table_type_3(html: str):
-    tables = pd.read_html(html)
-    for table in tables:
+@parser_version(1)
+def parse_table_type_3(html: str | ParsedDocument):
+    for table in as_document(html).tables:
         if _is_parsable_table_type_3(table):
-            return _parse_table_type_3(table)
+            return _parse_table_type_3(table.copy())
 
 
 def _parse_table_type_3(table: pd.DataFrame):
+    import numpy as np
+
     # The column names are ['Across', 'Across.1', 'Across.2', ...]
     # Make them just another row, for simplicity
     table = table.T.reset_index().T.reset_index(drop=True)
@@ -346,12 +368,17 @@ def _parse_table_type_3(table: pd.DataFrame):
     table["annotation"] = table["DefinitionAndAnnotation"].apply(
         lambda s: s.split(" / ")[-1]
     )
-    table = table.drop(columns=["DefinitionAndAnnotation"])
-    return table
+    return ClueBatch.from_columns(
+        clue_number=table["clue_number"].tolist(),
+        clue=table["clue"].tolist(),
+        answer=table["answer"].tolist(),
+        definition=table["definition"].tolist(),
+        annotation=table["annotation"].tolist(),
+    )
 
 
-def is_parsable_table_type_4(html: str):
-    tables = pd.read_html(html)
+def is_parsable_table_type_4(html: str | ParsedDocument):
+    tables = as_document(html).tables
     for table in tables:
         try:
             if _is_parsable_table_type_4(table):
@@ -386,7 +413,7 @@ def _is_parsable_table_type_4(table: pd.DataFrame):
             ),
             # The second column (except for the 'Across', 'Down' and 'Clue' rows) all end
             # in enumerations, give or take 5. This is what we expect to be the clues
-            np.abs(
+            abs(
                 sum(
                     [
                         s.lower() in ["across", "down", "clue"]
@@ -401,12 +428,12 @@ def _is_parsable_table_type_4(table: pd.DataFrame):
     )
 
 
-def parse_table_type_4(html: str):
-    tables = pd.read_html(html)
-    soup = bs4.BeautifulSoup(html, "lxml")
-    for table in tables:
+@parser_version(1)
+def parse_table_type_4(html: str | ParsedDocument):
+    document = as_document(html)
+    for table in document.tables:
         if _is_parsable_table_type_4(table):
-            return _parse_table_type_4(table, soup)
+            return _parse_table_type_4(table.copy(), document.lxml_soup)
 
 
 def _parse_table_type_4(table: pd.DataFrame, soup: bs4.BeautifulSoup):
@@ -421,6 +448,9 @@ def _parse_table_type_4(table: pd.DataFrame, soup: bs4.BeautifulSoup):
     16   Down          NaN             NaN          NaN
     17 	    1   Delayed...   Anagram of...         LATE
     """
+    import numpy as np
+    import pandas as pd
+
     # Append clue directions to clue numbers
     (down_index,) = np.where(table[0].str.lower() == "down")[0]
     table.iloc[2:down_index, 0] += "a"
@@ -452,14 +482,18 @@ def _parse_table_type_4(table: pd.DataFrame, soup: bs4.BeautifulSoup):
     definitions = align_suspected_definitions_with_clues(
         table["clue"], [tag.text for tag in soup.find_all("u")]
     )
-    if definitions is not None:
-        table["definition"] = definitions
 
-    return table
+    return ClueBatch.from_columns(
+        clue_number=table["clue_number"].tolist(),
+        clue=table["clue"].tolist(),
+        answer=table["answer"].tolist(),
+        definition=definitions,
+        annotation=table["annotation"].tolist(),
+    )
 
 
-def is_parsable_table_type_5(html: str):
-    tables = pd.read_html(html)
+def is_parsable_table_type_5(html: str | ParsedDocument):
+    tables = as_document(html).tables
     num_parsable = 0
     for table in tables:
         try:
@@ -510,10 +544,11 @@ def _is_parsable_table_type_5(table: pd.DataFrame):
     )
 
 
-def parse_table_type_5(html: str):
-    tables = pd.read_html(html)
-    soup = bs4.BeautifulSoup(html, "lxml")
-    table_htmls = soup.find_all("table")
+@parser_version(1)
+def parse_table_type_5(html: str | ParsedDocument):
+    document = as_document(html)
+    tables = document.tables
+    table_htmls = document.lxml_soup.find_all("table")
 
     parsed_tables = []
     for table, table_html in zip(tables, table_htmls):
@@ -522,7 +557,9 @@ def parse_table_type_5(html: str):
         except:
             continue
 
-    return pd.concat(parsed_tables).reset_index(drop=True)
+    if not parsed_tables:
+        raise ValueError("No tables could be parsed")
+    return ClueBatch(clue for parsed_table in parsed_tables for clue in parsed_table)
 
 
 def _parse_table_type_5(table: pd.DataFrame, table_html: bs4.BeautifulSoup):
@@ -561,9 +598,10 @@ def _parse_table_type_5(table: pd.DataFrame, table_html: bs4.BeautifulSoup):
     answers = [s[0] for s in answers_and_annotations]
     annotations = [s[1] for s in answers_and_annotations]
 
-    return pd.DataFrame(
-        data=np.transpose(
-            np.array([clue_numbers, clues, answers, definitions, annotations])
-        ),
-        columns=["clue_number", "clue", "answer", "definition", "annotation"],
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
     )
@@ -1,14 +1,18 @@
+from __future__ import annotations
+
 import re
 import string
 
-import bs4
-import numpy as np
-import pandas as pd
-
-from cryptics.utils import align_suspected_definitions_with_clues, search
+from cryptics.clues import ClueBatch
+from cryptics.document import ParsedDocument, as_document
+from cryptics.utils import (
+    align_suspected_definitions_with_clues,
+    parser_version,
+    search,
+)
 
 
-def is_parsable_text_type_1(html: str):
+def is_parsable_text_type_1(html: str | ParsedDocument):
     """
     Identifies if the text looks something like this:
 
@@ -33,12 +37,7 @@ def is_parsable_text_type_1(html: str):
     - https://times-xwd-times.livejournal.com/2566520.html
     - https://times-xwd-times.livejournal.com/2566074.html
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    asset_body = soup.find(
-        "div", attrs={"class": lambda s: s in ["asset-body", "entry-content"]}
-    )
-    for br in asset_body.find_all("br"):
-        br.replace_with("\n")
+    asset_body = as_document(html).asset_body_with_newlines
 
     return (
         # At least 20 underlined entries (definitions)
@@ -60,13 +59,11 @@ def is_parsable_text_type_1(html: str):
     )
 
 
-def parse_text_type_1(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    asset_body = soup.find(
-        "div", attrs={"class": lambda s: s in ["asset-body", "entry-content"]}
-    )
-    for br in asset_body.find_all("br"):
-        br.replace_with("\n")
+@parser_version(1)
+def parse_text_type_1(html: str | ParsedDocument):
+    document = as_document(html)
+    soup = document.soup
+    asset_body = document.asset_body_with_newlines
 
     lines = [line.strip() for line in asset_body.text.splitlines() if line.strip()]
     # Get rid of preamble
@@ -151,13 +148,16 @@ def parse_text_type_1(html: str):
         ],
     )
 
-    table = pd.DataFrame([clue_numbers, clues, definitions, answers, annotations]).T
-    table.columns = ["clue_number", "clue", "definition", "answer", "annotation"]
-
-    return table
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
+    )
 
 
-def is_parsable_text_type_2(html: str):
+def is_parsable_text_type_2(html: str | ParsedDocument):
     """
     Identifies if the text looks something like this:
 
@@ -172,17 +172,7 @@ def is_parsable_text_type_2(html: str):
     - https://thehinducrosswordcorner.blogspot.com/2021/06/no-13278-saturday-19-jun-2021-kriskross.html
     - https://thehinducrosswordcorner.blogspot.com/2021/08/no-13338-saturday-28-aug-2021-arden.html
     """
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
-
-    # Append a <br> tag after the two ACROSS and DOWN <h4> tags
-    for h4 in entry_content.find_all("h4"):
-        h4_index = h4.parent.contents.index(h4)
-        h4.insert(h4_index + 1, bs4.BeautifulSoup("<br>", features="lxml"))
-
-    # Turn all <br> tags into newlines
-    for br in entry_content.find_all("br"):
-        br.replace_with("\n")
+    entry_content = as_document(html).entry_content_with_newlines
 
     return (
         # At least 20 "123a. clue goes here (123)" lines
@@ -193,18 +183,9 @@ def is_parsable_text_type_2(html: str):
     )
 
 
-def parse_text_type_2(html: str):
-    soup = bs4.BeautifulSoup(html, "html.parser")
-    entry_content = soup.find("div", attrs={"class": lambda s: s in ["entry-content"]})
-
-    # Append a <br> tag after the two ACROSS and DOWN <h4> tags
-    for h4 in entry_content.find_all("h4"):
-        h4_index = h4.parent.contents.index(h4)
-        h4.insert(h4_index + 1, bs4.BeautifulSoup("<br>", features="lxml"))
-
-    # Turn all <br> tags into newlines
-    for br in entry_content.find_all("br"):
-        br.replace_with("\n")
+@parser_version(1)
+def parse_text_type_2(html: str | ParsedDocument):
+    entry_content = as_document(html).entry_content_with_newlines
 
     lines = [line.strip() for line in entry_content.text.splitlines() if line]
 
@@ -247,9 +228,10 @@ def parse_text_type_2(html: str):
         clues, [tag.text for tag in entry_content.find_all("b")]
     )
 
-    return pd.DataFrame(
-        data=np.transpose(
-            np.array([clue_numbers, answers, clues, annotations, definitions])
-        ),
-        columns=["clue_number", "answer", "clue", "annotation", "definition"],
+    return ClueBatch.from_columns(
+        clue_number=clue_numbers,
+        clue=clues,
+        answer=answers,
+        definition=definitions,
+        annotation=annotations,
     )
@@ -4,13 +4,12 @@ import logging
 import re
 import sys
 from re import Match
-from typing import Any, Callable, Iterable, List
+from typing import TYPE_CHECKING, Any, Callable, Iterable
 
-import bs4
-import numpy as np
-import requests
-from bs4 import BeautifulSoup
-from dateutil import parser
+from cryptics.document import ParsedDocument
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
 
 
 def get_logger():
@@ -51,6 +50,24 @@ def search(pattern: str, string: str, **kwargs) -> Match[str]:
         raise RuntimeError(f"No match for {pattern}")
 
 
+def parser_version(version: int) -> Callable[[Callable], Callable]:
+    """Decorate a parse function with its version, available as its `version`
+    attribute.
+
+    Bump the version whenever a change to the parse function (or to its
+    detector) changes what it returns for a blog post, so that `python
+    cryptics/reparse.py` reparses the blog posts it parsed.
+
+    version: version of the parse function.
+    """
+
+    def decorator(parse_func: Callable) -> Callable:
+        parse_func.version = version  # type: ignore[attr-defined]
+        return parse_func
+
+    return decorator
+
+
 def filter_strings_by_keyword(strings: Iterable[str], keywords: Iterable[str]):
     """Filter a list of strings to only those containing at least one keyword.
 
@@ -91,6 +108,15 @@ PUZZLE_NAME_EXTRACTORS = {
     ),
 }
 
+
+def _format_date(date: str) -> str:
+    """Parse a date written in (almost) any format, as YYYY-MM-DD."""
+    # dateutil is only needed (and imported) when parsing blog posts.
+    from dateutil import parser
+
+    return parser.parse(date.strip()).strftime("%Y-%m-%d")
+
+
 PUZZLE_DATE_EXTRACTORS = {
     "bigdave44": lambda source_url, _: (
         search(r"\d{4}/\d{2}/\d{2}", source_url).group().replace("/", "-")
@@ -99,18 +125,16 @@ PUZZLE_DATE_EXTRACTORS = {
         search(r"\d{4}/\d{2}/\d{2}", source_url).group().replace("/", "-")
     ),
     "natpostcryptic": lambda _, soup: (
-        parser.parse(soup.find("h2", "date-header").text.strip()).strftime("%Y-%m-%d")
+        _format_date(soup.find("h2", "date-header").text)
     ),
     "thehinducrosswordcorner": lambda _, soup: (
-        parser.parse(soup.find("h2", "date-header").text.strip()).strftime("%Y-%m-%d")
+        _format_date(soup.find("h2", "date-header").text)
     ),
     "times-xwd-times": lambda _, soup: (
-        parser.parse(
-            soup.find("div", "asset-meta asset-entry-date").text.strip()
-        ).strftime("%Y-%m-%d")
+        _format_date(soup.find("div", "asset-meta asset-entry-date").text)
     ),
     "thenationcryptic": lambda _, soup: (
-        parser.parse(soup.find("h2", "date-header").text.strip()).strftime("%Y-%m-%d")
+        _format_date(soup.find("h2", "date-header").text)
     ),
 }
 
@@ -154,10 +178,20 @@ PUZZLE_URL_EXTRACTORS = {
 
 def extract_string_from_url_and_soup(
     url: str,
-    soup: BeautifulSoup,
+    soup: BeautifulSoup | ParsedDocument,
     extractors: dict[str, Callable[[str, BeautifulSoup], str]],
 ) -> str | None:
-    """TODO: document me!"""
+    """Extract a string (e.g. a puzzle name) from a blog post, using the first
+    extractor whose key is a fragment of the post's URL.
+
+    url: URL of the blog post.
+    soup: the parsed blog post, either as a BeautifulSoup or a ParsedDocument
+        (in which case its already-parsed soup is reused).
+    extractors: dictionary of URL fragments to extractor functions, e.g.
+        PUZZLE_NAME_EXTRACTORS.
+    """
+    if isinstance(soup, ParsedDocument):
+        soup = soup.soup
     for source_url_fragment, extract_puzzle_name_func in extractors.items():
         if source_url_fragment in url:
             try:
@@ -0,0 +1,69 @@
+"""Parse blog posts, either serially or in a pool of worker processes, for
+cryptics/main.py and cryptics/reparse.py. Posts are always parsed in order, and
+results are written to the database by the calling process only.
+"""
+from __future__ import annotations
+
+import contextlib
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.pool
+from typing import ContextManager, Iterator, List, Optional, Tuple
+
+from cryptics.clues import ClueBatch
+from cryptics.database import content_sha256
+from cryptics.parse import try_parse
+from cryptics.utils import get_logger
+
+Task = Tuple[int, int, str, str, List[str]]
+Result = Tuple[str, Optional[ClueBatch], List[Tuple[str, bool]], str]
+
+
+def parse_html(task: Task, logger: logging.Logger | None = None) -> Result:
+    """Parse one raw blog post. This runs either in the main process or in a
+    worker process, so it must not touch the database.
+
+    task: tuple of (index, number of posts, URL, HTML, names of parsers to
+        try first).
+
+    Returns a tuple of (URL, parsed clues or None, attempts made by try_parse,
+    SHA-256 of the HTML).
+    """
+    if logger is None:
+        logger = get_logger()
+
+    i, num_urls, url, html, parser_order = task
+    data = None
+    attempts: list[tuple[str, bool]] = []
+    try:
+        logger.info(f"Parsing {i}/{num_urls}: {url}")
+        data = try_parse(html, url, parser_order=parser_order, attempts=attempts)
+    except:
+        logger.error(f"Failed to parse: {url}", exc_info=True)
+
+    return url, data, attempts, content_sha256(html)
+
+
+def worker_pool(workers: int) -> ContextManager[Optional[multiprocessing.pool.Pool]]:
+    """Return a pool of `workers` worker processes, or a context of None if
+    `workers` is 1 (i.e. if parsing serially). Pools are terminated on exit, so
+    that worker processes are never left behind if parsing or writing raises.
+    """
+    return multiprocessing.Pool(workers) if workers > 1 else contextlib.nullcontext()
+
+
+def parse_html_in_pool(
+    pool: multiprocessing.pool.Pool,
+    tasks: Iterator[Task],
+    window: int,
+) -> Iterator[Result]:
+    """Parse HTML in a process pool, in order. Tasks are read from `tasks` in
+    this process (and thread), `window` at a time, so that only a bounded
+    number of blog posts are ever in flight.
+    """
+    while True:
+        batch = list(itertools.islice(tasks, window))
+        if not batch:
+            return
+        yield from pool.imap(parse_html, batch)
@@ -0,0 +1,170 @@
+""" Answer lookups over the answer index built by cryptics/answers.py.
+
+Datasette is deployed without the cryptics package, so the queries of
+cryptics.answers are repeated here.
+"""
+
+import json
+import re
+import string
+import unicodedata
+
+from datasette import hookimpl
+from datasette.utils.asgi import Response
+
+DATABASE = "data"
+WILDCARDS = "?._"
+ALPHABET = string.ascii_uppercase
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+@hookimpl
+def register_routes():
+    return [
+        # E.g. /-/answers/pattern?pattern=?A?E??E
+        (r"^/-/answers/pattern$", answers_pattern),
+        # E.g. /-/answers/anagram?letters=sealere
+        (r"^/-/answers/anagram$", answers_anagram),
+        # E.g. /-/answers/subanagram?letters=afreshcabaret&min_length=4
+        (r"^/-/answers/subanagram$", answers_subanagram),
+    ]
+
+
+def normalize_answer(answer):
+    decomposed = unicodedata.normalize("NFKD", answer)
+    return re.sub(r"[^A-Z]", "", decomposed.upper())
+
+
+def signature(letters):
+    return "".join(sorted(letters))
+
+
+def letter_counts(letters):
+    return "".join(
+        string.digits[count] if count < 10 else ALPHABET[count - 10]
+        for count in (min(letters.count(letter), 35) for letter in ALPHABET)
+    )
+
+
+def letter_mask(letters):
+    return sum(1 << ALPHABET.index(letter) for letter in set(letters))
+
+
+def parse_pattern(pattern):
+    pattern = re.sub(r"[\s'-]", "", pattern.upper())
+    if not pattern or not all(c.isalpha() or c in WILDCARDS for c in pattern):
+        raise ValueError(f"Invalid pattern: {pattern}")
+    letters = [
+        (position, normalize_answer(c))
+        for position, c in enumerate(pattern, start=1)
+        if c not in WILDCARDS
+    ]
+    if not all(len(letter) == 1 for _, letter in letters):
+        raise ValueError(f"Invalid pattern: {pattern}")
+    return len(pattern), letters
+
+
+def get_limit(request):
+    try:
+        limit = int(request.args.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
+
+
+async def query_answers(
+    datasette, answer_rowids, params, limit, order_by="answers.rowid"
+):
+    results = await datasette.get_database(DATABASE).execute(
+        f"""
+        SELECT answers.answer, GROUP_CONCAT(answers_clues.clue_rowid)
+        FROM answers JOIN answers_clues ON answers_clues.answer_rowid = answers.rowid
+        WHERE answers.rowid IN ({answer_rowids})
+        GROUP BY answers.rowid
+        ORDER BY {order_by}
+        LIMIT ?;
+        """,
+        [*params, limit],
+    )
+    return [
+        {
+            "answer": answer,
+            "clue_rowids": [int(clue_rowid) for clue_rowid in clue_rowids.split(",")],
+        }
+        for answer, clue_rowids in results.rows
+    ]
+
+
+async def answers_pattern(datasette, request):
+    try:
+        length, letters = parse_pattern(request.args.get("pattern", ""))
+    except ValueError as e:
+        return Response.json({"ok": False, "error": str(e)}, status=400)
+
+    if letters:
+        answer_rowids = " INTERSECT ".join(
+            "SELECT answer_rowid FROM answers_letters WHERE length = ? AND position = ? AND letter = ?"
+            for _ in letters
+        )
+        params = [x for position, letter in letters for x in (length, position, letter)]
+    else:
+        answer_rowids = "SELECT rowid FROM answers WHERE length = ?"
+        params = [length]
+
+    answers = await query_answers(datasette, answer_rowids, params, get_limit(request))
+    return Response.json({"ok": True, "answers": answers})
+
+
+async def answers_anagram(datasette, request):
+    letters = normalize_answer(request.args.get("letters", ""))
+    answers = await query_answers(
+        datasette,
+        "SELECT rowid FROM answers WHERE signature = ?",
+        [signature(letters)],
+        get_limit(request),
+    )
+    return Response.json({"ok": True, "answers": answers})
+
+
+async def answers_subanagram(datasette, request):
+    fodder = normalize_answer(request.args.get("letters", ""))
+    fodder_counts = letter_counts(fodder)
+    limit = get_limit(request)
+    try:
+        min_length = int(request.args.get("min_length", 3))
+    except ValueError:
+        return Response.json(
+            {"ok": False, "error": "min_length must be an integer"}, status=400
+        )
+
+    def find_answer_rowids(conn):
+        candidates = conn.execute(
+            """
+            SELECT rowid, length, letter_counts FROM answers
+            WHERE length BETWEEN ? AND ? AND letter_mask & ? = 0
+            ORDER BY length DESC;
+            """,
+            (min_length, len(fodder), ~letter_mask(fodder) & (1 << len(ALPHABET)) - 1),
+        )
+        answer_rowids = []
+        for rowid, length, counts in candidates:
+            if len(answer_rowids) >= limit and length < answer_rowids[-1][0]:
+                break
+            if all(a <= b for a, b in zip(counts, fodder_counts)):
+                answer_rowids.append((length, rowid))
+        return [
+            rowid for _, rowid in sorted(answer_rowids, key=lambda x: (-x[0], x[1]))
+        ][:limit]
+
+    answer_rowids = await datasette.get_database(DATABASE).execute_fn(
+        find_answer_rowids
+    )
+    answers = await query_answers(
+        datasette,
+        "SELECT value FROM json_each(?)",
+        [json.dumps(answer_rowids)],
+        limit,
+        order_by="answers.length DESC, answers.rowid",
+    )
+    return Response.json({"ok": True, "answers": answers})
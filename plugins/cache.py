@@ -0,0 +1,221 @@
+""" Cache responses of the immutable Datasette deployment in memory.
+
+Every response is a function of its URL until the database is rebuilt, so
+successful GET responses to requests without credentials are cached by path
+and query string (unless they set cookies, or vary with other headers), with an
+ETag derived from the `last_built` metadata of the database. Requests with a
+matching ETag are only answered as not modified from the cache.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+from datasette import hookimpl
+from datasette.utils.asgi import Response
+
+DATABASE = "data"
+# Bounds of the cache. Responses larger than MAX_ENTRY_BYTES are not cached.
+MAX_ENTRIES = 1000
+MAX_BYTES = 64 * 2**20
+MAX_ENTRY_BYTES = 2**20
+CACHE_CONTROL = b"public, max-age=3600"
+STATS_PATH = "/-/cache.json"
+# Responses to requests with credentials may be personalized (and are marked
+# private by Datasette), so those requests bypass the cache. Datasette varies
+# every response with these headers, so responses to requests without them can
+# still be shared.
+CREDENTIAL_HEADERS = {b"cookie", b"authorization"}
+
+
+class ResponseCache:
+    """A least recently used cache of responses, bounded by both number of
+    entries and total size.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, headers, body):
+        if key in self.entries:
+            self.num_bytes -= len(self.entries.pop(key)[1])
+        self.entries[key] = (headers, body)
+        self.num_bytes += len(body)
+        while len(self.entries) > self.max_entries or self.num_bytes > self.max_bytes:
+            _, (_, evicted_body) = self.entries.popitem(last=False)
+            self.num_bytes -= len(evicted_body)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.num_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "not_modified": self.not_modified,
+            "entries": len(self.entries),
+            "bytes": self.num_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+
+cache = ResponseCache()
+
+
+@hookimpl
+def register_routes():
+    return [(f"^{STATS_PATH}$", cache_stats)]
+
+
+def cache_stats():
+    return Response.json(cache.stats())
+
+
+async def get_last_built(datasette):
+    results = await datasette.get_database(DATABASE).execute(
+        "SELECT value FROM metadata WHERE key = 'last_built';"
+    )
+    row = results.first()
+    return row[0] if row is not None else ""
+
+
+def get_etag(last_built, key):
+    path, query_string = key
+    digest = hashlib.sha256(
+        last_built.encode("utf-8") + b"\0" + path.encode("utf-8") + b"?" + query_string
+    ).hexdigest()
+    return f'"{digest[:32]}"'.encode("utf-8")
+
+
+def is_cacheable(scope):
+    if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+        return False
+    if scope["path"] == STATS_PATH:
+        return False
+    # Responses to signed-in actors (or to any request with a cookie) may
+    # differ from everyone else's.
+    return not any(
+        name.lower() in CREDENTIAL_HEADERS for name, _ in scope.get("headers", [])
+    )
+
+
+def is_shareable(headers):
+    """Whether a response is the same for every request of its URL without
+    credentials, i.e. it does not set cookies, is not private and does not vary
+    with any other header of the request.
+    """
+    for name, value in headers:
+        name, value = name.lower(), value.lower()
+        if name == b"set-cookie":
+            return False
+        if name == b"cache-control" and (b"private" in value or b"no-store" in value):
+            return False
+        if name == b"vary":
+            vary = {part.strip() for part in value.split(b",") if part.strip()}
+            if not vary <= CREDENTIAL_HEADERS:
+                return False
+    return True
+
+
+@hookimpl
+def asgi_wrapper(datasette):
+    def wrap_with_cache(app):
+        last_built = None
+
+        async def cached_app(scope, receive, send):
+            nonlocal last_built
+            if not is_cacheable(scope):
+                await app(scope, receive, send)
+                return
+
+            if last_built is None:
+                last_built = await get_last_built(datasette)
+            key = (scope["path"], scope.get("query_string", b""))
+            etag = get_etag(last_built, key)
+            cache_headers = [(b"etag", etag), (b"cache-control", CACHE_CONTROL)]
+
+            # Only cached responses are known to be shareable, so only they
+            # can be not modified.
+            entry = cache.get(key)
+            if entry is not None:
+                headers, body = entry
+                if dict(scope.get("headers", [])).get(b"if-none-match") == etag:
+                    cache.not_modified += 1
+                    await send(
+                        {
+                            "type": "http.response.start",
+                            "status": 304,
+                            "headers": cache_headers,
+                        }
+                    )
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+
+                await send(
+                    {"type": "http.response.start", "status": 200, "headers": headers}
+                )
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": b"" if scope["method"] == "HEAD" else body,
+                    }
+                )
+                return
+
+            # Pass the response through as it is sent, keeping a copy of it to
+            # cache if it succeeds, can be shared and is not too large.
+            response = {"headers": None, "chunks": [], "size": 0}
+
+            async def caching_send(message):
+                if message["type"] == "http.response.start":
+                    headers = message.get("headers", [])
+                    if message["status"] == 200 and is_shareable(headers):
+                        headers = [
+                            (name, value)
+                            for name, value in headers
+                            if name.lower() not in (b"etag", b"cache-control")
+                        ] + cache_headers
+                        response["headers"] = headers
+                        message = dict(message, headers=headers)
+                    else:
+                        response["size"] = None
+                elif (
+                    message["type"] == "http.response.body"
+                    and response["size"] is not None
+                ):
+                    body = message.get("body", b"")
+                    response["size"] += len(body)
+                    if response["size"] > MAX_ENTRY_BYTES:
+                        response["chunks"], response["size"] = [], None
+                    else:
+                        response["chunks"].append(body)
+                    if not message.get("more_body", False) and response["size"]:
+                        cache.put(
+                            key, response["headers"], b"".join(response["chunks"])
+                        )
+                await send(message)
+
+            await app(scope, receive, caching_send)
+
+        return cached_app
+
+    return wrap_with_cache
@@ -1,29 +1,48 @@
+import hashlib
+
 from datasette import hookimpl
-from datasette.utils.asgi import Response
+from datasette.utils.asgi import AsgiStream, NotFound, Response
 
-ROBOTS_TXT = """
-Sitemap: https://cryptics.georgeho.org/sitemap.xml
-""".strip()
+BASE_URL = "https://cryptics.georgeho.org"
+DATABASE = "data"
+# Maximum number of URLs per sitemap, as allowed by the sitemap protocol. Clue
+# sitemaps are sharded by rowid, so that each covers a fixed range of rowids:
+# shard n covers rowids n * URLS_PER_SITEMAP + 1 to (n + 1) * URLS_PER_SITEMAP.
+# Rowids can have gaps, so only shards with at least one clue exist.
+URLS_PER_SITEMAP = 50000
+# Number of rowids to read per query when streaming a clue sitemap.
+CHUNK_SIZE = 5000
 
-SITEMAP_XML = """
-<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-  <url><loc>https://cryptics.georgeho.org</loc></url>
-  <url><loc>https://cryptics.georgeho.org/datasheet</loc></url>
-  <url><loc>https://cryptics.georgeho.org/data</loc></url>
-  <url><loc>https://cryptics.georgeho.org/data/clues</loc></url>
-  <url><loc>https://cryptics.georgeho.org/data/indicators</loc></url>
-  <url><loc>https://cryptics.georgeho.org/data/charades</loc></url>
-  <url><loc>https://cryptics.georgeho.org/data/metadata</loc></url>
-</urlset>
+ROBOTS_TXT = f"""
+Sitemap: {BASE_URL}/sitemap.xml
 """.strip()
 
+PAGES = [
+    "",
+    "/datasheet",
+    "/data",
+    "/data/clues",
+    "/data/indicators",
+    "/data/charades",
+    "/data/metadata",
+]
+
+URLSET_START = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_END = "</urlset>\n"
+SITEMAPINDEX_START = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+SITEMAPINDEX_END = "</sitemapindex>\n"
+
+# Shards of each build of the (immutable) database, by `last_built`.
+_shards_cache: dict = {}
+
 
 @hookimpl
 def register_routes():
     return [
         ("^/robots.txt$", robots_txt),
         ("^/sitemap.xml$", sitemap_xml),
+        ("^/sitemap-pages.xml$", sitemap_pages_xml),
+        (r"^/sitemap-clues-(?P<shard>[0-9]+).xml$", sitemap_clues_xml),
     ]
 
 
@@ -31,5 +50,118 @@ def robots_txt():
     return Response.text(ROBOTS_TXT)
 
 
-def sitemap_xml():
-    return Response(SITEMAP_XML, 200, content_type="application/xml")
+async def get_last_built(datasette):
+    results = await datasette.get_database(DATABASE).execute(
+        "SELECT value FROM metadata WHERE key = 'last_built';"
+    )
+    row = results.first()
+    return row[0] if row is not None else ""
+
+
+def get_headers(last_built, name):
+    """Return caching headers for a sitemap, which only changes when the
+    database is rebuilt.
+    """
+    etag = hashlib.sha256(f"{last_built}/{name}".encode("utf-8")).hexdigest()[:32]
+    return {"ETag": f'"{etag}"', "Cache-Control": "public, max-age=86400"}
+
+
+def not_modified(request, headers):
+    return request.headers.get("if-none-match") == headers["ETag"]
+
+
+async def sitemap_xml(datasette, request):
+    last_built = await get_last_built(datasette)
+    headers = get_headers(last_built, "sitemap.xml")
+    if not_modified(request, headers):
+        return Response("", status=304, headers=headers)
+
+    return Response(
+        SITEMAPINDEX_START
+        + f"  <sitemap><loc>{BASE_URL}/sitemap-pages.xml</loc></sitemap>\n"
+        + "".join(
+            f"  <sitemap><loc>{BASE_URL}/sitemap-clues-{shard}.xml</loc></sitemap>\n"
+            for shard in await get_shards(datasette, last_built)
+        )
+        + SITEMAPINDEX_END,
+        200,
+        headers=headers,
+        content_type="application/xml",
+    )
+
+
+def find_shards(conn):
+    """Return the shards with at least one clue, in order. Each is found with
+    one lookup of the rowid index, so gaps in rowids cost nothing.
+    """
+    shards = []
+    (rowid,) = conn.execute("SELECT MIN(rowid) FROM clues WHERE rowid > 0;").fetchone()
+    while rowid is not None:
+        shard = (rowid - 1) // URLS_PER_SITEMAP
+        shards.append(shard)
+        (rowid,) = conn.execute(
+            "SELECT MIN(rowid) FROM clues WHERE rowid > ?;",
+            ((shard + 1) * URLS_PER_SITEMAP,),
+        ).fetchone()
+    return shards
+
+
+async def get_shards(datasette, last_built):
+    if last_built not in _shards_cache:
+        shards = await datasette.get_database(DATABASE).execute_fn(find_shards)
+        _shards_cache.clear()
+        _shards_cache[last_built] = shards
+    return _shards_cache[last_built]
+
+
+async def sitemap_pages_xml(datasette, request):
+    headers = get_headers(await get_last_built(datasette), "sitemap-pages.xml")
+    if not_modified(request, headers):
+        return Response("", status=304, headers=headers)
+
+    return Response(
+        URLSET_START
+        + "".join(f"  <url><loc>{BASE_URL}{page}</loc></url>\n" for page in PAGES)
+        + URLSET_END,
+        200,
+        headers=headers,
+        content_type="application/xml",
+    )
+
+
+async def sitemap_clues_xml(datasette, request):
+    shard = int(request.url_vars["shard"])
+    last_built = await get_last_built(datasette)
+    # Only the shards listed in the sitemap index exist.
+    if shard not in await get_shards(datasette, last_built):
+        raise NotFound(f"No such sitemap: sitemap-clues-{shard}.xml")
+    headers = get_headers(last_built, f"sitemap-clues-{shard}.xml")
+    if not_modified(request, headers):
+        return Response("", status=304, headers=headers)
+
+    db = datasette.get_database(DATABASE)
+    first_rowid = shard * URLS_PER_SITEMAP
+    last_rowid = first_rowid + URLS_PER_SITEMAP
+
+    async def stream_urls(response):
+        # Rows are read CHUNK_SIZE at a time, and written as they are read.
+        await response.write(URLSET_START)
+        rowid = first_rowid
+        while True:
+            results = await db.execute(
+                "SELECT rowid FROM clues WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?;",
+                (rowid, last_rowid, CHUNK_SIZE),
+            )
+            rowids = [row[0] for row in results.rows]
+            if not rowids:
+                break
+            await response.write(
+                "".join(
+                    f"  <url><loc>{BASE_URL}/data/clues/{rowid}</loc></url>\n"
+                    for rowid in rowids
+                )
+            )
+            rowid = rowids[-1]
+        await response.write(URLSET_END)
+
+    return AsgiStream(stream_urls, headers=headers, content_type="application/xml")
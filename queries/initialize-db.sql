@@ -5,7 +5,51 @@ CREATE TABLE IF NOT EXISTS raw (
     content_type TEXT,
     content BLOB,
     is_parsed BOOLEAN DEFAULT FALSE,
-    datetime_parsed TIMESTAMP DEFAULT NULL
+    datetime_parsed TIMESTAMP DEFAULT NULL,
+    -- NULL if content is uncompressed. See cryptics.compression.
+    content_encoding TEXT DEFAULT NULL,
+    dictionary_id INTEGER DEFAULT NULL REFERENCES raw_dictionaries (dictionary_id)
+);
+-- Covers both the backlog of unparsed content and the known URLs of a source.
+CREATE INDEX IF NOT EXISTS raw_source_content_type_is_parsed_datetime_requested_index
+ON raw (source, content_type, is_parsed, datetime_requested, location);
+-- zstd dictionaries to compress raw content with, trained per source.
+CREATE TABLE IF NOT EXISTS raw_dictionaries (
+    dictionary_id INTEGER PRIMARY KEY,
+    source TEXT,
+    dictionary BLOB,
+    datetime_trained TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+-- Validators of the sitemaps we have scraped, to skip re-fetching unchanged ones.
+CREATE TABLE IF NOT EXISTS sitemaps (
+    location TEXT PRIMARY KEY,
+    lastmod TEXT DEFAULT NULL,
+    etag TEXT DEFAULT NULL,
+    last_modified TEXT DEFAULT NULL,
+    datetime_checked TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+-- How often each parser has parsed (hits) or failed to parse (misses) the blog
+-- posts of each source and URL pattern. See cryptics.database.ParserStats.
+CREATE TABLE IF NOT EXISTS parser_stats (
+    source TEXT,
+    url_pattern TEXT,
+    parser TEXT,
+    hits INTEGER DEFAULT 0,
+    misses INTEGER DEFAULT 0,
+    PRIMARY KEY (source, url_pattern, parser)
+);
+-- The parser (NULL if parsing failed) and parser version that each blog post
+-- was last parsed with, and the SHA-256 of the content that was parsed.
+CREATE TABLE IF NOT EXISTS parse_results (
+    location TEXT PRIMARY KEY,
+    content_sha256 TEXT,
+    parser TEXT DEFAULT NULL,
+    parser_version INTEGER DEFAULT NULL,
+    datetime_parsed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Version of the parser of a post (or -1 if it no longer exists) that last
+    -- failed to reparse it, so that it is not reparsed again until that changes.
+    failed_parser_version INTEGER DEFAULT NULL,
+    FOREIGN KEY (location) REFERENCES raw (location)
 );
 CREATE TABLE IF NOT EXISTS clues (
     source TEXT,
@@ -20,8 +64,15 @@ CREATE TABLE IF NOT EXISTS clues (
     source_url TEXT NOT NULL,
     is_reviewed BOOLEAN DEFAULT FALSE,
     datetime_reviewed TIMESTAMP DEFAULT NULL,
+    clue_hash TEXT DEFAULT NULL,
     FOREIGN KEY (source_url) REFERENCES html (url)
 );
+-- To never insert the same clue twice. See cryptics.database.clue_hash.
+CREATE UNIQUE INDEX IF NOT EXISTS clues_clue_hash_index ON clues (clue_hash);
+-- To find (e.g. to replace) the clues of a blog post.
+CREATE INDEX IF NOT EXISTS clues_source_url_index ON clues (source_url);
+-- To find clues by when they were reviewed.
+CREATE INDEX IF NOT EXISTS clues_datetime_reviewed_index ON clues (datetime_reviewed);
 CREATE TABLE IF NOT EXISTS indicators (
     clue_rowid INT PRIMARY KEY,
     alternation TEXT DEFAULT '',
@@ -40,3 +91,36 @@ CREATE TABLE IF NOT EXISTS charades (
     answer TEXT DEFAULT '',
     FOREIGN KEY (clue_rowid) REFERENCES clues (rowid)
 );
+-- One row per indicator of each clue (i.e. `indicators`, split on "/"), to find
+-- the clues of an indicator when updating indicators incrementally.
+CREATE TABLE IF NOT EXISTS indicators_exploded (
+    clue_rowid INT,
+    wordplay TEXT,
+    indicator TEXT,
+    FOREIGN KEY (clue_rowid) REFERENCES clues (rowid)
+);
+CREATE INDEX IF NOT EXISTS indicators_exploded_clue_rowid_index ON indicators_exploded (clue_rowid);
+CREATE INDEX IF NOT EXISTS indicators_exploded_wordplay_indicator_index ON indicators_exploded (wordplay, indicator, clue_rowid);
+CREATE INDEX IF NOT EXISTS charades_clue_rowid_index ON charades (clue_rowid);
+CREATE INDEX IF NOT EXISTS charades_charade_answer_index ON charades (charade, answer, clue_rowid);
+-- Fingerprint of the clue and annotation of each clue that indicators and
+-- charades were last found for, to find new, edited and deleted clues when
+-- updating them incrementally. See cryptics.indicators.clue_fingerprint.
+CREATE TABLE IF NOT EXISTS indicators_fingerprints (
+    clue_rowid INTEGER PRIMARY KEY,
+    fingerprint INTEGER
+);
+-- Rowids of clues deleted since indicators and charades were last found, since
+-- SQLite may reuse them for new clues. See cryptics.indicators.update_indicators.
+CREATE TABLE IF NOT EXISTS clues_deleted (
+    clue_rowid INTEGER PRIMARY KEY
+);
+CREATE TRIGGER IF NOT EXISTS clues_deleted_trigger AFTER DELETE ON clues
+BEGIN
+    INSERT OR IGNORE INTO clues_deleted (clue_rowid) VALUES (old.rowid);
+END;
+-- State of incremental builds, e.g. whether indicators have been built.
+CREATE TABLE IF NOT EXISTS build_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
@@ -45,6 +45,29 @@ INSERT INTO indicators_new SELECT rowid, * from indicators;
 DROP TABLE indicators;
 ALTER TABLE indicators_new RENAME TO indicators;
 
+-- Junction tables between clues and the indicators and charades they have
+CREATE TABLE indicators_clues (
+    indicator_rowid INTEGER NOT NULL REFERENCES indicators (rowid),
+    clue_rowid INTEGER NOT NULL REFERENCES clues (rowid),
+    PRIMARY KEY (indicator_rowid, clue_rowid)
+) WITHOUT ROWID;
+INSERT INTO indicators_clues
+SELECT indicator_rowid, clue_rowid FROM indicators_unpivoted_clues
+WHERE clue_rowid IN (SELECT rowid FROM clues);
+DROP TABLE indicators_unpivoted_clues;
+CREATE INDEX indicators_clues_clue_rowid_index ON indicators_clues (clue_rowid);
+
+CREATE TABLE charades_clues (
+    charade_rowid INTEGER NOT NULL REFERENCES charades (rowid),
+    clue_rowid INTEGER NOT NULL REFERENCES clues (rowid),
+    PRIMARY KEY (charade_rowid, clue_rowid)
+) WITHOUT ROWID;
+INSERT INTO charades_clues
+SELECT charade_rowid, clue_rowid FROM charades_unpivoted_clues
+WHERE clue_rowid IN (SELECT rowid FROM clues);
+DROP TABLE charades_unpivoted_clues;
+CREATE INDEX charades_clues_clue_rowid_index ON charades_clues (clue_rowid);
+
 -- To facilitate Datasette facets
 CREATE INDEX clues_source_index ON clues ("source");
 CREATE INDEX indicators_wordplay_index ON indicators ("wordplay");
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import sqlite3
+from os.path import join
+
+import pytest
+
+from cryptics.config import PROJECT_DIR
+
+PLUGINS_DIR = join(PROJECT_DIR, "plugins")
+
+
+@pytest.fixture
+def serve_data(tmp_path):
+    """Return a function that creates a `data` database, populates it with
+    `populate(conn)` and serves it as it is deployed: immutable, with the
+    plugins in plugins/ and a `metadata` table recording when it was built.
+    Plugins are loaded as Datasette loads them, so tests check the deployed
+    copies.
+    """
+    datasette_app = pytest.importorskip("datasette.app")
+    from datasette.plugins import pm
+
+    def serve(populate, last_built=str(tmp_path)):
+        path = tmp_path / "data.sqlite3"
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;"
+        )
+        conn.execute(
+            "INSERT INTO metadata (key, value) VALUES ('last_built', ?);", (last_built,)
+        )
+        populate(conn)
+        conn.commit()
+        conn.close()
+
+        datasette = datasette_app.Datasette(
+            immutables=[str(path)], plugins_dir=PLUGINS_DIR
+        )
+        # Plugins are registered once per process, so responses cached by
+        # earlier tests must be forgotten.
+        pm.get_plugin("cache.py").cache.clear()
+        return datasette
+
+    return serve
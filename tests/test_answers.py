@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import answers
+
+ANSWERS = ["Release", "RELEASE", "re-lease", "Repeats", "Café", "Beret", None]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE clues (rowid INTEGER PRIMARY KEY, answer TEXT);")
+    conn.executemany(
+        "INSERT INTO clues (answer) VALUES (?);", [(answer,) for answer in ANSWERS]
+    )
+    answers.build_answer_index(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize(
+    "answer,expected",
+    [
+        ("Half-time", "HALFTIME"),
+        ("Café", "CAFE"),
+        ("Rock 'n' roll", "ROCKNROLL"),
+        (None, ""),
+    ],
+)
+def test_normalize_answer(answer, expected):
+    assert answers.normalize_answer(answer) == expected
+
+
+@pytest.mark.parametrize("pattern", ["", "A1?", "??*"])
+def test_parse_pattern_rejects_invalid_patterns(pattern):
+    with pytest.raises(ValueError):
+        answers.parse_pattern(pattern)
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        ("?E?E??E", [("RELEASE", [1, 2, 3])]),
+        ("R?.EA_?", [("RELEASE", [1, 2, 3]), ("REPEATS", [4])]),
+        ("???????", [("RELEASE", [1, 2, 3]), ("REPEATS", [4])]),
+        ("ca-fé", [("CAFE", [5])]),
+        ("?A?E??E", []),
+    ],
+)
+def test_match_pattern(conn, pattern, expected):
+    assert answers.match_pattern(conn, pattern) == expected
+
+
+def test_match_pattern_limit(conn):
+    assert answers.match_pattern(conn, "???????", limit=1) == [("RELEASE", [1, 2, 3])]
+
+
+def test_signature_and_letter_counts():
+    assert answers.signature("RELEASE") == "AEEELRS"
+    counts = answers.letter_counts("RELEASE")
+    assert len(counts) == 26
+    assert counts[answers.ALPHABET.index("E")] == "3"
+    assert answers.letter_mask("ABBA") == 0b11
+
+
+def test_find_anagrams(conn):
+    assert answers.find_anagrams(conn, "sealer e") == [("RELEASE", [1, 2, 3])]
+    assert answers.find_anagrams(conn, "release x") == []
+
+
+def test_find_subanagrams(conn):
+    assert answers.find_subanagrams(conn, "a fresh cabaret") == [
+        ("BERET", [6]),
+        ("CAFE", [5]),
+    ]
+    assert answers.find_subanagrams(conn, "a fresh cabaret", min_length=5) == [
+        ("BERET", [6])
+    ]
+    # Every letter of an answer must be in the fodder as many times.
+    assert answers.find_subanagrams(conn, "bert") == []
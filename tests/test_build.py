@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import sqlite3
+
+from cryptics import build, indicators
+from cryptics.config import INITIALIZE_DB_SQL
+
+
+def test_build(tmp_path):
+    source = str(tmp_path / "cryptics.sqlite3")
+    target = str(tmp_path / "data.sqlite3")
+    with sqlite3.connect(source) as conn:
+        with open(INITIALIZE_DB_SQL, "r") as f:
+            conn.executescript(f.read())
+        conn.executemany(
+            "INSERT INTO clues (rowid, clue, answer, annotation, source_url, source) VALUES (?, ?, ?, ?, 'url', ?)",
+            [
+                (3, "Stop in the middle of this (4)", "ODES", "anagram (does)", "a"),
+                (7, "Reversed a trap (4)", "PART", "reversal (a trap)", "b"),
+                (9, "Excluded (4)", "PART", "reversal (a trap)", "square_pursuit"),
+            ],
+        )
+        indicators.build_indicators(conn)
+
+    timings = build.build(source=source, target=target)
+    assert set(timings) == {
+        "Copy tables",
+        "Prepare for publication",
+        "Answer index",
+        "Full-text search",
+        "Vacuum",
+    }
+
+    with sqlite3.connect(target) as conn:
+        # Rowids are kept, so that links between tables still work.
+        assert conn.execute("SELECT rowid, answer FROM clues;").fetchall() == [
+            (3, "ODES"),
+            (7, "PART"),
+        ]
+        assert conn.execute(
+            "SELECT rowid FROM clues_fts WHERE clues_fts MATCH 'trap';"
+        ).fetchall() == [(7,)]
+        assert conn.execute(
+            "SELECT indicators.wordplay, indicators.indicator, indicators_clues.clue_rowid "
+            "FROM indicators JOIN indicators_clues ON indicators.rowid = indicators_clues.indicator_rowid "
+            "ORDER BY clue_rowid;"
+        ).fetchall() == [("reversal", "a trap", 7)]
+        assert {key for key, in conn.execute("SELECT key FROM metadata;")} == {
+            "license",
+            "last_built",
+            "last_commit",
+        }
+
+
+def test_copy_tables_skips_indexes(tmp_path):
+    with sqlite3.connect(tmp_path / "source.sqlite3") as conn:
+        conn.execute("CREATE TABLE a (x TEXT);")
+        conn.execute("CREATE INDEX a_x_index ON a (x);")
+        conn.execute("CREATE TABLE b (x TEXT);")
+        conn.execute("CREATE INDEX b_x_index ON b (x);")
+        conn.execute("INSERT INTO a VALUES ('a');")
+
+    conn = sqlite3.connect(tmp_path / "target.sqlite3")
+    conn.execute("ATTACH DATABASE ? AS source;", (str(tmp_path / "source.sqlite3"),))
+    build.copy_tables(conn, ["a", "b"], skip_indexes=["b"])
+    assert conn.execute("SELECT rowid, x FROM main.a;").fetchall() == [(1, "a")]
+    assert conn.execute(
+        "SELECT name FROM main.sqlite_master WHERE type = 'index';"
+    ).fetchall() == [("a_x_index",)]
+    conn.close()
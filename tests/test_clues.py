@@ -0,0 +1,53 @@
+import pickle
+
+import pytest
+
+from cryptics.clues import Clue, ClueBatch
+
+
+def test_from_columns():
+    batch = ClueBatch.from_columns(
+        clue_number=["1a", "2d"],
+        clue=["Clue one (3)", "Clue two (3)"],
+        answer=["ONE", "TWO"],
+        annotation=["Annotation", None],
+        source_url="url_1",
+    )
+    assert list(batch) == [
+        Clue("1a", "Clue one (3)", "ONE", None, "Annotation"),
+        Clue("2d", "Clue two (3)", "TWO", None, None),
+    ]
+    assert batch.source_url == "url_1"
+    assert batch.puzzle_name is None
+
+    with pytest.raises(ValueError):
+        ClueBatch.from_columns(clue_number=["1a"], clue=["Clue (3)"], answer=[])
+
+
+def test_batches_can_be_sent_to_worker_processes():
+    batch = ClueBatch([Clue("1a", "Clue (3)", "ONE")], source="foo", parser="bar")
+    unpickled = pickle.loads(pickle.dumps(batch))
+    assert list(unpickled) == list(batch)
+    assert (unpickled.source, unpickled.parser) == ("foo", "bar")
+
+
+def test_to_dataframe():
+    batch = ClueBatch(
+        [Clue("1a", "Clue (3)", "ONE")], source_url="url_1", parser_version=2
+    )
+    data = batch.to_dataframe()
+    assert data.to_dict("records") == [
+        {
+            "clue_number": "1a",
+            "clue": "Clue (3)",
+            "answer": "ONE",
+            "definition": None,
+            "annotation": None,
+            "source": None,
+            "puzzle_date": None,
+            "puzzle_name": None,
+            "puzzle_url": None,
+            "source_url": "url_1",
+        }
+    ]
+    assert data.attrs["parser_version"] == 2
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import compression, database
+
+zstandard = pytest.importorskip("zstandard")
+
+
+def _html(i: int) -> str:
+    chrome = "".join(f"<li><a href='/page/{j}'>Page {j}</a></li>" for j in range(50))
+    return f"<html><nav><ul>{chrome}</ul></nav><p>Post {i}: {i * 'clue '}</p></html>"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    database.initialize_db(conn)
+    conn.executemany(
+        "INSERT INTO raw (source, location, content_type, content) VALUES (?, ?, ?, ?)",
+        [("foo", f"url_{i}", "html", _html(i)) for i in range(200)]
+        + [("bar", "puz_1", "puz", b"\x00\x01puz")],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def test_initialize_db_adds_encoding_columns(tmp_path):
+    conn = sqlite3.connect(tmp_path / "old.sqlite3")
+    conn.execute(
+        "CREATE TABLE raw (source TEXT, location PRIMARY KEY, datetime_requested TIMESTAMP, content_type TEXT, content BLOB, is_parsed BOOLEAN DEFAULT FALSE, datetime_parsed TIMESTAMP);"
+    )
+    database.initialize_db(conn)
+    columns = {name for _, name, *_ in conn.execute("PRAGMA table_info(raw);")}
+    assert {"content_encoding", "dictionary_id"} <= columns
+
+
+def test_compress_raw(conn):
+    before = {
+        location: content for _, _, location, content in database.iter_raw(conn, "html")
+    }
+
+    reports = compression.compress_raw(conn, sources=["foo", "bar"])
+    assert [report.num_rows for report in reports] == [200, 1]
+    assert reports[0].bytes_after < reports[0].bytes_before / 10
+    assert conn.execute(
+        "SELECT COUNT(*) FROM raw WHERE content_encoding IS NULL;"
+    ).fetchone() == (0,)
+
+    # Compressed and uncompressed rows are read back the same.
+    after = {
+        location: content for _, _, location, content in database.iter_raw(conn, "html")
+    }
+    assert after == before
+    ((_, _, _, puz),) = database.iter_raw(conn, "puz")
+    assert puz == b"\x00\x01puz"
+
+    # Rerunning is a no-op, and does not train another dictionary.
+    num_dictionaries = conn.execute("SELECT COUNT(*) FROM raw_dictionaries;").fetchone()
+    assert compression.compress_raw(conn, sources=["foo"])[0].num_rows == 0
+    assert (
+        conn.execute("SELECT COUNT(*) FROM raw_dictionaries;").fetchone()
+        == num_dictionaries
+    )
+
+
+def test_insert_raw_uses_latest_dictionary(conn):
+    codec = compression.RawCodec(conn)
+    dictionary_id = codec.train("foo")
+    assert dictionary_id is not None
+
+    database.insert_raw(conn, codec, "foo", "url_new", "html", _html(1000))
+    row = conn.execute(
+        "SELECT content_encoding, dictionary_id FROM raw WHERE location = 'url_new';"
+    ).fetchone()
+    assert row == (compression.ZSTD, dictionary_id)
+
+    ((_, _, _, content),) = [
+        row for row in database.iter_raw(conn, "html") if row[2] == "url_new"
+    ]
+    assert content == _html(1000)
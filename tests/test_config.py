@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import itertools
 import os
+import sqlite3
 from unittest.mock import PropertyMock
 
 import pytest
 
-from cryptics import config
+from cryptics import config, database
 
 
 def test_valid_global_variables():
@@ -28,9 +29,9 @@ def test_valid_global_variables():
 def test_get_new_urls_from_sitemap(
     mocker, urls: list[str], known_urls: list[str], expected_new_urls: list[str]
 ):
-    # Mock the result of requests.get with an object that has a .text property.
+    # Mock the result of http_client.get with an object that has a .text property.
     return_value = "".join([f"<loc>{url}</loc>" for url in urls])
-    patched_get = mocker.patch("requests.get")
+    patched_get = mocker.patch("cryptics.http_client.get")
     type(patched_get.return_value).text = PropertyMock(return_value=return_value)
 
     # Sanity check on the parametrized arguments.
@@ -61,11 +62,11 @@ def test_get_new_urls_from_nested_sitemaps(
     expected_new_urls: list of URLs that should be returned by
         get_new_urls_from_nested_sitemaps.
     """
-    # Mock the result of requests.get with an object that has a .text property.
+    # Mock the result of http_client.get with an object that has a .text property.
     nested_sitemaps = "".join(
         [f"<loc>sitemap_{i}</loc>" for i in range(len(nested_new_urls))]
     )
-    patched_get = mocker.patch("requests.get")
+    patched_get = mocker.patch("cryptics.http_client.get")
     type(patched_get.return_value).text = PropertyMock(return_value=nested_sitemaps)
 
     # Additionally, patch cryptics.config.get_new_urls_from_sitemap
@@ -90,3 +91,53 @@ def test_get_new_urls_from_nested_sitemaps(
     assert list(itertools.chain(*nested_new_urls)) == expected_new_urls
 
     assert new_urls == set(expected_new_urls)
+
+
+def test_get_new_urls_from_nested_sitemaps_skips_unchanged_sitemaps(mocker, tmp_path):
+    """Tests that, given a SitemapState, nested sitemaps with an unchanged
+    <lastmod> are not requested at all, and that the rest are requested with
+    conditional GETs.
+    """
+    with sqlite3.connect(tmp_path / "cryptics.sqlite3") as conn:
+        database.initialize_db(conn)
+    sitemap_state = database.SitemapState(tmp_path / "cryptics.sqlite3")
+
+    lastmods = {"sitemap_0": "2022-01-01", "sitemap_1": "2022-01-01"}
+
+    def get(url, headers=None):
+        response = mocker.Mock(ok=True, status_code=200, headers={"ETag": "etag"})
+        if url == "sitemap_index":
+            response.text = "".join(
+                f"<sitemap><loc>{loc}</loc><lastmod>{lastmod}</lastmod></sitemap>"
+                for loc, lastmod in lastmods.items()
+            )
+        elif headers and headers.get("If-None-Match") == "etag":
+            response.status_code = 304
+            response.text = ""
+        else:
+            response.text = f"<loc>{url}_post</loc>"
+        return response
+
+    patched_get = mocker.patch("cryptics.http_client.get", side_effect=get)
+
+    def get_new_urls():
+        return config.get_new_urls_from_nested_sitemaps(
+            "sitemap_index", r"sitemap_", set(), sitemap_state=sitemap_state
+        )
+
+    assert get_new_urls() == {"sitemap_0_post", "sitemap_1_post"}
+    assert patched_get.call_count == 3
+
+    # Nothing has changed: only the index is requested.
+    assert get_new_urls() == set()
+    assert patched_get.call_count == 4
+
+    # sitemap_1 has a new <lastmod>, but the server says it has not changed.
+    lastmods["sitemap_1"] = "2022-01-02"
+    assert get_new_urls() == set()
+    assert patched_get.call_count == 6
+    assert sitemap_state.get("sitemap_1").lastmod == "2022-01-02"
+
+    # ... so next time, it is skipped entirely.
+    assert get_new_urls() == set()
+    assert patched_get.call_count == 7
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import database
+from cryptics.clues import Clue, ClueBatch
+from cryptics.config import INITIALIZE_DB_SQL
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    with open(INITIALIZE_DB_SQL, "r") as f:
+        conn.executescript(f.read())
+    conn.executemany(
+        "INSERT INTO raw (source, location, content_type, content) VALUES ('foo', ?, 'html', '')",
+        [("url_1",), ("url_2",)],
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def _clues(n: int, source_url: str) -> ClueBatch:
+    return ClueBatch.from_columns(
+        clue_number=[f"{i}a" for i in range(n)],
+        clue=[f"Clue {i} (4)" for i in range(n)],
+        answer=[f"ANSWER{i}" for i in range(n)],
+        annotation=[float("nan")] * n,
+        source_url=source_url,
+        source="foo",
+    )
+
+
+def test_batch_to_rows():
+    rows = database.batch_to_rows(_clues(2, "url_1"))
+    assert len(rows) == 2
+    assert len(rows[0]) == len(database.CLUES_COLUMNS)
+    row = dict(zip(database.CLUES_COLUMNS, rows[0]))
+    assert row["clue"] == "Clue 0 (4)"
+    assert row["clue_number"] == "0a"
+    assert row["source_url"] == "url_1"
+    # Missing columns and NaNs both become NULLs.
+    assert row["definition"] is None
+    assert row["annotation"] is None
+
+
+def test_clue_writer_commits_in_batches(conn, tmp_path):
+    with database.ClueWriter(conn, commit_every=2, commit_interval=3600) as writer:
+        writer.write(_clues(3, "url_1"), location="url_1")
+        assert writer.num_pending == 1
+
+        # Nothing is visible to other connections until the batch is committed.
+        with sqlite3.connect(tmp_path / "cryptics.sqlite3") as other_conn:
+            assert other_conn.execute("SELECT COUNT(*) FROM clues;").fetchone() == (0,)
+
+        writer.write(_clues(2, "url_2"), location="url_2")
+        assert writer.num_pending == 0
+
+    assert conn.execute("SELECT COUNT(*) FROM clues;").fetchone() == (5,)
+    assert conn.execute("SELECT COUNT(*) FROM raw WHERE is_parsed;").fetchone() == (2,)
+
+
+def test_clue_writer_rolls_back_clues_and_flags_together(conn):
+    with pytest.raises(RuntimeError):
+        with database.ClueWriter(conn, commit_every=10) as writer:
+            writer.write(_clues(3, "url_1"), location="url_1")
+            raise RuntimeError
+
+    assert conn.execute("SELECT COUNT(*) FROM clues;").fetchone() == (0,)
+    assert conn.execute("SELECT COUNT(*) FROM raw WHERE is_parsed;").fetchone() == (0,)
+
+
+def test_clue_writer_skips_duplicate_clues(conn):
+    with database.ClueWriter(conn) as writer:
+        writer.write(_clues(3, "url_1"), location="url_1")
+        writer.write(_clues(3, "url_1"), location="url_1")
+        writer.write(_clues(3, "url_2"), location="url_2")
+
+    assert conn.execute("SELECT COUNT(*) FROM clues;").fetchone() == (6,)
+
+
+def test_initialize_db_adds_clue_hashes(tmp_path):
+    conn = sqlite3.connect(tmp_path / "old.sqlite3")
+    conn.execute(
+        "CREATE TABLE clues (source TEXT, clue TEXT, answer TEXT, definition TEXT, annotation TEXT, clue_number TEXT, "
+        "puzzle_date TEXT, puzzle_name TEXT, puzzle_url TEXT, source_url TEXT NOT NULL, "
+        "is_reviewed BOOLEAN DEFAULT FALSE, datetime_reviewed TIMESTAMP DEFAULT NULL);"
+    )
+    conn.executemany(
+        "INSERT INTO clues (clue, clue_number, source_url) VALUES (?, ?, 'url_1');",
+        [("Clue (4)", 1), ("Clue (4)", 1), ("Clue (4)", None), ("Other (5)", 1)],
+    )
+    database.initialize_db(conn)
+
+    assert conn.execute("SELECT rowid FROM clues;").fetchall() == [(1,), (3,), (4,)]
+
+    # The clues written by a ClueWriter have the same hashes as the migrated ones.
+    with database.ClueWriter(conn) as writer:
+        writer.write(
+            ClueBatch(
+                [Clue(1, "Clue (4)", None), Clue(1, "New (3)", None)],
+                source_url="url_1",
+            )
+        )
+    assert conn.execute("SELECT COUNT(*) FROM clues;").fetchone() == (4,)
+    conn.close()
+
+
+def test_iter_raw(conn):
+    conn.executemany(
+        "INSERT INTO raw (source, location, content_type, content) VALUES (?, ?, ?, ?)",
+        [
+            ("bar", "url_3", "html", "baz"),
+            ("foo", "url_4", "json", "{}"),
+            ("foo", "url_5", "html", "qux"),
+        ],
+    )
+    conn.execute("UPDATE raw SET is_parsed = TRUE WHERE location = 'url_2';")
+
+    rows = list(database.iter_raw(conn, "html", source="foo", chunk_size=1))
+    assert [location for _, _, location, _ in rows] == ["url_1", "url_5"]
+    assert [rowid for rowid, _, _, _ in rows] == sorted(rowid for rowid, *_ in rows)
+    assert database.count_raw(conn, "html", source="foo") == 2
+    assert database.count_raw(conn, "html", is_parsed=None) == 4
+
+    # Rows may be marked as parsed while iterating.
+    for _, _, location, _ in database.iter_raw(conn, "html", chunk_size=1):
+        conn.execute("UPDATE raw SET is_parsed = TRUE WHERE location = ?;", (location,))
+    assert database.count_raw(conn, "html") == 0
+
+
+def test_url_pattern():
+    assert database.url_pattern("https://example.com/times-cryptic-28123/") == (
+        "times-cryptic"
+    )
+    assert database.url_pattern("https://example.com/2021/01/dt-29543.html") == "dt"
+
+
+def test_parser_stats(conn):
+    stats = database.ParserStats.load(conn)
+    assert stats.order("foo", "https://foo.com/dt-1") == []
+
+    snapshot = stats.snapshot()
+    stats.record("foo", "https://foo.com/dt-1", [("a", False), ("b", True)])
+    stats.record("foo", "https://foo.com/st-1", [("c", True)])
+    stats.record("foo", "https://foo.com/st-2", [("c", True)])
+    stats.record("bar", "https://bar.com/dt-1", [("d", True)])
+    # Parsers that parsed posts with the same URL pattern come first.
+    assert stats.order("foo", "https://foo.com/dt-2") == ["b", "c"]
+    assert stats.order("foo", "https://foo.com/other") == ["c", "b"]
+    # Snapshots are not changed by later attempts.
+    assert snapshot.order("foo", "https://foo.com/dt-2") == []
+    assert stats.snapshot().order("foo", "https://foo.com/dt-2") == ["b", "c"]
+
+    stats.save(conn)
+    stats.save(conn)
+    loaded = database.ParserStats.load(conn)
+    assert loaded.hits_and_misses() == stats.hits_and_misses()
+    assert loaded.hits_and_misses()["a"] == (0, 1)
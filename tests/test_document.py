@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import pytest
+
+from cryptics.document import ParsedDocument
+
+pytest.importorskip("pandas")
+pytest.importorskip("lxml")
+
+
+def test_tables():
+    document = ParsedDocument(
+        "<html><body><table><tr><th>Clue</th></tr><tr><td>Trap</td></tr></table></body></html>"
+    )
+    (table,) = document.tables
+    assert list(table["Clue"]) == ["Trap"]
+
+
+def test_tables_of_posts_without_tables():
+    assert ParsedDocument("<html><body><p>No tables</p></body></html>").tables == []
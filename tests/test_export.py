@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import export
+
+pyarrow = pytest.importorskip("pyarrow")
+pyarrow_dataset = pytest.importorskip("pyarrow.dataset")
+
+CLUES = [
+    (1, "Clue one (3)", "ONE", "2021-03-04", "Times 1", "fifteensquared"),
+    (2, "Clue two (3)", "TWO", "Saturday 5 June 2021", "Times 2", "fifteensquared"),
+    (3, "Clue three (5)", "THREE", None, None, "fifteensquared"),
+    (4, "Clue four (4)", "FOUR", "2022-01-01", "Guardian 1", "times/xwd"),
+    (5, "Clue five (4)", "FIVE", "2021-12-31", "Times 3", "fifteensquared"),
+    (6, "Clue six (3)", "SIX", "2022-01-02", "Times 4", "times_xwd"),
+]
+
+
+@pytest.mark.parametrize(
+    "puzzle_date,expected",
+    [
+        ("2021-03-04", "2021"),
+        ("Saturday 5 June 2021", "2021"),
+        ("No. 12345", None),
+        (None, None),
+    ],
+)
+def test_puzzle_year(puzzle_date, expected):
+    assert export.puzzle_year(puzzle_date) == expected
+
+
+def test_export(tmp_path):
+    database = str(tmp_path / "data.sqlite3")
+    with sqlite3.connect(database) as conn:
+        conn.execute(
+            "CREATE TABLE clues (rowid INTEGER PRIMARY KEY, clue TEXT, answer TEXT, puzzle_date TEXT, puzzle_name TEXT, source TEXT);"
+        )
+        conn.executemany("INSERT INTO clues VALUES (?, ?, ?, ?, ?, ?);", CLUES)
+        conn.execute(
+            "CREATE TABLE indicators (rowid INTEGER PRIMARY KEY, wordplay TEXT, indicator TEXT, clue_rowids TEXT);"
+        )
+        conn.execute(
+            "CREATE TABLE charades (rowid INTEGER PRIMARY KEY, charade TEXT, answer TEXT, clue_rowids TEXT);"
+        )
+        conn.execute(
+            "INSERT INTO indicators VALUES (1, 'anagram', 'mixed', '[1](/data/clues/1)');"
+        )
+
+    num_rows = export.export(database, str(tmp_path / "export"), chunk_size=2)
+    assert num_rows == {"clues": 6, "indicators": 1, "charades": 0}
+
+    partitioning = pyarrow_dataset.partitioning(
+        pyarrow.schema(
+            [("source", pyarrow.string()), ("puzzle_year", pyarrow.string())]
+        ),
+        flavor="hive",
+    )
+    clues = pyarrow_dataset.dataset(
+        str(tmp_path / "export" / "clues"), partitioning=partitioning
+    ).to_table()
+    rows = sorted(clues.to_pylist(), key=lambda row: row["rowid"])
+    assert [(row["rowid"], row["source"], row["puzzle_year"]) for row in rows] == [
+        (1, "fifteensquared", "2021"),
+        (2, "fifteensquared", "2021"),
+        (3, "fifteensquared", None),
+        (4, "times/xwd", "2022"),
+        (5, "fifteensquared", "2021"),
+        (6, "times_xwd", "2022"),
+    ]
+    assert rows[0]["clue"] == "Clue one (3)"
+
+    indicators = pyarrow_dataset.dataset(str(tmp_path / "export" / "indicators"))
+    assert indicators.to_table().to_pylist() == [
+        {
+            "rowid": 1,
+            "wordplay": "anagram",
+            "indicator": "mixed",
+            "clue_rowids": "[1](/data/clues/1)",
+        }
+    ]
+
+    charades = pyarrow_dataset.dataset(str(tmp_path / "export" / "charades"))
+    assert charades.schema.names == ["rowid", "charade", "answer", "clue_rowids"]
+    assert charades.count_rows() == 0
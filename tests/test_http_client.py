@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from cryptics import config, http_client
+
+
+class StandInTransport(BaseAdapter):
+    """Answers every request locally, and records the requests it was sent."""
+
+    def __init__(self, text: str = "<loc>foo</loc>"):
+        super().__init__()
+        self.text = text
+        self.requests: list[tuple[requests.PreparedRequest, dict]] = []
+
+    def send(self, request, **kwargs):
+        self.requests.append((request, kwargs))
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response.request = request
+        response._content = self.text.encode("utf-8")
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def transport():
+    transport = StandInTransport()
+    http_client.configure(transport=transport, timeout=5)
+    yield transport
+    http_client.configure()
+
+
+def test_get_uses_configured_transport(transport):
+    response = http_client.get("https://example.com/sitemap.xml")
+    assert response.text == "<loc>foo</loc>"
+
+    ((request, kwargs),) = transport.requests
+    assert request.url == "https://example.com/sitemap.xml"
+    assert kwargs["timeout"] == 5
+    for header, value in config.HEADERS.items():
+        assert request.headers[header] == value
+
+
+def test_get_session_is_shared(transport):
+    assert http_client.get_session() is http_client.get_session()
+
+
+def test_ingestion_uses_http_client(transport):
+    assert config.get_new_urls_from_sitemap("https://example.com", set()) == {"foo"}
+    assert len(transport.requests) == 1
@@ -0,0 +1,45 @@
+import runpy
+import subprocess
+import sys
+from os.path import join
+
+import pytest
+
+from cryptics.config import PROJECT_DIR
+
+# benchmarks/startup.py checks the same modules. benchmarks/ is not a package,
+# so run the module that lists them.
+HEAVY_MODULES_PY = join(PROJECT_DIR, "benchmarks", "heavy_modules.py")
+HEAVY_MODULES = runpy.run_path(HEAVY_MODULES_PY)["HEAVY_MODULES"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "cryptics.answers",
+        "cryptics.build",
+        "cryptics.clues",
+        "cryptics.compression",
+        "cryptics.config",
+        "cryptics.database",
+        "cryptics.document",
+        "cryptics.indicators",
+        "cryptics.main",
+        "cryptics.parse",
+        "cryptics.reparse",
+        "cryptics.utils",
+        "cryptics.workers",
+    ],
+)
+def test_import_is_lightweight(module):
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == []
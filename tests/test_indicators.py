@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import indicators
+from cryptics.config import INITIALIZE_DB_SQL
+
+CLUES = [
+    ("Stop in the middle of this (4)", "ODES", "anagram (does) inside (stop)"),
+    ("Hear the sea around us (3)", "SEE", "homophone (sea), hidden in (the sea)"),
+    ("Reversed a trap (4)", "PART", "reversal (a trap). PA (=a) + RT (=trap)"),
+    ("Trap hidden in the part (4)", "TRAP", "hidden (the part) reverse (trap)"),
+    ("No annotation (2)", "NO", None),
+]
+
+
+def _tables(conn: sqlite3.Connection) -> dict[str, list]:
+    """Return the rows of the tables built from clues. Rows of the unpivoted
+    tables (and their junction tables) are identified by their keys, since
+    incremental builds append new rows rather than renumbering them.
+    """
+    return {
+        "indicators": conn.execute(
+            "SELECT * FROM indicators ORDER BY clue_rowid;"
+        ).fetchall(),
+        "charades": conn.execute(
+            "SELECT * FROM charades ORDER BY clue_rowid, charade, answer;"
+        ).fetchall(),
+        "indicators_unpivoted": conn.execute(
+            "SELECT * FROM indicators_unpivoted ORDER BY wordplay, indicator;"
+        ).fetchall(),
+        "charades_unpivoted": conn.execute(
+            "SELECT * FROM charades_unpivoted ORDER BY charade, answer;"
+        ).fetchall(),
+        "indicators_consolidated": conn.execute(
+            "SELECT * FROM indicators_consolidated;"
+        ).fetchall(),
+        "indicators_unpivoted_clues": conn.execute(
+            "SELECT wordplay, indicator, clue_rowid FROM indicators_unpivoted_clues "
+            "JOIN indicators_unpivoted ON indicator_rowid = indicators_unpivoted.rowid "
+            "ORDER BY wordplay, indicator, clue_rowid;"
+        ).fetchall(),
+        "charades_unpivoted_clues": conn.execute(
+            "SELECT charade, answer, clue_rowid FROM charades_unpivoted_clues "
+            "JOIN charades_unpivoted ON charade_rowid = charades_unpivoted.rowid "
+            "ORDER BY charade, answer, clue_rowid;"
+        ).fetchall(),
+    }
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    with open(INITIALIZE_DB_SQL, "r") as f:
+        conn.executescript(f.read())
+    conn.executemany(
+        "INSERT INTO clues (clue, answer, annotation, source_url) VALUES (?, ?, ?, 'url')",
+        CLUES,
+    )
+    yield conn
+    conn.close()
+
+
+def test_build_indicators_migrates_legacy_databases(conn, tmp_path):
+    """Tests that indicators can be built from a database created before the
+    clue_hash column (among others) was added, as `make build` does.
+    """
+    legacy_conn = sqlite3.connect(tmp_path / "legacy.sqlite3")
+    legacy_conn.executescript(
+        """
+        CREATE TABLE raw (source TEXT, location PRIMARY KEY, datetime_requested TIMESTAMP DEFAULT CURRENT_TIMESTAMP, content_type TEXT, content BLOB, is_parsed BOOLEAN DEFAULT FALSE, datetime_parsed TIMESTAMP DEFAULT NULL);
+        CREATE TABLE clues (source TEXT, clue TEXT, answer TEXT, definition TEXT, annotation TEXT, clue_number TEXT, puzzle_date TEXT, puzzle_name TEXT, puzzle_url TEXT, source_url TEXT NOT NULL, is_reviewed BOOLEAN DEFAULT FALSE, datetime_reviewed TIMESTAMP DEFAULT NULL);
+        """
+    )
+    legacy_conn.executemany(
+        "INSERT INTO clues (clue, answer, annotation, source_url) VALUES (?, ?, ?, 'url')",
+        CLUES,
+    )
+    legacy_conn.commit()
+
+    assert not indicators.update_indicators(legacy_conn)
+    indicators.build_indicators(legacy_conn)
+    assert indicators.update_indicators(legacy_conn)
+
+    indicators.build_indicators(conn)
+    assert _tables(legacy_conn) == _tables(conn)
+    legacy_conn.close()
+
+
+def test_update_indicators_needs_a_previous_build(conn):
+    assert not indicators.update_indicators(conn)
+
+
+def test_update_indicators_matches_full_build(conn):
+    indicators.build_indicators(conn)
+    assert indicators.update_indicators(conn)
+
+    # Add, edit and delete clues.
+    conn.executemany(
+        "INSERT INTO clues (clue, answer, annotation, source_url) VALUES (?, ?, ?, 'url')",
+        [
+            ("Sounds like see (3)", "SEA", "sounds like (see)"),
+            ("Trap again (4)", "PART", "reversal (trap)"),
+        ],
+    )
+    conn.execute(
+        "UPDATE clues SET annotation = 'anagram (trap)', is_reviewed = TRUE, datetime_reviewed = datetime('now') WHERE rowid = 4;"
+    )
+    conn.execute("DELETE FROM clues WHERE rowid = 2;")
+    conn.commit()
+
+    before = conn.execute(
+        "SELECT rowid, wordplay, indicator FROM indicators_unpivoted;"
+    )
+    rowids = {(wordplay, indicator): rowid for rowid, wordplay, indicator in before}
+    assert indicators.update_indicators(conn)
+    incremental = _tables(conn)
+    assert incremental["indicators_unpivoted"]
+    # Rows that are not deleted keep their rowids.
+    after = conn.execute("SELECT rowid, wordplay, indicator FROM indicators_unpivoted;")
+    kept = {(wordplay, indicator): rowid for rowid, wordplay, indicator in after}
+    assert kept.keys() & rowids.keys()
+    assert all(kept[key] == rowids[key] for key in kept.keys() & rowids.keys())
+
+    indicators.build_indicators(conn)
+    assert incremental == _tables(conn)
+
+
+def test_update_indicators_handles_reused_rowids(conn):
+    """Tests that a clue that is deleted, and whose rowid is then reused by a
+    new clue, is not mistaken for the new clue.
+    """
+    conn.execute("DELETE FROM clues WHERE rowid > 3;")
+    conn.commit()
+    indicators.build_indicators(conn)
+    assert ("reversal", "a trap") in conn.execute(
+        "SELECT wordplay, indicator FROM indicators_unpivoted;"
+    ).fetchall()
+
+    conn.execute("DELETE FROM clues WHERE rowid = 3;")
+    conn.execute(
+        "INSERT INTO clues (clue, answer, annotation, source_url) VALUES (?, ?, ?, 'url')",
+        ("Sounds like see (3)", "SEA", "sounds like (see)"),
+    )
+    assert conn.execute("SELECT MAX(rowid) FROM clues;").fetchone() == (3,)
+    conn.commit()
+
+    assert indicators.update_indicators(conn)
+    incremental = _tables(conn)
+    assert ("reversal", "a trap") not in [
+        row[1:3] for row in incremental["indicators_unpivoted"]
+    ]
+
+    indicators.build_indicators(conn)
+    assert incremental == _tables(conn)
+
+
+@pytest.mark.parametrize(
+    "regex, prefix",
+    [
+        (r"anagram(?:med|ming|\sof)?\s*\(", "anagram"),
+        (r"sounds?\slike", "sound"),
+        (r"ab+c", "ab"),
+        (r"([A-Z][A-Z ]+)", ""),
+        (r"abc|abe", ""),
+        (r"a(b|c)d", "a"),
+    ],
+)
+def test_literal_prefix(regex, prefix):
+    assert indicators.literal_prefix(regex) == prefix
+
+
+def test_indicator_matcher():
+    matcher = indicators.IndicatorMatcher()
+    clue, _, annotation = CLUES[3]
+    assert matcher.find_indicators(clue, annotation) == {
+        "hidden": "the part",
+        "reversal": "trap",
+    }
+    clue, _, annotation = CLUES[2]
+    assert matcher.find_charades(clue, annotation) == [("a", "PA"), ("trap", "RT")]
+
+
+def test_find_indicators_and_charades_skips_clues_without_a_clue():
+    rows = [(1, None, "anagram (does)"), (2, None, "no indicators here")]
+    assert indicators.find_indicators_and_charades(rows) == ([], [])
+
+
+def test_build_indicators_in_parallel(conn):
+    indicators.build_indicators(conn)
+    serial = _tables(conn)
+    indicators.build_indicators(conn, workers=2, chunk_size=2)
+    assert _tables(conn) == serial
+
+
+def test_clue_rowids_are_rendered_from_junction_tables(conn):
+    indicators.build_indicators(conn)
+    for table, junction_column in [
+        ("indicators_unpivoted", "indicator_rowid"),
+        ("charades_unpivoted", "charade_rowid"),
+    ]:
+        rows = conn.execute(f"SELECT rowid, clue_rowids FROM {table};").fetchall()
+        assert rows
+        for rowid, clue_rowids in rows:
+            linked = [
+                clue_rowid
+                for clue_rowid, in conn.execute(
+                    f"SELECT clue_rowid FROM {table}_clues WHERE {junction_column} = ?;",
+                    (rowid,),
+                )
+            ]
+            assert clue_rowids == ", ".join(f"[{i}](/data/clues/{i})" for i in linked)
+
+
+def test_update_indicators_only_fingerprints_changed_clues(conn, monkeypatch):
+    indicators.build_indicators(conn)
+    conn.execute(
+        "INSERT INTO clues (clue, answer, annotation, source_url) VALUES (?, ?, ?, 'url')",
+        ("Sounds like see (3)", "SEA", "sounds like (see)"),
+    )
+    conn.commit()
+
+    fingerprinted = []
+
+    def clue_fingerprint(clue, annotation):
+        fingerprinted.append(clue)
+        return fingerprint(clue, annotation)
+
+    fingerprint = indicators.clue_fingerprint
+    monkeypatch.setattr(indicators, "clue_fingerprint", clue_fingerprint)
+    assert indicators.update_indicators(conn)
+    assert set(fingerprinted) == {"Sounds like see (3)"}
+
+    fingerprinted.clear()
+    assert indicators.update_indicators(conn)
+    assert fingerprinted == []
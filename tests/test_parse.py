@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from cryptics import parse
+from cryptics.clues import Clue, ClueBatch
+
+
+def parse_nothing(document):
+    return ClueBatch()
+
+
+def parse_one_clue(document):
+    return ClueBatch([Clue("1a", " Clue (3) ", "ONE")])
+
+
+def test_try_parse_skips_parsers_that_find_no_clues(monkeypatch):
+    monkeypatch.setattr(
+        parse,
+        "PARSERS",
+        [
+            (lambda document: True, parse_nothing),
+            (lambda document: True, parse_one_clue),
+        ],
+    )
+    monkeypatch.setattr(
+        parse, "PARSER_VERSIONS", {"parse_nothing": 1, "parse_one_clue": 2}
+    )
+
+    attempts: list[tuple[str, bool]] = []
+    data = parse.try_parse("<p>Post</p>", "https://example.com", attempts=attempts)
+    assert list(data) == [Clue("1a", "Clue (3)", "ONE")]
+    assert (data.parser, data.parser_version) == ("parse_one_clue", 2)
+    assert attempts == [("parse_nothing", False), ("parse_one_clue", True)]
+
+    # A post that no parser finds clues in fails to parse.
+    monkeypatch.setattr(parse, "PARSERS", [(lambda document: True, parse_nothing)])
+    assert parse.try_parse("<p>Post</p>", "https://example.com") is None
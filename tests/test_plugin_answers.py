@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from urllib.parse import urlencode
+
+import pytest
+
+from cryptics import answers
+
+pm = pytest.importorskip("datasette.plugins").pm
+
+ANSWERS = [
+    "Release",
+    "RELEASE",
+    "re-lease",
+    "Repeats",
+    "Café",
+    "Beret",
+    "Sealer",
+    "Ease",
+    "Tree",
+    None,
+]
+INPUTS = ["Release", "Café", "o'clock", "Half-time", "Ærø", "ß", "", "?A?E??E", "1-2"]
+
+
+@pytest.fixture
+def datasette(serve_data):
+    def populate(conn):
+        conn.execute("CREATE TABLE clues (rowid INTEGER PRIMARY KEY, answer TEXT);")
+        conn.executemany(
+            "INSERT INTO clues (answer) VALUES (?);", [(answer,) for answer in ANSWERS]
+        )
+        answers.build_answer_index(conn)
+
+    return serve_data(populate)
+
+
+@pytest.fixture
+def conn(datasette):
+    conn = sqlite3.connect(datasette.get_database("data").path)
+    yield conn
+    conn.close()
+
+
+def get(datasette, path, **params):
+    async def get():
+        await datasette.invoke_startup()
+        return await datasette.client.get(f"{path}?{urlencode(params)}")
+
+    return asyncio.run(get())
+
+
+def get_answers(datasette, path, **params):
+    response = get(datasette, path, **params)
+    assert response.status_code == 200
+    return [(row["answer"], row["clue_rowids"]) for row in response.json()["answers"]]
+
+
+@pytest.mark.parametrize("letters", INPUTS)
+def test_plugin_agrees_with_cryptics_answers(datasette, letters):
+    plugin = pm.get_plugin("answers.py")
+    normalized = answers.normalize_answer(letters)
+    assert plugin.normalize_answer(letters) == normalized
+    assert plugin.signature(normalized) == answers.signature(normalized)
+    assert plugin.letter_counts(normalized) == answers.letter_counts(normalized)
+    assert plugin.letter_mask(normalized) == answers.letter_mask(normalized)
+    try:
+        expected = answers.parse_pattern(letters)
+    except ValueError:
+        with pytest.raises(ValueError):
+            plugin.parse_pattern(letters)
+    else:
+        assert plugin.parse_pattern(letters) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern", ["?E?E??E", "r_l_a_e", "RE-LEASE", "????", "T...", "cafe", "?Z"]
+)
+def test_pattern_route(datasette, conn, pattern):
+    assert get_answers(
+        datasette, "/-/answers/pattern", pattern=pattern
+    ) == answers.match_pattern(conn, pattern)
+
+
+@pytest.mark.parametrize("letters", ["sealere", "SEA-LERE", "eeab tr", "xyz", ""])
+def test_anagram_route(datasette, conn, letters):
+    assert get_answers(
+        datasette, "/-/answers/anagram", letters=letters
+    ) == answers.find_anagrams(conn, letters)
+
+
+@pytest.mark.parametrize(
+    "letters,min_length,limit",
+    [("releasetb", 3, 100), ("releasetb", 5, 100), ("releasetb", 3, 2), ("a", 3, 100)],
+)
+def test_subanagram_route(datasette, conn, letters, min_length, limit):
+    assert get_answers(
+        datasette,
+        "/-/answers/subanagram",
+        letters=letters,
+        min_length=min_length,
+        limit=limit,
+    ) == answers.find_subanagrams(conn, letters, min_length=min_length, limit=limit)
+
+
+@pytest.mark.parametrize(
+    "path,params",
+    [
+        ("/-/answers/pattern", {"pattern": "a1"}),
+        ("/-/answers/pattern", {}),
+        ("/-/answers/subanagram", {"letters": "abc", "min_length": "x"}),
+    ],
+)
+def test_invalid_requests(datasette, path, params):
+    response = get(datasette, path, **params)
+    assert response.status_code == 400
+    assert response.json()["ok"] is False
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+datasette_plugins = pytest.importorskip("datasette.plugins")
+hookimpl = pytest.importorskip("datasette").hookimpl
+Response = pytest.importorskip("datasette.utils.asgi").Response
+
+
+class CookiePlugin:
+    """Routes whose responses must not be shared between clients."""
+
+    __name__ = "cookie_plugin"
+
+    @hookimpl
+    def register_routes(self):
+        def set_cookie():
+            response = Response.text("cookie")
+            response.set_cookie("session", "secret")
+            return response
+
+        def vary():
+            return Response.text("vary", headers={"Vary": "Accept-Language"})
+
+        return [(r"^/-/set-cookie$", set_cookie), (r"^/-/vary$", vary)]
+
+
+@pytest.fixture
+def datasette(serve_data):
+    pm = datasette_plugins.pm
+    pm.register(CookiePlugin(), name=CookiePlugin.__name__)
+    try:
+        yield serve_data(
+            lambda conn: conn.execute("CREATE TABLE clues (clue TEXT, answer TEXT);")
+        )
+    finally:
+        pm.unregister(name=CookiePlugin.__name__)
+
+
+@pytest.fixture
+def cache(datasette):
+    """The cache plugin, as loaded by Datasette."""
+    return datasette_plugins.pm.get_plugin("cache.py")
+
+
+def get(datasette, path, **headers):
+    async def get():
+        await datasette.invoke_startup()
+        return await datasette.client.get(path, headers=headers)
+
+    return asyncio.run(get())
+
+
+def test_response_cache_evicts_least_recently_used(cache):
+    response_cache = cache.ResponseCache(max_entries=2, max_bytes=10)
+    response_cache.put("a", [], b"aaa")
+    response_cache.put("b", [], b"bbb")
+    assert response_cache.get("a") == ([], b"aaa")
+
+    # "b" is now the least recently used...
+    response_cache.put("c", [], b"ccc")
+    assert response_cache.get("b") is None
+    assert list(response_cache.entries) == ["a", "c"]
+
+    # ... and entries are evicted until the cache is small enough.
+    response_cache.put("d", [], b"dddddddd")
+    assert list(response_cache.entries) == ["d"]
+    assert response_cache.num_bytes == 8
+
+    # Replacing an entry does not count its old size.
+    response_cache.put("d", [], b"dd")
+    assert response_cache.num_bytes == 2
+    assert response_cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 3,
+        "not_modified": 0,
+        "entries": 1,
+        "bytes": 2,
+        "max_entries": 2,
+        "max_bytes": 10,
+    }
+
+
+def test_responses_are_cached(datasette, cache):
+    before = cache.cache.stats()
+    miss = get(datasette, "/data/clues.json")
+    hit = get(datasette, "/data/clues.json")
+    after = cache.cache.stats()
+
+    assert miss.status_code == hit.status_code == 200
+    assert hit.content == miss.content
+    assert hit.headers["etag"] == miss.headers["etag"]
+    assert hit.headers["cache-control"] == cache.CACHE_CONTROL.decode()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    assert after["entries"] == 1
+
+    # Other query strings are cached separately, with other ETags.
+    other = get(datasette, "/data/clues.json?_shape=array")
+    assert other.headers["etag"] != miss.headers["etag"]
+    assert cache.cache.stats()["entries"] == 2
+    assert get(datasette, "/-/cache.json").json()["entries"] == 2
+
+
+def test_matching_etags_are_not_modified(datasette, cache):
+    etag = get(datasette, "/data/clues.json").headers["etag"]
+    not_modified = cache.cache.not_modified
+
+    response = get(datasette, "/data/clues.json", **{"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert cache.cache.not_modified == not_modified + 1
+
+    response = get(datasette, "/data/clues.json", **{"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/-/set-cookie", "/-/vary"])
+def test_unshareable_responses_are_never_not_modified(datasette, cache, path):
+    """Tests that a request for an unshareable response is passed through, even
+    if it has the ETag that the response would have had if it were shareable.
+    """
+    last_built = asyncio.run(cache.get_last_built(datasette))
+    etag = cache.get_etag(last_built, (path, b"")).decode()
+    not_modified = cache.cache.not_modified
+
+    response = get(datasette, path, **{"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert cache.cache.not_modified == not_modified
+
+
+@pytest.mark.parametrize(
+    "headers", [{"cookie": "ds_actor=someone"}, {"authorization": "Bearer token"}]
+)
+def test_signed_in_actors_bypass_the_cache(datasette, cache, headers):
+    before = cache.cache.stats()
+    response = get(datasette, "/data/clues.json", **headers)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert cache.cache.stats() == before
+
+
+@pytest.mark.parametrize("path", ["/-/set-cookie", "/-/vary"])
+def test_unshareable_responses_are_not_cached(datasette, cache, path):
+    hits = cache.cache.hits
+    for _ in range(2):
+        response = get(datasette, path)
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+    assert cache.cache.hits == hits
+    assert cache.cache.stats()["entries"] == 0
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import re
+
+import pytest
+
+datasette_plugins = pytest.importorskip("datasette.plugins")
+
+# Shards 0 and 1 are full, shard 2 is not, shard 3 is empty (i.e. a gap in the
+# rowids) and shard 4 has a single clue.
+ROWIDS = [*range(1, 26), 45]
+
+
+@pytest.fixture
+def datasette(serve_data):
+    def populate(conn):
+        conn.execute("CREATE TABLE clues (rowid INTEGER PRIMARY KEY, clue TEXT);")
+        conn.executemany(
+            "INSERT INTO clues (rowid, clue) VALUES (?, ?);",
+            [(rowid, f"Clue {rowid}") for rowid in ROWIDS],
+        )
+
+    return serve_data(populate)
+
+
+@pytest.fixture
+def sitemap(datasette, monkeypatch):
+    """The sitemap plugin, as loaded by Datasette, with small shards and
+    chunks.
+    """
+    sitemap = datasette_plugins.pm.get_plugin("sitemap.py")
+    monkeypatch.setattr(sitemap, "URLS_PER_SITEMAP", 10)
+    monkeypatch.setattr(sitemap, "CHUNK_SIZE", 3)
+    return sitemap
+
+
+def get(datasette, path, **headers):
+    async def get():
+        await datasette.invoke_startup()
+        return await datasette.client.get(path, headers=headers)
+
+    return asyncio.run(get())
+
+
+def get_locs(response):
+    return re.findall(r"<loc>https://[^/]+(/[^<]*)</loc>", response.text)
+
+
+def test_sitemap_index_lists_shards_with_clues(datasette, sitemap):
+    response = get(datasette, "/sitemap.xml")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/xml")
+    assert get_locs(response) == [
+        "/sitemap-pages.xml",
+        "/sitemap-clues-0.xml",
+        "/sitemap-clues-1.xml",
+        "/sitemap-clues-2.xml",
+        "/sitemap-clues-4.xml",
+    ]
+
+
+def test_shards_list_their_clues(datasette, sitemap):
+    rowids = []
+    for loc in get_locs(get(datasette, "/sitemap.xml"))[1:]:
+        response = get(datasette, loc)
+        assert response.status_code == 200
+        assert response.text.endswith("</urlset>\n")
+        locs = get_locs(response)
+        assert 0 < len(locs) <= sitemap.URLS_PER_SITEMAP
+        rowids += [int(loc.rsplit("/", 1)[1]) for loc in locs]
+
+    # Every clue is in exactly one shard.
+    assert rowids == ROWIDS
+    assert get_locs(get(datasette, "/sitemap-clues-2.xml")) == [
+        f"/data/clues/{rowid}" for rowid in range(21, 26)
+    ]
+
+
+@pytest.mark.parametrize("shard", [3, 5, 100])
+def test_missing_shards_are_not_found(datasette, sitemap, shard):
+    assert get(datasette, f"/sitemap-clues-{shard}.xml").status_code == 404
+
+
+# Requests with a cookie bypass the cache plugin, so are answered by the
+# sitemap plugin's own ETags.
+@pytest.mark.parametrize("headers", [{}, {"cookie": "foo=bar"}])
+@pytest.mark.parametrize(
+    "path", ["/sitemap.xml", "/sitemap-pages.xml", "/sitemap-clues-1.xml"]
+)
+def test_matching_etags_are_not_modified(datasette, sitemap, headers, path):
+    response = get(datasette, path, **headers)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = get(datasette, path, **headers, **{"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = get(datasette, path, **headers, **{"if-none-match": '"stale"'})
+    assert response.status_code == 200
+
+
+def test_etags_change_when_the_database_is_rebuilt(sitemap):
+    name = "sitemap-clues-0.xml"
+    assert (
+        sitemap.get_headers("2024-01-01", name)["ETag"]
+        != sitemap.get_headers("2024-02-01", name)["ETag"]
+    )
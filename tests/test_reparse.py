@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from cryptics import database
+from cryptics.parse import PARSER_VERSIONS
+from cryptics.reparse import posts_to_reparse
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    database.initialize_db(conn)
+    conn.executemany(
+        "INSERT INTO raw (source, location, content_type, content, is_parsed) VALUES ('foo', ?, 'html', '', ?)",
+        [
+            ("current", True),
+            ("outdated", True),
+            ("failed", False),
+            ("reviewed", True),
+            ("unrecorded", True),
+            ("unparsed", False),
+            ("failed_to_reparse", True),
+        ],
+    )
+    version = PARSER_VERSIONS["parse_table_type_1"]
+    conn.executemany(
+        "INSERT INTO parse_results (location, content_sha256, parser, parser_version) VALUES (?, '', ?, ?)",
+        [
+            ("current", "parse_table_type_1", version),
+            ("outdated", "parse_table_type_1", version - 1),
+            ("failed", None, None),
+            ("reviewed", "parse_table_type_1", version - 1),
+            ("failed_to_reparse", "parse_table_type_1", version - 1),
+        ],
+    )
+    conn.execute(
+        "UPDATE parse_results SET failed_parser_version = ? WHERE location = 'failed_to_reparse';",
+        (version,),
+    )
+    conn.execute(
+        "INSERT INTO clues (source_url, is_reviewed) VALUES ('reviewed', TRUE);"
+    )
+    yield conn
+    conn.close()
+
+
+def test_posts_to_reparse(conn):
+    assert [location for _, location in posts_to_reparse(conn)] == [
+        "outdated",
+        "failed",
+        "unparsed",
+    ]
+    assert [
+        location for _, location in posts_to_reparse(conn, include_unrecorded=True)
+    ] == ["outdated", "failed", "unrecorded", "unparsed"]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+
+import requests
+
+from cryptics import config, database
+from cryptics.scrape_blogs import BlogScraper
+
+
+def test_sitemaps_are_saved_once_their_posts_are_inserted(mocker, tmp_path):
+    """Tests that a sitemap's validators are not saved while any of its new
+    posts fail to be scraped, so that those posts are found again.
+    """
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    database.initialize_db(conn)
+    sitemap_state = database.SitemapState(str(tmp_path / "cryptics.sqlite3"))
+
+    pages = {"sitemap": "<loc>post_1</loc><loc>post_2</loc>", "post_1": "<p>1</p>"}
+
+    def get(url, headers=None):
+        if headers and headers.get("If-None-Match") == "etag":
+            return mocker.Mock(ok=True, status_code=304, text="", headers={})
+        if url not in pages:
+            return mocker.Mock(ok=False, status_code=404, text="", headers={})
+        return mocker.Mock(
+            ok=True, status_code=200, text=pages[url], headers={"ETag": "etag"}
+        )
+
+    mocker.patch("cryptics.http_client.get", side_effect=get)
+
+    def get_new_urls(known_urls, sitemap_state=None):
+        return config.get_new_urls_from_sitemap(
+            "sitemap", known_urls, sitemap_state=sitemap_state
+        )
+
+    async def scrape():
+        scraper = BlogScraper(
+            conn,
+            sitemap_state=sitemap_state,
+            sleep_interval=0,
+            max_retries=0,
+            logger=logging.getLogger(__name__),
+        )
+        await scraper.scrape({"foo": get_new_urls})
+
+    def scraped_urls():
+        return {url for (url,) in conn.execute("SELECT location FROM raw;")}
+
+    # post_2 fails, so the sitemap is not saved...
+    asyncio.run(scrape())
+    assert scraped_urls() == {"post_1"}
+    assert sitemap_state.get("sitemap") is None
+
+    # ... and post_2 is found again on the next run.
+    pages["post_2"] = "<p>2</p>"
+    asyncio.run(scrape())
+    assert scraped_urls() == {"post_1", "post_2"}
+    assert sitemap_state.get("sitemap") == database.SitemapValidators(
+        None, "etag", None
+    )
+
+    conn.close()
+
+
+def test_request_never_returns_a_stale_response(mocker, tmp_path):
+    """Tests that a retryable response is not returned if a later attempt
+    fails.
+    """
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    database.initialize_db(conn)
+    mocker.patch(
+        "cryptics.http_client.get",
+        side_effect=[
+            mocker.Mock(ok=False, status_code=503),
+            requests.ConnectionError("Connection reset"),
+        ],
+    )
+
+    async def request():
+        scraper = BlogScraper(
+            conn,
+            sleep_interval=0,
+            max_retries=1,
+            backoff=0,
+            logger=logging.getLogger(__name__),
+        )
+        return await scraper.request("post")
+
+    assert asyncio.run(request()) is None
+    conn.close()
+
+
+def test_sitemap_requests_are_rate_limited(mocker, tmp_path):
+    """Tests that the requests sent by sitemap discovery (in another thread)
+    are limited as the requests for posts are.
+    """
+    conn = sqlite3.connect(tmp_path / "cryptics.sqlite3")
+    database.initialize_db(conn)
+    session = mocker.patch("cryptics.http_client.get_session").return_value
+    session.get.return_value = mocker.Mock(
+        ok=True, status_code=200, text="<loc>https://foo.com/post</loc>", headers={}
+    )
+
+    acquired = []
+    acquire = BlogScraper._acquire
+
+    async def record_acquire(self, url):
+        acquired.append(url)
+        await acquire(self, url)
+
+    mocker.patch.object(BlogScraper, "_acquire", record_acquire)
+
+    def get_new_urls(known_urls, sitemap_state=None):
+        return config.get_new_urls_from_sitemap("https://foo.com/sitemap", known_urls)
+
+    async def scrape():
+        scraper = BlogScraper(
+            conn, sleep_interval=0, logger=logging.getLogger(__name__)
+        )
+        await scraper.scrape({"foo": get_new_urls})
+        return scraper
+
+    scraper = asyncio.run(scrape())
+    # Only the sitemap was requested from another thread...
+    assert acquired == ["https://foo.com/sitemap"]
+    assert [call.args[0] for call in session.get.call_args_list] == [
+        "https://foo.com/sitemap",
+        "https://foo.com/post",
+    ]
+    # ... and its slot was released.
+    assert scraper._semaphore._value == 8
+    conn.close()